@@ -1,18 +1,57 @@
-from fastapi import HTTPException, APIRouter, Depends
-from SCHEMAS.aprendiz_schemas import AprendizActualizarRequest, AprendixActualizarResponse
-from connection import get_db
+from fastapi import HTTPException, APIRouter, Depends, Request, Response
+from SCHEMAS.aprendiz_schemas import AprendizActualizarRequest, AprendixActualizarResponse, AprendizActualizarLoteRequest
+from connection import get_db, get_write_db, get_async_read_db
 from MODELS.aprendices import Aprendiz
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import aplicar_firma, url_firma, url_base_api
+from MODELS.firma_aprendiz import FirmaAprendiz
+from FUNCIONES.FUNCIONES_FICHAS.resumen_fichas import registrar_cambio_aprendiz
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import cache_respuestas, respuesta_cacheada, clave_aprendiz, invalidar_aprendiz
+from FUNCIONES.FUNCIONES_APRENDICES.actualizacion_lote import actualizar_aprendices_lote
+from FUNCIONES.FUNCIONES_APRENDICES.busqueda_aprendices import consulta_busqueda, CAMPOS_BUSQUEDA, LIMITE_POR_DEFECTO
+from FUNCIONES.FUNCIONES_CONSULTAS.serializacion import respuesta_filas
+from FUNCIONES.FUNCIONES_CACHE.versiones import incrementar_revision, version_aprendiz, calcular_etag, no_modificado, con_etag
 import traceback
+from typing import Optional
 
 router_aprendices = APIRouter()
 
 
+# Debe declararse antes de /aprendices/{documento}, que tambien capturaria "batch"
+@router_aprendices.patch("/aprendices/batch")
+def actualizar_aprendices_batch(
+    datos_lote: AprendizActualizarLoteRequest,
+    request: Request,
+    db: Session = Depends(get_write_db)
+):
+    """
+    Actualiza varios aprendices en una sola transaccion (por ejemplo la direccion o la firma de toda una ficha).
+
+    Args:
+        datos_lote (AprendizActualizarLoteRequest): Lista de {documento, cambios} (hasta 500).
+        db: Session: Sesión de base de datos.
+
+    Returns:
+        Totales y el resultado de cada aprendiz, en el mismo orden en que se enviaron.
+        Los aprendices con error no se modifican; los demas si.
+    """
+    try:
+        return actualizar_aprendices_lote(db, datos_lote.aprendices, url_base_api(request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("❌ Error en actualizar_aprendices_batch:", traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+
 @router_aprendices.patch("/aprendices/{documento}")
-async def actualizar_aprendiz(
+def actualizar_aprendiz(
     documento: str,
     datos_actualizacion: AprendizActualizarRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_write_db)
 ):
     """
     Actualiza los datos de un aprendiz dado su documento.
@@ -33,15 +72,31 @@ async def actualizar_aprendiz(
         
         datos_dict = datos_actualizacion.dict(exclude_unset=True)
         cambios = False
+        antes = (aprendiz.estado, aprendiz.editado)
+
+        # La firma se normaliza (recorte, reduccion y PNG compacto) antes de guardarla
+        if "firma" in datos_dict:
+            try:
+                aplicar_firma(db, aprendiz, datos_dict.pop("firma"))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            cambios = True
+
         for campo, valor in datos_dict.items():
             if hasattr(aprendiz, campo):
                 setattr(aprendiz, campo, valor)
             cambios = True
         if cambios:
             aprendiz.editado = True
+        registrar_cambio_aprendiz(db, aprendiz.ficha_numero, antes, (aprendiz.estado, aprendiz.editado))
+        # ultima_actualizacion tiene precision de segundos: dos ediciones seguidas no la cambian
+        incrementar_revision(db, aprendiz.ficha_numero)
         
         db.commit()
         db.refresh(aprendiz)
+        invalidar_aprendiz(documento, aprendiz.ficha_numero)
+        if aprendiz.documento != documento:  # Cambio de documento: la respuesta con el nuevo tampoco sirve
+            invalidar_aprendiz(aprendiz.documento)
 
         aprendiz_data = {
             "tipo_documento": aprendiz.tipo_documento,
@@ -54,7 +109,7 @@ async def actualizar_aprendiz(
             "tipo_discapacidad": aprendiz.tipo_discapacidad,
             "discapacidad": aprendiz.discapacidad,
             "estado": aprendiz.estado,
-            "firma": aprendiz.firma or ""
+            "firma": url_firma(aprendiz.documento, aprendiz.firma_hash, url_base_api(request))
         }
 
         return AprendixActualizarResponse(
@@ -70,8 +125,34 @@ async def actualizar_aprendiz(
 
 
 
+# Debe declararse antes de /aprendices/{documento}, que tambien capturaria "search"
+@router_aprendices.get("/aprendices/search")
+async def buscar_aprendices(
+    q: str,
+    ficha: Optional[str] = None,
+    estado: Optional[str] = None,
+    limite: int = LIMITE_POR_DEFECTO,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Busca aprendices por prefijo de documento, nombre o apellido (para autocompletar).
+
+    Args:
+        q (str): Texto a buscar. Solo digitos busca por documento; si no, por palabras de nombre y apellido.
+        ficha (str): Limita la busqueda a una ficha.
+        estado (str): Limita la busqueda a un estado.
+        limite (int): Maximo de resultados (hasta 50).
+
+    Returns:
+        Lista de aprendices con documento, nombre, apellido, ficha_numero y estado.
+    """
+    consulta = consulta_busqueda(db.bind.dialect.name, q, ficha=ficha, estado=estado, limite=limite)
+    filas = (await db.execute(consulta)).all()
+    return respuesta_filas(filas, CAMPOS_BUSQUEDA)
+
+
 @router_aprendices.get("/aprendices/{documento}")
-async def obtener_aprendiz(documento: str, db: Session = Depends(get_db)):
+async def obtener_aprendiz(documento: str, request: Request, db: AsyncSession = Depends(get_async_read_db)):
     """
     Obtiene los datos de un aprendiz dado su documento.
 
@@ -81,33 +162,84 @@ async def obtener_aprendiz(documento: str, db: Session = Depends(get_db)):
     
     Returns:
         Datos del aprendiz si se encuentra, de lo contrario un mensaje de error.
+        304 si el cliente envia el ETag de la version actual (If-None-Match).
     """
     try:
-        aprendiz = db.query(Aprendiz).filter(Aprendiz.documento == documento).first()
-        
-        if not aprendiz:
-            raise HTTPException(status_code=404, detail=f"Aprendiz con {documento} no encontrado")
-        
-        aprendiz_data = {
-            "tipo_documento": aprendiz.tipo_documento,
-            "documento": aprendiz.documento,
-            "nombre": aprendiz.nombre,
-            "apellido": aprendiz.apellido,
-            "direccion": aprendiz.direccion,
-            "correo": aprendiz.correo,
-            "celular": aprendiz.celular,
-            "departamento": aprendiz.departamento,
-            "municipio": aprendiz.municipio,
-            "estado": aprendiz.estado,
-            "discapacidad": aprendiz.discapacidad,
-            "tipo_discapacidad": aprendiz.tipo_discapacidad,
-            "firma": aprendiz.firma or "",
-            "editado": aprendiz.editado
-        }
+        url_base = url_base_api(request)  # La firma va como URL absoluta: el cuerpo depende de ella
+        version = await version_aprendiz(db, documento)
+        if version is None:
+            return respuesta_cacheada(await cache_respuestas.obtener_o_calcular_async(
+                clave_aprendiz(documento, url_base), lambda: _consultar_aprendiz(db, documento, url_base)
+            ))
 
-        return {"aprendiz": aprendiz_data}
+        etag = calcular_etag(version, "aprendiz", documento, url_base)
+        no_mod = no_modificado(request, etag)
+        if no_mod is not None:
+            return no_mod
+        # La version va en la clave: otro worker que escribio no deja respuestas viejas en esta cache
+        return con_etag(respuesta_cacheada(await cache_respuestas.obtener_o_calcular_async(
+            clave_aprendiz(documento, version, url_base), lambda: _consultar_aprendiz(db, documento, url_base)
+        )), etag)
     except HTTPException:
         raise
     except Exception as e:
         print("❌ Error en obtener_aprendiz:", traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+
+async def _consultar_aprendiz(db: AsyncSession, documento: str, url_base: str) -> dict:
+    aprendiz = await db.scalar(select(Aprendiz).where(Aprendiz.documento == documento))
+    
+    if not aprendiz:
+        raise HTTPException(status_code=404, detail=f"Aprendiz con {documento} no encontrado")
+    
+    aprendiz_data = {
+        "tipo_documento": aprendiz.tipo_documento,
+        "documento": aprendiz.documento,
+        "nombre": aprendiz.nombre,
+        "apellido": aprendiz.apellido,
+        "direccion": aprendiz.direccion,
+        "correo": aprendiz.correo,
+        "celular": aprendiz.celular,
+        "departamento": aprendiz.departamento,
+        "municipio": aprendiz.municipio,
+        "estado": aprendiz.estado,
+        "discapacidad": aprendiz.discapacidad,
+        "tipo_discapacidad": aprendiz.tipo_discapacidad,
+        "firma": url_firma(aprendiz.documento, aprendiz.firma_hash, url_base),
+        "editado": aprendiz.editado
+    }
+
+    return {"aprendiz": aprendiz_data}
+
+
+@router_aprendices.get("/aprendices/{documento}/firma")
+def obtener_firma(documento: str, request: Request, v: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Devuelve la imagen PNG de la firma del aprendiz.
+
+    Args:
+        documento (str): Documento del aprendiz.
+        v (str): Version de la firma (prefijo del hash). Las URLs versionadas se pueden guardar en cache sin revalidar.
+        db: Session: Sesión de base de datos.
+
+    Returns:
+        La imagen de la firma, o 304 si el cliente ya tiene esa misma version.
+    """
+    firma = db.query(FirmaAprendiz.hash, FirmaAprendiz.contenido).join(
+        Aprendiz, Aprendiz.firma_hash == FirmaAprendiz.hash
+    ).filter(Aprendiz.documento == documento).first()
+
+    if not firma:
+        raise HTTPException(status_code=404, detail=f"El aprendiz {documento} no tiene firma")
+
+    etag = f'"{firma.hash}"'
+    # Con version en la URL el contenido es inmutable; sin ella el cliente debe revalidar con el ETag
+    cabeceras = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable" if v and firma.hash.startswith(v) else "private, no-cache"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cabeceras)
+
+    return Response(content=firma.contenido, media_type="image/png", headers=cabeceras)
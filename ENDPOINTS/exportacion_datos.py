@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime
+from typing import Optional
+from FUNCIONES.FUNCIONES_CONSULTAS.volcado_datos import (
+    FORMATOS, COLUMNAS_APRENDICES, COLUMNAS_FICHAS, consulta_aprendices, consulta_fichas,
+    generar_csv, generar_parquet, pa
+)
+
+router_exportacion = APIRouter()
+
+
+def _respuesta_volcado(nombre: str, formato: str, consulta, llave, columnas: dict) -> StreamingResponse:
+    """Envia el volcado por bloques: nunca se tiene la tabla completa en memoria"""
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato no válido. Opciones: {', '.join(FORMATOS)}")
+    if formato == "parquet" and pa is None:
+        raise HTTPException(status_code=501, detail="Exportación Parquet no disponible: falta instalar pyarrow")
+
+    media_type, extension = FORMATOS[formato]
+    generador = generar_csv if formato == "csv" else generar_parquet
+    nombre_archivo = f"{nombre}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+    return StreamingResponse(
+        generador(consulta, llave, columnas),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}"'}
+    )
+
+
+@router_exportacion.get("/export/aprendices")
+def exportar_aprendices(
+    formato: str = "csv",
+    ficha: Optional[str] = None,
+    estado: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+):
+    """
+    Volcado completo de aprendices en CSV o Parquet, generado por lotes mientras se envia.
+    `desde`/`hasta` filtran por fecha de ultima actualizacion.
+    """
+    consulta, llave = consulta_aprendices(ficha=ficha, estado=estado, desde=desde, hasta=hasta)
+    return _respuesta_volcado("aprendices", formato, consulta, llave, COLUMNAS_APRENDICES)
+
+
+@router_exportacion.get("/export/fichas")
+def exportar_fichas(
+    formato: str = "csv",
+    ficha: Optional[str] = None,
+    estado: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None
+):
+    """
+    Volcado de fichas con sus totales en CSV o Parquet, generado por lotes mientras se envia.
+    `desde`/`hasta` filtran por fecha de inicio de la ficha.
+    """
+    consulta, llave = consulta_fichas(ficha=ficha, estado=estado, desde=desde, hasta=hasta)
+    return _respuesta_volcado("fichas", formato, consulta, llave, COLUMNAS_FICHAS)
@@ -1,19 +1,35 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, APIRouter, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, APIRouter, Depends, Request
 from fastapi.responses import FileResponse
-from MODELS import Aprendiz, Ficha, ArchivoExcel
+from MODELS import Aprendiz, Ficha, ArchivoExcel, FichaResumen
 from sqlalchemy.orm import Session
-from connection import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from connection import get_db, get_write_db, get_async_read_db, get_read_db
 from SCHEMAS.aprendiz_schemas import ExportarF165Request
-from FUNCIONES import procesar_archivos_background, procesar_archivo_maestro_background
-from connection import SessionLocal
-from typing import List
+from FUNCIONES import procesar_archivos_background, procesar_archivo_maestro_background, FormatoService
+from typing import List, Optional
 import uuid
 import os
 from SCHEMAS.ficha_schamas import InformacionAdicional
 from datetime import datetime
+from sqlalchemy import select
+from FUNCIONES.FUNCIONES_CONSULTAS.paginacion import codificar_cursor
+from FUNCIONES.FUNCIONES_FICHAS.consultas_fichas import consulta_listado_fichas
+from FUNCIONES.FUNCIONES_FORMATOS.consultas_historial import consulta_exportacion_individual
+from FUNCIONES.FUNCIONES_FORMATOS.descargas import respuesta_descarga
+from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import url_firma, url_base_api
+from FUNCIONES.FUNCIONES_FICHAS.resumen_fichas import resumen_a_dict
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import cache_respuestas, respuesta_cacheada, clave_ficha, invalidar_ficha
+from FUNCIONES.FUNCIONES_CACHE.versiones import (
+    incrementar_revision, revision_ficha, version_ficha, calcular_etag, no_modificado, con_etag
+)
+from FUNCIONES.FUNCIONES_APRENDICES.consultas_aprendices import (
+    parsear_campos, consultar_aprendices_ficha, consulta_aprendiz_en_ficha, CAMPOS_POR_DEFECTO, CAMPOS_SIN_ARCHIVO
+)
 
 router_tokens = APIRouter()
 
+format_service = FormatoService()
+
 procesamiento_estado = {}
 
 @router_tokens.post("/upload-fichas/")
@@ -90,164 +106,222 @@ async def upload_archivo_maestro(
 
 
 @router_tokens.get("/fichas/")
-async def listar_fichas():
+async def listar_fichas(
+    estado: Optional[str] = None,
+    programa: Optional[str] = None,
+    orden: str = "numero_ficha",
+    descendente: bool = False,
+    limite: int = 50,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Listar todas las fichas disponibles
+    Listar las fichas con su total de aprendices.
+    Una sola consulta (Fichas unida a FichasResumen) y paginación por cursor:
+    el campo `siguiente_cursor` de la respuesta se envía como `cursor` para la página siguiente.
     """
-    session = SessionLocal()
-    try:
-        fichas = session.query(Ficha).all()
-        resultado = []
-        
-        for ficha in fichas:
-            total_aprendices = session.query(Aprendiz).filter(
-                Aprendiz.ficha_numero == ficha.numero_ficha
-            ).count()
-            
-            resultado.append({
-                "numero_ficha": ficha.numero_ficha,
-                "programa": ficha.programa,
-                "estado": ficha.estado,
-                "fecha_reporte": str(ficha.fecha_reporte) if ficha.fecha_reporte else None,
-                "total_aprendices": total_aprendices
-            })
-        
-        return {"fichas": resultado}
-    
-    finally:
-        session.close()
+    consulta = consulta_listado_fichas(estado, programa, orden, descendente, cursor)
+    limite = max(1, min(limite, 200))
+
+    filas = (await db.execute(consulta.limit(limite + 1))).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    resultado = [
+        {
+            "numero_ficha": fila.numero_ficha,
+            "programa": fila.programa,
+            "estado": fila.estado,
+            "fecha_reporte": str(fila.fecha_reporte) if fila.fecha_reporte else None,
+            "total_aprendices": fila.total_aprendices,
+            "total_editados": fila.total_editados or 0,
+            "tiene_exportacion": bool(fila.tiene_exportacion)
+        }
+        for fila in filas
+    ]
+
+    siguiente_cursor = None
+    if hay_mas:
+        ultima = filas[-1]
+        valores = {
+            "numero_ficha": [ultima.numero_ficha],
+            "programa": [ultima.programa or "", ultima.numero_ficha],
+            "total_aprendices": [ultima.total_aprendices, ultima.numero_ficha],
+        }
+        siguiente_cursor = codificar_cursor(valores[orden])
+
+    return {"fichas": resultado, "siguiente_cursor": siguiente_cursor}
 
 @router_tokens.get("/ficha/{numero_ficha}/aprendices")
-async def obtener_aprendices(numero_ficha: str, db: Session = Depends(get_db)):
+async def obtener_aprendices(
+    numero_ficha: str,
+    request: Request,
+    fields: Optional[str] = None,
+    include_firma: bool = False,
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Obtener aprendices de una ficha específica
+    Obtener aprendices de una ficha específica.
+    Solo se consultan las columnas que se van a devolver; `fields` permite pedir un subconjunto
+    (separado por comas) e `include_firma` incluye la firma como data URL en lugar de su URL.
+    La respuesta se guarda en cache hasta que cambie algo de la ficha, y lleva un ETag:
+    con If-None-Match de la version actual se responde 304 sin cuerpo.
     """    
-    try:
+    campos = parsear_campos(fields)
+    seleccion = ",".join(campos) if campos else ""  # "" = campos por defecto
+    url_base = url_base_api(request)  # Las URLs de las firmas son absolutas: el cuerpo depende de ella
+    version = await version_ficha(db, numero_ficha)
+    etag = calcular_etag(version, "aprendices", seleccion, int(include_firma), url_base)
+    no_mod = no_modificado(request, etag)
+    if no_mod is not None:
+        return no_mod
+
+    clave = clave_ficha(numero_ficha, "aprendices", version, seleccion, int(include_firma), url_base)
+    return con_etag(respuesta_cacheada(await cache_respuestas.obtener_o_calcular_async(
+        clave, lambda: _consultar_aprendices(db, numero_ficha, campos, include_firma, url_base)
+    )), etag)
+
+
+async def _consultar_aprendices(db: AsyncSession, numero_ficha: str, campos: Optional[list], include_firma: bool,
+                                url_base: str) -> dict:
+    # Buscar la ficha (solo las fechas que se devuelven)
+    ficha = (await db.execute(
+        select(Ficha.fecha_inicio, Ficha.fecha_fin).where(Ficha.numero_ficha == numero_ficha)
+    )).first()
+
+    # Verificar si ya existe un archivo para la ficha buscada (el resumen guarda el ultimo generado)
+    resumen = await db.get(FichaResumen, numero_ficha)
+    archivo_existente = None
+    if resumen and resumen.ultimo_archivo_id:
+        archivo_existente = (await db.execute(
+            select(ArchivoExcel.id, ArchivoExcel.ruta_archivo).where(ArchivoExcel.id == resumen.ultimo_archivo_id)
+        )).first()
+
+    if campos is None:
+        campos = CAMPOS_POR_DEFECTO if archivo_existente else CAMPOS_SIN_ARCHIVO
+
+    # La consulta proyectada se comparte con el codigo sincrono; run_sync la ejecuta sobre la conexion async
+    resultado = await db.run_sync(consultar_aprendices_ficha, numero_ficha, campos, url_base, include_firma)
+
+    if archivo_existente:
+        return {
+            "numero_ficha": numero_ficha,
+            "total_aprendices": len(resultado),
+            "fecha_inicio": ficha.fecha_inicio.isoformat() if ficha and ficha.fecha_inicio else None,
+            "fecha_fin": ficha.fecha_fin.isoformat() if ficha and ficha.fecha_fin else None,
+            "aprendices": resultado,
+            "archivo_existente": True,
+            "id_archivo": archivo_existente.id,
+            "ruta_archivo": archivo_existente.ruta_archivo
+        }
+    else:
+        return {"archivo_existente": False, "aprendices": resultado}
 
-        # Buscar la ficha
-        ficha = db.query(Ficha).filter(Ficha.numero_ficha == numero_ficha).first()
-
-        # Verificar si ya existe un archivo para la ficha buscada
-        archivo_existente = db.query(ArchivoExcel).filter(
-            ArchivoExcel.ficha == numero_ficha,
-        ).first()
-
-        if archivo_existente:
-            aprendices = db.query(Aprendiz).filter(
-                Aprendiz.ficha_numero == numero_ficha
-            ).all()
-            
-            resultado = []
-            for aprendiz in aprendices:
-                resultado.append({
-                    "id": aprendiz.id_aprendiz,
-                    "documento": aprendiz.documento,
-                    "nombre": aprendiz.nombre,
-                    "apellido": aprendiz.apellido,
-                    "celular": aprendiz.celular,
-                    "correo": aprendiz.correo,
-                    "direccion": aprendiz.direccion,
-                    "tipo_documento": aprendiz.tipo_documento,
-                    "estado": aprendiz.estado,
-                    "discapacidad": aprendiz.discapacidad,
-                    "tipo_discapacidad": aprendiz.tipo_discapacidad,
-                    "firma": aprendiz.firma or "",
-                    "editado": aprendiz.editado
-                })
-            
-            return {
-                "numero_ficha": numero_ficha,
-                "total_aprendices": len(resultado),
-                "fecha_inicio": ficha.fecha_inicio.isoformat() if ficha.fecha_inicio else None,
-                "fecha_fin": ficha.fecha_fin.isoformat() if ficha.fecha_inicio else None,
-                "aprendices": resultado,
-                "archivo_existente": True,
-                "ruta_archivo": archivo_existente.ruta_archivo
-            }
-        else:
-            aprendices = db.query(Aprendiz).filter(
-                Aprendiz.ficha_numero == numero_ficha
-            ).all()
-            return {"archivo_existente": False, "aprendices": aprendices}
-            
-    finally:
-        db.close()
+@router_tokens.get("/ficha/{numero_ficha}/resumen")
+async def obtener_resumen_ficha(numero_ficha: str, db: AsyncSession = Depends(get_async_read_db)):
+    """Totales de la ficha para los tableros (lectura por llave primaria del resumen)"""
+    resumen = await db.get(FichaResumen, numero_ficha)
+    if resumen is None:
+        if await db.scalar(select(Ficha.numero_ficha).where(Ficha.numero_ficha == numero_ficha)) is None:
+            raise HTTPException(status_code=404, detail="Ficha no encontrada")
+        # Ficha sin aprendices ni exportaciones todavia
+        return resumen_a_dict(FichaResumen(
+            numero_ficha=numero_ficha, total_aprendices=0, aprendices_por_estado={},
+            total_editados=0, total_exportaciones=0, tiene_exportacion=False
+        ))
+    return resumen_a_dict(resumen)
 
 @router_tokens.get("/individual/{numero_ficha}/{numero_documento}")
 async def obtener_aprendiz(
     numero_ficha: str, 
     numero_documento: str, 
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Obtener aprendiz de una ficha con documento específico
+    Obtener aprendiz de una ficha con documento específico (con ETag, como /ficha/{numero_ficha}/aprendices)
     """    
-    try:
-        # Buscar la ficha
-        ficha = db.query(Ficha).filter(Ficha.numero_ficha == numero_ficha).first()
-        if not ficha:
-            return {"error": f"No existe ficha con número {numero_ficha}"}
-
-        # Buscar aprendiz dentro de la ficha
-        aprendiz = db.query(Aprendiz).filter(
-            Aprendiz.ficha_numero == numero_ficha,
-            Aprendiz.documento == numero_documento
-        ).first()
-
-        if not aprendiz:
-            return {"error": f"No se encontró aprendiz con documento {numero_documento} en la ficha {numero_ficha}"}
-
-        # Verificar si ya existe un archivo para la ficha
-        archivo_existente = db.query(ArchivoExcel).filter(
-            ArchivoExcel.ficha == numero_ficha,
-            ArchivoExcel.aprendiz_documento == numero_documento
-        ).first()
-
-        # Preparar respuesta
-        resultado = {
-            "id": aprendiz.id_aprendiz,
-            "documento": aprendiz.documento,
-            "nombre": aprendiz.nombre,
-            "apellido": aprendiz.apellido,
-            "celular": aprendiz.celular,
-            "correo": aprendiz.correo,
-            "direccion": aprendiz.direccion,
-            "departamento": aprendiz.departamento,
-            "municipio": aprendiz.municipio,
-            "tipo_documento": aprendiz.tipo_documento,
-            "estado": aprendiz.estado,
-            "firma": aprendiz.firma or "",
-            "editado": aprendiz.editado
-        }
+    url_base = url_base_api(request)
+    version = await version_ficha(db, numero_ficha)
+    etag = calcular_etag(version, "individual", numero_documento, url_base)
+    no_mod = no_modificado(request, etag)
+    if no_mod is not None:
+        return no_mod
 
-        return {
-            "numero_ficha": numero_ficha,
-            "fecha_inicio": ficha.fecha_inicio.isoformat() if ficha.fecha_inicio else None,
-            "fecha_fin": ficha.fecha_fin.isoformat() if ficha.fecha_fin else None,
-            "aprendiz": resultado,
-            "archivo_existente": archivo_existente is not None
-        }
-    finally:
-        db.close()
+    return con_etag(respuesta_cacheada(await cache_respuestas.obtener_o_calcular_async(
+        clave_ficha(numero_ficha, "individual", version, numero_documento, url_base),
+        lambda: _consultar_aprendiz_ficha(db, numero_ficha, numero_documento, url_base)
+    )), etag)
+
+
+async def _consultar_aprendiz_ficha(db: AsyncSession, numero_ficha: str, numero_documento: str,
+                                    url_base: str) -> dict:
+    # Buscar la ficha
+    ficha = await db.get(Ficha, numero_ficha)
+    if not ficha:
+        return {"error": f"No existe ficha con número {numero_ficha}"}
+
+    # Buscar aprendiz dentro de la ficha
+    aprendiz = await db.scalar(consulta_aprendiz_en_ficha(numero_ficha, numero_documento))
+
+    if not aprendiz:
+        return {"error": f"No se encontró aprendiz con documento {numero_documento} en la ficha {numero_ficha}"}
+
+    # Verificar si ya existe un archivo para la ficha
+    archivo_existente = await db.scalar(consulta_exportacion_individual(numero_ficha, numero_documento))
+
+    # Preparar respuesta
+    resultado = {
+        "id": aprendiz.id_aprendiz,
+        "documento": aprendiz.documento,
+        "nombre": aprendiz.nombre,
+        "apellido": aprendiz.apellido,
+        "celular": aprendiz.celular,
+        "correo": aprendiz.correo,
+        "direccion": aprendiz.direccion,
+        "departamento": aprendiz.departamento,
+        "municipio": aprendiz.municipio,
+        "tipo_documento": aprendiz.tipo_documento,
+        "estado": aprendiz.estado,
+        "firma": url_firma(aprendiz.documento, aprendiz.firma_hash, url_base),
+        "editado": aprendiz.editado
+    }
+
+    return {
+        "numero_ficha": numero_ficha,
+        "fecha_inicio": ficha.fecha_inicio.isoformat() if ficha.fecha_inicio else None,
+        "fecha_fin": ficha.fecha_fin.isoformat() if ficha.fecha_fin else None,
+        "aprendiz": resultado,
+        "archivo_existente": archivo_existente is not None
+    }
 
 @router_tokens.get("/descargar-archivo")
-def descargar_archivo(ruta: str):
-    if not os.path.isfile(ruta):
+def descargar_archivo(ruta: str, request: Request, db: Session = Depends(get_db)):
+    # La ruta solo se usa como clave de busqueda: el archivo que se envia sale del registro en BD
+    ruta_relativa = ruta
+    prefijo = f"{format_service.base_path}{os.sep}"
+    if ruta_relativa.startswith(prefijo):
+        ruta_relativa = ruta_relativa[len(prefijo):]
+    archivo_db = db.query(ArchivoExcel).filter(
+        ArchivoExcel.ruta_archivo == ruta_relativa,
+        ArchivoExcel.activo == True
+    ).first()
+    if not archivo_db:
         raise HTTPException(status_code=404, detail="Archivo no encontrado")
 
-    nombre_archivo = os.path.basename(ruta)
-    return FileResponse(
-        path=ruta,
-        filename=nombre_archivo,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    try:
+        ruta_completa = format_service.obtene_archivo_para_descarga(archivo_db)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    return respuesta_descarga(request, ruta_completa, os.path.basename(archivo_db.ruta_archivo), archivo_db.hash_archivo)
 
 #Guardar la información adicional de la ficha
 @router_tokens.post("/ficha/{numero_ficha}/informacion-adicional")
 def guardar_informacion_adicional(
     numero_ficha: str,
     info: InformacionAdicional,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_write_db)
 ):
     ficha = db.query(Ficha).filter(Ficha.numero_ficha == numero_ficha).first()
     if not ficha:
@@ -265,16 +339,36 @@ def guardar_informacion_adicional(
             info.fecha_inicio_etapa_productiva, "%Y-%m-%d"
         ).date()
 
+    incrementar_revision(db, numero_ficha)
     db.commit()
     db.refresh(ficha)
+    invalidar_ficha(numero_ficha)
     return {"message": "Información adicional guardada", "ficha": ficha.numero_ficha}
 
 #Obtener la información adicional de la ficha
 @router_tokens.get("/ficha/{numero_ficha}/informacion-adicional")
 def obtener_informacion_adicional(
     numero_ficha: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
+    # Estos campos solo cambian con escrituras que suben la revision de la ficha
+    revision = revision_ficha(db, numero_ficha)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Ficha no encontrada")
+
+    etag = calcular_etag(revision, "informacion-adicional")
+    no_mod = no_modificado(request, etag)
+    if no_mod is not None:
+        return no_mod
+
+    return con_etag(respuesta_cacheada(cache_respuestas.obtener_o_calcular(
+        clave_ficha(numero_ficha, "informacion-adicional", revision),
+        lambda: _consultar_informacion_adicional(db, numero_ficha)
+    )), etag)
+
+
+def _consultar_informacion_adicional(db: Session, numero_ficha: str) -> dict:
     ficha = db.query(Ficha).filter(Ficha.numero_ficha == numero_ficha).first()
     if not ficha:
         raise HTTPException(status_code=404, detail="Ficha no encontrada")
@@ -1,7 +1,7 @@
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter, Depends, Request, Response, BackgroundTasks
 from SCHEMAS.aprendiz_schemas import ExportarF165Request
 from fastapi.responses import FileResponse
-from connection import get_db
+from connection import get_db, get_write_db, get_read_db, fijar_lectura_primaria
 from sqlalchemy.orm import Session
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image as OpenpyxlImage
@@ -11,9 +11,17 @@ from datetime import datetime
 from io import BytesIO
 from fastapi.responses import StreamingResponse
 from FUNCIONES.FUNCIONES_FORMATOS.formato_service import FormatoService
+from FUNCIONES.FUNCIONES_FORMATOS.descargas import respuesta_descarga
+from FUNCIONES.FUNCIONES_FORMATOS.consultas_historial import consultar_historial
+from FUNCIONES.FUNCIONES_CONSULTAS.serializacion import respuesta_filas
+from sqlalchemy import func
+from FUNCIONES.FUNCIONES_FORMATOS.archivador import archivar_exportaciones_background
+from FUNCIONES.FUNCIONES_FORMATOS.exportacion_background import encolar_exportacion, exportaciones_estado
 from MODELS import ArchivoExcel, Usuarios, Ficha
 from pathlib import Path
+from typing import Optional
 import hashlib
+import uuid
 import tempfile
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
@@ -30,17 +38,21 @@ Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
 
 
 @router_format.post("/exportar-f165")
-async def exportar_f165(request: ExportarF165Request, db: Session = Depends(get_db)):
+def exportar_f165(request: ExportarF165Request, db: Session = Depends(get_write_db)):
 
-    if not request.aprendices:
+    # Las firmas que no vienen en el cuerpo se cargan de la BD en bloque
+    try:
+        aprendices = format_service.resolver_aprendices(db, request) # Lista de aprendices a exportar
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not aprendices:
         raise HTTPException(status_code=400, detail="Lista de aprendices vacía")
 
     modalidad = request.modalidad # 'grupal' o 'individual'
-    aprendices = request.aprendices # Lista de aprendices a exportar
     usuario_gene = request.usuario_generator # Usuario que genera el archivo
     informacion_adicional = request.informacion_adicional # Información adicional
 
-    imagenes_procesadas = await format_service.procesar_firmas_en_paralelo(aprendices)
+    imagenes_procesadas = format_service.procesar_firmas(aprendices)
 
     try:
         archivo_db, ruta_completa = format_service.crear_y_guardar_formato_f165(
@@ -53,32 +65,150 @@ async def exportar_f165(request: ExportarF165Request, db: Session = Depends(get_
             imagenes_procesadas=imagenes_procesadas
         )
 
-        for imagen_path in imagenes_procesadas:
-            if imagen_path and os.path.exists(imagen_path):
-                os.unlink(imagen_path)
+        format_service.limpiar_imagenes_temporales(imagenes_procesadas)
 
-        return FileResponse(
+        respuesta = FileResponse(
             path=ruta_completa,
             filename=archivo_db.nombre_original,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+        # La cookie que pone get_write_db no pasa a una respuesta devuelta directamente
+        fijar_lectura_primaria(respuesta)
+        return respuesta
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router_format.post("/exportar-f165/async", status_code=202)
+async def exportar_f165_async(request: ExportarF165Request):
+    """
+    Encola la generación del F165 y responde de inmediato con un job_id.
+    Pensado para fichas grandes o lotes de individuales que superan el timeout del proxy.
+    """
+    if not request.aprendices and not request.documentos:
+        raise HTTPException(status_code=400, detail="Lista de aprendices vacía")
+    if request.modalidad not in ("grupal", "individual"):
+        raise HTTPException(status_code=400, detail="Modalidad no válida")
+
+    job_id = str(uuid.uuid4())
+    encolar_exportacion(job_id, request)
+
+    return {
+        "message": "Exportación en cola",
+        "job_id": job_id,
+        "url_estado": f"/exportar-f165/tareas/{job_id}",
+        "total_aprendices": len(request.aprendices or request.documentos)
+    }
+
+
+@router_format.get("/exportar-f165/tareas/{job_id}")
+def estado_exportacion(job_id: str):
+    """Progreso de una exportación en segundo plano y URLs de descarga cuando termina"""
+    estado = exportaciones_estado.get(job_id)
+    if not estado:
+        raise HTTPException(status_code=404, detail="Tarea de exportación no encontrada")
+    return {"job_id": job_id, **estado}
+
+
+# Los listados de historial devuelven la misma lista de siempre; el cursor de la pagina
+# siguiente viaja en la cabecera X-Siguiente-Cursor (ausente en la ultima pagina)
+def _con_cursor(response: Response, siguiente_cursor: Optional[str]):
+    if siguiente_cursor:
+        response.headers["X-Siguiente-Cursor"] = siguiente_cursor
+    return response
+
+
+# Columnas calculadas en la consulta para serializar las filas tal cual llegan
+TAMAÑO_MB = func.round(ArchivoExcel.tamaño_bytes / 1048576.0, 2)
+GENERADO_POR = Usuarios.nombre + " " + Usuarios.apellidos
+
+COLUMNAS_HISTORIAL_COMPLETO = {
+    "id": ArchivoExcel.id,
+    "nombre_original": ArchivoExcel.nombre_original,
+    "ficha": ArchivoExcel.ficha,
+    "modalidad": ArchivoExcel.modalidad,
+    "cantidad_aprendices": ArchivoExcel.cantidad_aprendices,
+    "fecha_creacion": ArchivoExcel.fecha_creacion,
+    "tamaño_mb": TAMAÑO_MB,
+    "generado_por": GENERADO_POR,
+    "rol_usuario": Usuarios.rol,
+}
+
+# /archivos/usuario/{id} devolvia las filas de ArchivoExcel tal cual: se conservan esas columnas
+# (las agregadas despues, de uso interno como la huella o el paquete del archivado, no se exponen)
+COLUMNAS_ARCHIVO = {
+    "id": ArchivoExcel.id,
+    "nombre_original": ArchivoExcel.nombre_original,
+    "nombre_interno": ArchivoExcel.nombre_interno,
+    "ruta_archivo": ArchivoExcel.ruta_archivo,
+    "ficha": ArchivoExcel.ficha,
+    "modalidad": ArchivoExcel.modalidad,
+    "cantidad_aprendices": ArchivoExcel.cantidad_aprendices,
+    "aprendiz_documento": ArchivoExcel.aprendiz_documento,
+    "hash_archivo": ArchivoExcel.hash_archivo,
+    "tamaño_bytes": ArchivoExcel.tamaño_bytes,
+    "activo": ArchivoExcel.activo,
+    "fecha_creacion": ArchivoExcel.fecha_creacion,
+    "fecha_modificacion": ArchivoExcel.fecha_modificacion,
+    "usuario_id": ArchivoExcel.usuario_id,
+}
+
+COLUMNAS_HISTORIAL_EXPORTACIONES = {
+    "id": ArchivoExcel.id,
+    "nombre_": ArchivoExcel.nombre_original,
+    "ruta_archivo": ArchivoExcel.ruta_archivo,
+    "ficha": ArchivoExcel.ficha,
+    "modalidad": ArchivoExcel.modalidad,
+    "cantidad_aprendices": ArchivoExcel.cantidad_aprendices,
+    "fecha_creacion": ArchivoExcel.fecha_creacion,
+    "usuario_id": ArchivoExcel.usuario_id,
+    "usuario_nombre": Usuarios.nombre,
+    "usuario_apellidos": Usuarios.apellidos,
+    "tamaño_mb": TAMAÑO_MB,
+}
+
+
 @router_format.get("/archivos/usuario/{usuario_id}")
-def obtener_archivos_por_usuario(usuario_id: int, db: Session = Depends(get_db)):
-    archivos = db.query(ArchivoExcel).filter(ArchivoExcel.usuario_id == usuario_id, ArchivoExcel.activo == True).all()
-    return archivos
+def obtener_archivos_por_usuario(
+    usuario_id: int,
+    ficha: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = 100,
+    db: Session = Depends(get_read_db)
+):
+    """Archivos activos generados por el usuario, con todas las columnas de ArchivoExcel (COLUMNAS_ARCHIVO)"""
+    filas, siguiente_cursor = consultar_historial(
+        db, ficha=ficha, modalidad=modalidad, usuario_id=usuario_id,
+        desde=desde, hasta=hasta, cursor=cursor, limite=limite,
+        columnas=list(COLUMNAS_ARCHIVO.values())
+    )
+    return _con_cursor(respuesta_filas(filas, COLUMNAS_ARCHIVO), siguiente_cursor)
 
 
 @router_format.get("/archivo/ficha/{ficha}")
-def obtener_archivo_por_ficha(ficha: str, db: Session = Depends(get_db)):
-    archivos = db.query(ArchivoExcel).filter(ArchivoExcel.ficha == ficha, ArchivoExcel.activo == True).all()
+def obtener_archivo_por_ficha(
+    ficha: str,
+    response: Response,
+    modalidad: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = 100,
+    db: Session = Depends(get_read_db)
+):
+    archivos, siguiente_cursor = consultar_historial(
+        db, ficha=ficha, modalidad=modalidad, usuario_id=usuario_id,
+        desde=desde, hasta=hasta, cursor=cursor, limite=limite
+    )
 
-    if not archivos:
+    if not archivos and not cursor:
         raise HTTPException(status_code=404, detail="No se encontraron archivos para esta ficha")
+    _con_cursor(response, siguiente_cursor)
 
     return [ 
         {
@@ -91,66 +221,74 @@ def obtener_archivo_por_ficha(ficha: str, db: Session = Depends(get_db)):
                 "nombre": archivo.usuario.nombre,
                 "apellidos": archivo.usuario.apellidos,
                 "rol": archivo.usuario.rol
-            }
+            } if archivo.usuario else None
         }
         for archivo in archivos
     ]
 
 @router_format.get("/archivo/historial")
-def obtener_historila_completo(db: Session = Depends(get_db)):
-    archivos = db.query(ArchivoExcel).join(Usuarios).filter(ArchivoExcel.activo == True).order_by(ArchivoExcel.fecha_creacion.desc()).all()
-
-    return [
-        {       
-            "id": archivo.id,
-            "nombre_original": archivo.nombre_original,
-            "ficha": archivo.ficha,
-            "modalidad": archivo.modalidad,
-            "cantidad_aprendices": archivo.cantidad_aprendices,
-            "fecha_creacion": archivo.fecha_creacion.isoformat(),
-            "tamaño_mb": round(archivo.tamaño_bytes / 1024 / 1024, 2),  # Convertir a MB
-            "generado_por":  f"{archivo.usuario.nombre} {archivo.usuario.apellidos}",
-            "rol_usuario": archivo.usuario.rol
-        }
-        for archivo in archivos
-    ]
+def obtener_historila_completo(
+    ficha: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = 100,
+    db: Session = Depends(get_read_db)
+):
+    # Solo las columnas de la respuesta; las filas se serializan sin armar objetos del ORM.
+    # JOIN interno como siempre: generado_por y rol_usuario nunca llegan en null
+    filas, siguiente_cursor = consultar_historial(
+        db, ficha=ficha, modalidad=modalidad, usuario_id=usuario_id,
+        desde=desde, hasta=hasta, cursor=cursor, limite=limite,
+        columnas=list(COLUMNAS_HISTORIAL_COMPLETO.values()), solo_con_usuario=True
+    )
+    return _con_cursor(respuesta_filas(filas, COLUMNAS_HISTORIAL_COMPLETO), siguiente_cursor)
 
 @router_format.get("/historial-exportaciones")
-def obtener_historial(db: Session = Depends(get_db)):
+def obtener_historial(
+    ficha: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = 100,
+    db: Session = Depends(get_read_db)
+):
     """
     Obtiene el historial de exportaciones de formatos F165.
+    Paginado por cursor: la cabecera X-Siguiente-Cursor trae el valor para pedir la pagina siguiente.
     """
-    archivos = db.query(ArchivoExcel)\
-    .filter(ArchivoExcel.activo == True)\
-    .order_by(ArchivoExcel.fecha_creacion.desc())\
-    .limit(100)\
-    .all()
+    filas, siguiente_cursor = consultar_historial(
+        db, ficha=ficha, modalidad=modalidad, usuario_id=usuario_id,
+        desde=desde, hasta=hasta, cursor=cursor, limite=limite,
+        columnas=list(COLUMNAS_HISTORIAL_EXPORTACIONES.values())
+    )
+    return _con_cursor(respuesta_filas(filas, COLUMNAS_HISTORIAL_EXPORTACIONES), siguiente_cursor)
 
-    return [
-        {
-            "id": archivo.id,
-            "nombre_": archivo.nombre_original,
-            "ruta_archivo": archivo.ruta_archivo,
-            "ficha": archivo.ficha,
-            "modalidad": archivo.modalidad,
-            "cantidad_aprendices": archivo.cantidad_aprendices,
-            "fecha_creacion": archivo.fecha_creacion.isoformat(),
-            "usuario_id": archivo.usuario_id,
-            "usuario_nombre": archivo.usuario.nombre,
-            "usuario_apellidos": archivo.usuario.apellidos,
-            "tamaño_mb": round(archivo.tamaño_bytes / 1024 / 1024, 2)  # Convertir a MB
-        }
-        for archivo in archivos
-    ]
+@router_format.post("/archivos/archivar")
+def archivar_exportaciones(background_tasks: BackgroundTasks, meses_activos: int = 3):
+    """
+    Empaqueta en zips mensuales las exportaciones anteriores a los ultimos `meses_activos` meses.
+    Las descargas siguen funcionando: el archivo se extrae del paquete cuando se pide.
+    """
+    if meses_activos < 1:
+        raise HTTPException(status_code=400, detail="meses_activos debe ser al menos 1")
+    background_tasks.add_task(archivar_exportaciones_background, meses_activos)
+    return {"message": "Archivado de exportaciones iniciado", "meses_activos": meses_activos}
 
 @router_format.get("/descargar-archivo/{id_archivo}")
-def descargar_archivo(id_archivo: int, db: Session = Depends(get_db)):
+def descargar_archivo(id_archivo: int, request: Request, db: Session = Depends(get_db)):
     archivo_descargar = db.query(ArchivoExcel).filter(ArchivoExcel.id == id_archivo).first()
+    if not archivo_descargar:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
 
-    ruta_completa = os.path.join(UPLOAD_DIR, archivo_descargar.ruta_archivo)
-    
-    return FileResponse(
-        path=ruta_completa,
-        filename=archivo_descargar.nombre_original,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    # El verificador en segundo plano ya dejo el estado de integridad calculado
+    try:
+        ruta_completa = format_service.obtene_archivo_para_descarga(archivo_descargar)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+    return respuesta_descarga(request, ruta_completa, archivo_descargar.nombre_original, archivo_descargar.hash_archivo)
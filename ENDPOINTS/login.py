@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Response, Request
-from sqlalchemy.orm import Session
-from connection import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from connection import get_async_db
 from MODELS import Usuarios
 from MODELS.token_blacklist import TokenBlacklist
 from SCHEMAS.login_schemas import LoginSchema, UserResponse
@@ -10,7 +12,7 @@ import logging
 from FUNCIONES.FUNCIONES_TOKENS.tokens_service import (
     create_access_token, 
     create_refresh_token, 
-    verify_token, 
+    verify_token_async, 
     get_current_user,
     pwd_context,
     oauth2_scheme,
@@ -33,7 +35,7 @@ logger = logging.getLogger(__name__) #-> usando como nombre el modulo actual
 #    "response" para poder setear cookies,
 #    "login_data" con las credenciales del usuario,
 #    y una sesión activa a la base de datos.
-async def login(response: Response, login_data: LoginSchema, db: Session = Depends(get_db)):
+async def login(response: Response, login_data: LoginSchema, db: AsyncSession = Depends(get_async_db)):
     # Log: mostramos quién intenta iniciar sesión
     logger.info(f"Intento de inicio de sesión para: {login_data.correo}")
     
@@ -41,10 +43,11 @@ async def login(response: Response, login_data: LoginSchema, db: Session = Depen
     sanitized_correo = InputSanitizer.sanitize_string(login_data.correo)
     
     # Verificar si el usuario existe en la base de datos
-    user = db.query(Usuarios).filter(Usuarios.correo == sanitized_correo).first()
+    user = await db.scalar(select(Usuarios).where(Usuarios.correo == sanitized_correo))
     
     # Si el usuario no existe o la contraseña no coincide, devolvemos error
-    if not user or not pwd_context.verify(login_data.contraseña, user.contraseña):
+    # (bcrypt tarda cientos de ms a propósito: se verifica en un hilo para no detener el ciclo de eventos)
+    if not user or not await run_in_threadpool(pwd_context.verify, login_data.contraseña, user.contraseña):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
 
     # ==================== CREACIÓN DE TOKENS ====================
@@ -93,12 +96,12 @@ async def login(response: Response, login_data: LoginSchema, db: Session = Depen
 # -> "response": para dar respuesta al frontend
 # -> "db": sesion en la base de datos
 # -> "token": token que espera recibir para invalidar
-async def logout(response: Response, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def logout(response: Response, db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)):
     # si el token existe hacemos la siguiente operación
     if token:
         try:
             # verificamos el pauload del token, que sea tipo "access"
-            payload = verify_token(token, db, expected_type="access")
+            payload = await verify_token_async(token, db, expected_type="access")
             # obtenemos el jti "identificador unico"
             jti = payload.get("jti")
             # obtenemos la expiracion
@@ -108,7 +111,7 @@ async def logout(response: Response, db: Session = Depends(get_db), token: str =
                 # primero convertimos a datetime, formato legible para python
                 expires_at = datetime.fromtimestamp(exp, tz=timezone.utc) #-> UTC, estandar de JWT
                 db.add(TokenBlacklist(jti=jti, expires_at=expires_at)) # -> despúes agregamos ese access token a el blacklist
-                db.commit() #-> actualizamos la base de datos
+                await db.commit() #-> actualizamos la base de datos
         except HTTPException:
             # Ignorar si el token ya es inválido, el objetivo es desloguear
             pass
@@ -126,7 +129,7 @@ async def logout(response: Response, db: Session = Depends(get_db), token: str =
 # -> "request": la peticion del frontend
 # -> "response": para dar respuesta al frontned
 # -> "db": sesión en la base de datos
-async def refresh(request: Request, response: Response, db: Session = Depends(get_db)):
+async def refresh(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     try:
         # === DEBUG DE COOKIES Y HEADERS ===
         # Revisamos cookies y origen de la petición para depurar (en este momento solo desarrollo)
@@ -152,7 +155,7 @@ async def refresh(request: Request, response: Response, db: Session = Depends(ge
         logger.info(f"✅ Refresh token encontrado: {refresh_token[:20]}...")
         
         # Verificar el refresh token (que cumpla con lo que la función solicita)
-        payload = verify_token(refresh_token, db, expected_type="refresh")
+        payload = await verify_token_async(refresh_token, db, expected_type="refresh")
         
 
         # === INVALIDACION DE TOKENS ===
@@ -163,9 +166,10 @@ async def refresh(request: Request, response: Response, db: Session = Depends(ge
                 # guardamos en datatime legible para python
                 expires_at = datetime.fromtimestamp(old_exp, tz=timezone.utc) # -> aseguramos que se interprete en UTC, el estandat de los JWT
                 db.add(TokenBlacklist(jti=old_jti, expires_at=expires_at)) # -> agregamos a la balck list en la base de datos
-                db.commit() # -> actualizamos
+                await db.commit() # -> actualizamos
                 logger.info(f"Token antiguo añadido a blacklist: {old_jti}") # -> mostramos que se agrego correctamente
             except Exception as e:
+                await db.rollback()
                 logger.error(f"Error añadiendo token a blacklist: {str(e)}") # -> si algo falla lanzamos la excepcion
 
         # Verificar usuario, del token
@@ -177,7 +181,7 @@ async def refresh(request: Request, response: Response, db: Session = Depends(ge
             )
             
         # Hacemos una consulata  al base de datos para verificar el usuario
-        user = db.query(Usuarios).filter(Usuarios.correo == user_email).first()
+        user = await db.scalar(select(Usuarios).where(Usuarios.correo == user_email))
         if not user:
             logger.warning(f"Usuario no encontrado: {user_email}")
             raise HTTPException(
@@ -0,0 +1,64 @@
+import time
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from connection import crear, crear_background, crear_async, motores_replica, motores_replica_async
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import cache_respuestas
+
+router_salud = APIRouter()
+
+
+def _estado_motor(motor) -> dict:
+    """Hace un SELECT 1 y devuelve la latencia junto con las estadisticas del pool"""
+    datos = {}
+    inicio = time.perf_counter()
+    try:
+        with motor.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+        datos["status"] = "ok"
+    except Exception as e:
+        datos["status"] = "error"
+        datos["error"] = str(e)
+    datos["latencia_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+    datos["pool"] = motor.pool.estadisticas()
+    return datos
+
+
+async def _estado_motor_async(motor) -> dict:
+    datos = {}
+    inicio = time.perf_counter()
+    try:
+        async with motor.connect() as conexion:
+            await conexion.execute(text("SELECT 1"))
+        datos["status"] = "ok"
+    except Exception as e:
+        datos["status"] = "error"
+        datos["error"] = str(e)
+    datos["latencia_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+    datos["pool"] = motor.pool.estadisticas()
+    return datos
+
+
+@router_salud.get("/health/db")
+async def salud_base_datos():
+    """
+    Estado de la base de datos y de los pools de conexiones (API, API async, segundo plano y replicas).
+    en_uso/overflow/espera_* sirven para dimensionar DB_POOL_SIZE y DB_MAX_OVERFLOW.
+    """
+    resultado = {
+        "api": await run_in_threadpool(_estado_motor, crear),
+        "api_async": await _estado_motor_async(crear_async),
+        "background": await run_in_threadpool(_estado_motor, crear_background),
+    }
+    for i, (motor, motor_async) in enumerate(zip(motores_replica, motores_replica_async)):
+        resultado[f"replica_{i}"] = await run_in_threadpool(_estado_motor, motor)
+        resultado[f"replica_{i}_async"] = await _estado_motor_async(motor_async)
+    ok = all(motor["status"] == "ok" for motor in resultado.values())
+    return JSONResponse(status_code=200 if ok else 503, content={"status": "ok" if ok else "error", **resultado})
+
+
+@router_salud.get("/health/cache")
+def salud_cache():
+    """Aciertos/fallos de la cache de respuestas de fichas y aprendices (por proceso)"""
+    return cache_respuestas.estadisticas()
@@ -4,7 +4,9 @@ from SCHEMAS.usuario_schemas import UsuarioResponse, Rol, UsuarioCreate, Usuario
 from sqlalchemy.orm import Session
 from FUNCIONES.FUNCIONES_USUARIOS.generador_contraseñas import generar_contraseña
 from typing import List
-from connection import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from connection import get_db, get_async_db
 import bcrypt
 from passlib.context import CryptContext
 
@@ -14,16 +16,16 @@ router_usuarios = APIRouter()
 
 # Obtener todos los usuarios
 @router_usuarios.get("/usuarios/", response_model=List[UsuarioResponse])
-async def obtener_usuarios(db: Session = Depends(get_db)):
+async def obtener_usuarios(db: AsyncSession = Depends(get_async_db)):
     try:
-        usuarios = db.query(Usuarios).all()
+        usuarios = (await db.scalars(select(Usuarios))).all()
         return usuarios
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Eliminar un usuario por su ID
 @router_usuarios.post("/usuarios/{usuario_id}", status_code=204)
-async def eliminar_usuario(usuario_id: int, eliminar_request: UsuarioDelete, db: Session = Depends(get_db)):
+def eliminar_usuario(usuario_id: int, eliminar_request: UsuarioDelete, db: Session = Depends(get_db)):
     """
     Elimina un usuario de la base de datos por su ID.
 
@@ -56,7 +58,7 @@ async def eliminar_usuario(usuario_id: int, eliminar_request: UsuarioDelete, db:
     
 # Crear un nuevo usuario
 @router_usuarios.post("/usuarios/", response_model=UsuarioResponse)
-async def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
+def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
 
     """
     Crea un nuevo usuario en la base de datos.
@@ -102,7 +104,7 @@ async def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
 
 
 @router_usuarios.put("/usuarios/{usuario_id}", response_model=UsuarioResponse)
-async def actualizar_usuario(usuario_id: int, usuario: UsuarioCreate, db: Session = Depends(get_db)):
+def actualizar_usuario(usuario_id: int, usuario: UsuarioCreate, db: Session = Depends(get_db)):
     """
     Actualiza los datos de un usuario existente en la base de datos.
 
@@ -141,7 +143,7 @@ async def actualizar_usuario(usuario_id: int, usuario: UsuarioCreate, db: Sessio
         raise HTTPException(status_code=500, detail=str(e))
 
 @router_usuarios.patch("/usuarios/{usuario_id}", response_model=UsuarioResponse)
-async def cambiar_contraseña(usuario_id: int, db: Session = Depends(get_db)):
+def cambiar_contraseña(usuario_id: int, db: Session = Depends(get_db)):
     """
     Obtiene los datos de un usuario por su ID.
 
@@ -0,0 +1,124 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from MODELS.aprendices import Aprendiz
+from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import normalizar_firma, guardar_firmas_normalizadas, url_firma
+from FUNCIONES.FUNCIONES_FICHAS.resumen_fichas import registrar_aprendices
+from FUNCIONES.FUNCIONES_CACHE.versiones import incrementar_revision
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import invalidar_aprendiz
+
+
+def actualizar_aprendices_lote(db: Session, items: list, url_base: str) -> dict:
+    """
+    Aplica los cambios de varios aprendices (AprendizActualizarLoteItem) en una sola transaccion:
+    - una consulta IN carga los aprendices y otra comprueba los documentos nuevos,
+    - cada firma distinta se normaliza una vez y el almacen se consulta una sola vez,
+    - los cambios se escriben con UPDATE por llave primaria en bloque (executemany),
+    - el resumen y la revision se actualizan una vez por ficha.
+    Un aprendiz con error (no existe, firma invalida, documento repetido u ocupado) no detiene
+    al resto: queda en los resultados con su mensaje y no se modifica.
+    """
+    resultados = [None] * len(items)
+
+    def fallar(indice: int, mensaje: str):
+        resultados[indice] = {"documento": items[indice].documento, "success": False, "error": mensaje}
+
+    existentes = {
+        fila.documento: fila
+        for fila in db.query(
+            Aprendiz.id_aprendiz, Aprendiz.documento, Aprendiz.ficha_numero, Aprendiz.editado
+        ).filter(Aprendiz.documento.in_({item.documento for item in items}))
+    }
+
+    # Documentos nuevos que ya pertenecen a otro aprendiz (chocarian con el indice unico)
+    nuevos = {
+        item.cambios.documento for item in items
+        if item.cambios.documento and item.cambios.documento != item.documento
+    }
+    ocupados = {d for (d,) in db.query(Aprendiz.documento).filter(Aprendiz.documento.in_(nuevos))} if nuevos else set()
+
+    firmas_normalizadas = {}  # firma recibida -> (contenido, hash): la misma firma para varios se procesa una vez
+    almacen = {}  # hash -> contenido de las firmas que se usan en el lote
+    filas_update = []
+    actualizados = []  # (documento anterior, documento final, ficha)
+    vistos = set()
+    editados_por_ficha = Counter()
+    ahora = datetime.utcnow()
+
+    for i, item in enumerate(items):
+        fila = existentes.get(item.documento)
+        if fila is None:
+            fallar(i, f"Aprendiz con {item.documento} no encontrado")
+            continue
+        if item.documento in vistos:
+            fallar(i, f"El aprendiz {item.documento} está repetido en el lote")
+            continue
+
+        cambios = item.cambios.dict(exclude_unset=True)
+        documento_final = cambios.get("documento") or item.documento
+        if documento_final != item.documento and (documento_final in ocupados or documento_final in vistos):
+            fallar(i, f"El documento {documento_final} ya está registrado")
+            continue
+
+        valores = {"id_aprendiz": fila.id_aprendiz}
+        resultado = {"documento": item.documento, "success": True, "campos_actualizados": sorted(cambios)}
+        if "firma" in cambios:
+            firma_data = cambios.pop("firma")
+            if firma_data:
+                if firma_data not in firmas_normalizadas:
+                    try:
+                        firmas_normalizadas[firma_data] = normalizar_firma(firma_data)
+                    except ValueError as e:
+                        fallar(i, str(e))
+                        continue
+                contenido, firma_hash = firmas_normalizadas[firma_data]
+                almacen[firma_hash] = contenido
+            else:
+                firma_hash = None
+            valores["firma_hash"] = firma_hash
+            valores["firma"] = None  # La version original ya no se guarda en la fila del aprendiz
+            resultado["firma"] = url_firma(documento_final, firma_hash, url_base)
+
+        vistos.update({item.documento, documento_final})
+        resultados[i] = resultado
+        if len(valores) == 1 and not cambios:
+            continue  # Sin cambios: como en el PATCH individual, no se marca como editado
+
+        valores.update(cambios)
+        valores["editado"] = True
+        valores["ultima_actualizacion"] = ahora
+        filas_update.append(valores)
+        actualizados.append((item.documento, documento_final, fila.ficha_numero))
+        if not fila.editado:
+            editados_por_ficha[fila.ficha_numero] += 1
+
+    try:
+        if filas_update:
+            guardar_firmas_normalizadas(db, almacen)
+            db.flush()  # Las firmas nuevas deben existir antes del UPDATE (llave foranea firma_hash)
+            db.execute(update(Aprendiz), filas_update)
+
+            for ficha, editados in editados_por_ficha.items():
+                if ficha:
+                    registrar_aprendices(db, ficha, Counter(), editados=editados)
+            for ficha in {ficha for _, _, ficha in actualizados}:
+                incrementar_revision(db, ficha)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for documento, documento_final, ficha in actualizados:
+        invalidar_aprendiz(documento, ficha)
+        if documento_final != documento:
+            invalidar_aprendiz(documento_final)
+
+    errores = sum(1 for r in resultados if not r["success"])
+    return {
+        "success": errores == 0,
+        "message": f"{len(items) - errores} aprendices actualizados, {errores} con errores",
+        "actualizados": len(items) - errores,
+        "errores": errores,
+        "resultados": resultados,
+    }
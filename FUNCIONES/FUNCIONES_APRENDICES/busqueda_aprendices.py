@@ -0,0 +1,78 @@
+import re
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.mysql import match
+from MODELS.aprendices import Aprendiz
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 50
+# Palabras mas cortas no estan en el indice FULLTEXT de InnoDB (innodb_ft_min_token_size = 3)
+LONGITUD_MINIMA_FULLTEXT = 3
+
+# Lo que devuelve cada resultado, en el orden de las columnas de la consulta
+CAMPOS_BUSQUEDA = {
+    "documento": Aprendiz.documento,
+    "nombre": Aprendiz.nombre,
+    "apellido": Aprendiz.apellido,
+    "ficha_numero": Aprendiz.ficha_numero,
+    "estado": Aprendiz.estado,
+}
+
+
+def _terminos(q: str) -> list:
+    """Palabras de la busqueda, sin los operadores del modo booleano de MySQL"""
+    return re.sub(r'[+\-<>()~*"@]', " ", q).split()
+
+
+def _prefijo_like(termino: str) -> str:
+    """Patron LIKE 'termino%' escapando los comodines que escriba el usuario"""
+    return termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _rango_prefijo(columna, prefijo: str):
+    """
+    col >= 'prefijo' AND col < siguiente prefijo: lo mismo que LIKE 'prefijo%' pero lo resuelve
+    el indice en cualquier motor (SQLite no usa indices con LIKE sobre columnas sin NOCASE)
+    """
+    return and_(columna >= prefijo, columna < prefijo[:-1] + chr(ord(prefijo[-1]) + 1))
+
+
+def consulta_busqueda(dialecto: str, q: str, ficha: Optional[str] = None, estado: Optional[str] = None,
+                      limite: int = LIMITE_POR_DEFECTO):
+    """
+    Arma la consulta de busqueda por prefijo de aprendices, apoyada en los indices de busqueda:
+    - solo digitos: rango de prefijo del documento (indice unico de documento, en orden de documento),
+    - MySQL: MATCH(nombre, apellido) AGAINST('+pal1* +pal2*' IN BOOLEAN MODE) sobre el indice FULLTEXT,
+      de modo que "juan gom" encuentra a "JUAN CARLOS GOMEZ",
+    - otros motores (o palabras de menos de 3 letras): cada palabra debe ser prefijo del nombre
+      o del apellido (LIKE 'palabra%' sobre ix_aprendices_nombre / ix_aprendices_apellido; en MySQL
+      la collation no distingue mayusculas y usa el indice, en SQLite se recorre la tabla).
+    """
+    terminos = _terminos(q or "")
+    if not terminos:
+        raise HTTPException(status_code=400, detail="Debe indicar el texto a buscar (q)")
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    consulta = select(*CAMPOS_BUSQUEDA.values())
+    if len(terminos) == 1 and terminos[0].isdigit():
+        consulta = consulta.where(_rango_prefijo(Aprendiz.documento, terminos[0])).order_by(Aprendiz.documento)
+    elif dialecto == "mysql" and all(len(t) >= LONGITUD_MINIMA_FULLTEXT for t in terminos):
+        consulta = consulta.where(
+            match(Aprendiz.nombre, Aprendiz.apellido, against=" ".join(f"+{t}*" for t in terminos)).in_boolean_mode()
+        )
+    else:
+        consulta = consulta.where(and_(*[
+            or_(
+                Aprendiz.nombre.like(_prefijo_like(t), escape="\\"),
+                Aprendiz.apellido.like(_prefijo_like(t), escape="\\")
+            )
+            for t in terminos
+        ]))
+
+    if ficha:
+        consulta = consulta.where(Aprendiz.ficha_numero == ficha)
+    if estado:
+        consulta = consulta.where(Aprendiz.estado == estado)
+    # Sin ORDER BY (salvo por documento): la consulta se detiene al juntar `limite` coincidencias
+    return consulta.limit(limite)
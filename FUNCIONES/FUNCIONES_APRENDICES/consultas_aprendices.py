@@ -0,0 +1,96 @@
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from MODELS.aprendices import Aprendiz
+from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import url_firma, cargar_firmas, firma_a_data_url
+
+# Campos que se pueden pedir con ?fields= y la columna de la que sale cada uno
+CAMPOS_APRENDIZ = {
+    "id": Aprendiz.id_aprendiz,
+    "id_aprendiz": Aprendiz.id_aprendiz,
+    "documento": Aprendiz.documento,
+    "tipo_documento": Aprendiz.tipo_documento,
+    "nombre": Aprendiz.nombre,
+    "apellido": Aprendiz.apellido,
+    "celular": Aprendiz.celular,
+    "correo": Aprendiz.correo,
+    "direccion": Aprendiz.direccion,
+    "departamento": Aprendiz.departamento,
+    "municipio": Aprendiz.municipio,
+    "estado": Aprendiz.estado,
+    "discapacidad": Aprendiz.discapacidad,
+    "tipo_discapacidad": Aprendiz.tipo_discapacidad,
+    "editado": Aprendiz.editado,
+    "ficha_numero": Aprendiz.ficha_numero,
+    "ultima_actualizacion": Aprendiz.ultima_actualizacion,
+    "firma_hash": Aprendiz.firma_hash,
+    "firma": Aprendiz.firma_hash,  # Se devuelve como URL (o data URL con include_firma)
+}
+
+# Lo que usa la pantalla de la ficha cuando ya tiene un archivo generado
+CAMPOS_POR_DEFECTO = [
+    "id", "documento", "nombre", "apellido", "celular", "correo", "direccion", "tipo_documento",
+    "estado", "discapacidad", "tipo_discapacidad", "firma", "editado",
+]
+
+# Sin archivo generado la respuesta trae todas las columnas del aprendiz con sus nombres del modelo:
+# el formulario F165 se llena con ellas (departamento y municipio van a las celdas C14/D14)
+CAMPOS_SIN_ARCHIVO = [
+    "id_aprendiz", "documento", "nombre", "apellido", "correo", "celular", "direccion", "departamento",
+    "municipio", "tipo_documento", "estado", "firma_hash", "ultima_actualizacion", "discapacidad",
+    "tipo_discapacidad", "editado", "ficha_numero", "firma",
+]
+
+
+def parsear_campos(fields: Optional[str]) -> Optional[list]:
+    """
+    Convierte ?fields=a,b,c en la lista de campos, validando contra CAMPOS_APRENDIZ.
+    Sin fields devuelve None: los campos por defecto dependen de si la ficha ya tiene archivo.
+    """
+    if not fields:
+        return None
+    campos = [c.strip() for c in fields.split(",") if c.strip()]
+    desconocidos = [c for c in campos if c not in CAMPOS_APRENDIZ]
+    if desconocidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos: {', '.join(desconocidos)}. Disponibles: {', '.join(CAMPOS_APRENDIZ)}"
+        )
+    return campos
+
+
+def consulta_aprendices_ficha(db: Session, numero_ficha: str, campos: list):
+    """Consulta (sin ejecutar) de las columnas `campos` de los aprendices de la ficha"""
+    return db.query(*[CAMPOS_APRENDIZ[c].label(c) for c in campos]).filter(Aprendiz.ficha_numero == numero_ficha)
+
+
+def consulta_aprendiz_en_ficha(numero_ficha: str, documento: str):
+    """Aprendiz de la ficha con el documento dado (indice ficha_numero + documento)"""
+    return select(Aprendiz).where(Aprendiz.ficha_numero == numero_ficha, Aprendiz.documento == documento)
+
+
+def consultar_aprendices_ficha(db: Session, numero_ficha: str, campos: list, url_base: str,
+                               include_firma: bool = False) -> list:
+    """
+    Consulta solo las columnas pedidas de los aprendices de la ficha (nunca la fila completa).
+    La firma se devuelve como URL absoluta (ver url_firma); con include_firma se incluye como
+    data URL, cargada en una sola consulta extra.
+    """
+    # El documento siempre se necesita para armar la URL de la firma
+    columnas_consulta = list(dict.fromkeys(campos + (["documento"] if "firma" in campos else [])))
+    filas = consulta_aprendices_ficha(db, numero_ficha, columnas_consulta).all()
+
+    firmas = cargar_firmas(db, (fila.firma for fila in filas)) if include_firma and "firma" in campos else None
+
+    resultado = []
+    for fila in filas:
+        # La fila trae las columnas en el orden de campos (documento extra, si se agrego, va al final)
+        datos = dict(zip(campos, fila))
+        if "firma" in campos:
+            if firmas is not None:
+                datos["firma"] = firma_a_data_url(firmas[fila.firma]) if fila.firma in firmas else ""
+            else:
+                datos["firma"] = url_firma(fila.documento, fila.firma, url_base)
+        resultado.append(datos)
+    return resultado
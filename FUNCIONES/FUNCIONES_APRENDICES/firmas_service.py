@@ -0,0 +1,176 @@
+import base64
+import binascii
+import hashlib
+import os
+from io import BytesIO
+from fastapi import Request
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.orm import Session, undefer
+from connection import SessionBackground
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import invalidar_todo
+from MODELS.aprendices import Aprendiz
+from MODELS.firma_aprendiz import FirmaAprendiz
+
+# La firma se dibuja en el F165 a 120x50; guardamos el doble para que se vea nitida al imprimir
+ANCHO_FIRMA = 240
+ALTO_FIRMA = 100
+MARGEN_RECORTE = 4  # Pixeles que se dejan alrededor del trazo al recortar
+
+# URL publica de la API (API_URL_PUBLICA en el .env, por ejemplo https://api.sena.edu.co). El frontend
+# se sirve desde otro origen, asi que la URL de la firma debe ser absoluta; sin configurarla se usa
+# la URL con la que llego la peticion (detras de un proxy: uvicorn --proxy-headers)
+API_URL_PUBLICA = os.getenv("API_URL_PUBLICA", "").rstrip("/")
+
+
+def normalizar_firma(firma_data: str) -> tuple:
+    """
+    Convierte la firma recibida del cliente (data URL o base64 de un PNG del canvas) en un PNG
+    pequeño: recorta el espacio vacio, reduce al tamaño de visualizacion del F165 y lo
+    re-codifica en escala de grises con transparencia.
+
+    Returns:
+        (bytes del PNG normalizado, hash SHA256 en hexadecimal)
+
+    Raises:
+        ValueError: si el contenido no es una imagen valida.
+    """
+    # Eliminar encabezado si existe
+    if "," in firma_data:
+        firma_data = firma_data.split(",", 1)[1]
+    try:
+        imagen = Image.open(BytesIO(base64.b64decode(firma_data)))
+        imagen.load()
+    except (binascii.Error, UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"La firma no es una imagen válida: {e}") from e
+
+    imagen = imagen.convert("RGBA")
+
+    # El trazo es lo que no es transparente; si el canvas no tiene transparencia, lo que no es blanco
+    alfa = imagen.getchannel("A")
+    if alfa.getextrema()[0] == 255:
+        trazo = ImageOps.invert(imagen.convert("L"))
+    else:
+        trazo = alfa
+    caja = trazo.point(lambda p: 255 if p > 16 else 0).getbbox()
+    if caja is None:
+        raise ValueError("La firma está vacía")
+
+    izquierda, arriba, derecha, abajo = caja
+    imagen = imagen.crop((
+        max(izquierda - MARGEN_RECORTE, 0),
+        max(arriba - MARGEN_RECORTE, 0),
+        min(derecha + MARGEN_RECORTE, imagen.width),
+        min(abajo + MARGEN_RECORTE, imagen.height),
+    ))
+    imagen.thumbnail((ANCHO_FIRMA, ALTO_FIRMA), Image.LANCZOS)
+
+    salida = BytesIO()
+    imagen.convert("LA").save(salida, format="PNG", optimize=True)
+    contenido = salida.getvalue()
+    return contenido, hashlib.sha256(contenido).hexdigest()
+
+
+def firma_a_data_url(contenido: bytes) -> str:
+    """Data URL del PNG normalizado, con el mismo formato que envia el frontend"""
+    return "data:image/png;base64," + base64.b64encode(contenido).decode("ascii")
+
+
+def url_base_api(request: Request) -> str:
+    """Base absoluta (sin "/" final) para las URLs que la API devuelve al frontend"""
+    return API_URL_PUBLICA or str(request.base_url).rstrip("/")
+
+
+def url_firma(documento: str, firma_hash, url_base: str) -> str:
+    """
+    URL absoluta de la firma del aprendiz (url_base viene de url_base_api). Incluye una version
+    derivada del hash, de modo que la URL cambia cuando cambia la firma y el navegador puede
+    guardarla en cache indefinidamente.
+    """
+    if not firma_hash:
+        return ""
+    return f"{url_base}/aprendices/{documento}/firma?v={firma_hash[:16]}"
+
+
+def guardar_firma(db: Session, firma_data: str) -> str:
+    """Normaliza la firma, la guarda en el almacen (si no existia ya) y devuelve su hash"""
+    contenido, firma_hash = normalizar_firma(firma_data)
+    if db.get(FirmaAprendiz, firma_hash) is None:
+        db.add(FirmaAprendiz(hash=firma_hash, contenido=contenido, tamaño_bytes=len(contenido)))
+        # Sin relationship entre los modelos el flush no ordena el INSERT de la firma antes del
+        # UPDATE del aprendiz que la referencia (llave foranea firma_hash)
+        db.flush()
+    return firma_hash
+
+
+def guardar_firmas_normalizadas(db: Session, firmas: dict) -> None:
+    """Guarda en el almacen las firmas ya normalizadas {hash: contenido} que no existan (una sola consulta)"""
+    if not firmas:
+        return
+    existentes = {h for (h,) in db.query(FirmaAprendiz.hash).filter(FirmaAprendiz.hash.in_(firmas))}
+    for firma_hash, contenido in firmas.items():
+        if firma_hash not in existentes:
+            db.add(FirmaAprendiz(hash=firma_hash, contenido=contenido, tamaño_bytes=len(contenido)))
+
+
+def aplicar_firma(db: Session, aprendiz: Aprendiz, firma_data) -> None:
+    """Asigna una firma nueva al aprendiz (None o "" la eliminan)"""
+    aprendiz.firma_hash = guardar_firma(db, firma_data) if firma_data else None
+    aprendiz.firma = None  # La version original ya no se guarda en la fila del aprendiz
+
+
+def cargar_firmas(db: Session, hashes) -> dict:
+    """Carga en una sola consulta el contenido de varias firmas: {hash: bytes}"""
+    hashes = {h for h in hashes if h}
+    if not hashes:
+        return {}
+    return dict(
+        db.query(FirmaAprendiz.hash, FirmaAprendiz.contenido).filter(FirmaAprendiz.hash.in_(hashes)).all()
+    )
+
+
+def normalizar_firmas_existentes(tamaño_lote: int = 200) -> dict:
+    """Migra al almacen las firmas guardadas antes de la normalizacion (columna firma en texto)"""
+    session = SessionBackground()
+    migradas = 0
+    invalidas = 0
+    ultimo_id = 0
+    try:
+        while True:
+            aprendices = session.query(Aprendiz).options(undefer(Aprendiz.firma)).filter(
+                Aprendiz.id_aprendiz > ultimo_id,
+                Aprendiz.firma.isnot(None),
+                Aprendiz.firma_hash.is_(None)
+            ).order_by(Aprendiz.id_aprendiz).limit(tamaño_lote).all()
+            if not aprendices:
+                break
+
+            for aprendiz in aprendices:
+                try:
+                    aplicar_firma(session, aprendiz, aprendiz.firma)
+                    session.flush()  # Para que la misma firma repetida en el lote no se inserte dos veces
+                    migradas += 1
+                except ValueError as e:
+                    print(f"⚠️ Firma inválida para {aprendiz.documento}: {e}")
+                    invalidas += 1
+            ultimo_id = aprendices[-1].id_aprendiz
+            session.commit()
+            print(f"📝 Firmas migradas: {migradas}")
+
+        # Firmas que ya no referencia ningun aprendiz (fueron reemplazadas)
+        huerfanas = session.query(FirmaAprendiz).filter(
+            ~session.query(Aprendiz.id_aprendiz).filter(Aprendiz.firma_hash == FirmaAprendiz.hash).exists()
+        ).delete(synchronize_session=False)
+        session.commit()
+        invalidar_todo()  # Las URLs de firma de las respuestas guardadas cambiaron
+
+        return {"migradas": migradas, "invalidas": invalidas, "huerfanas_eliminadas": huerfanas}
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    # Uso: python -m FUNCIONES.FUNCIONES_APRENDICES.firmas_service
+    print(normalizar_firmas_existentes())
@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Response
+from FUNCIONES.FUNCIONES_CONSULTAS.serializacion import a_json
+
+
+class BackendMemoria:
+    """
+    Backend en memoria del proceso: LRU con vencimiento por TTL.
+    Cada worker de uvicorn tiene su propia copia; la invalidacion solo alcanza al proceso
+    que hizo el cambio, por eso el TTL debe ser corto (acota cuanto puede durar un dato viejo).
+    """
+
+    def __init__(self, maximo_entradas: int = 2000):
+        self.maximo_entradas = maximo_entradas
+        self._datos = OrderedDict()  # clave -> (vence_en, valor)
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)  # Usada recientemente
+            return entrada[1]
+
+    def guardar(self, clave: str, valor: bytes, ttl: float):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo_entradas:
+                self._datos.popitem(last=False)
+
+    def eliminar_prefijo(self, prefijo: str) -> int:
+        with self._lock:
+            claves = [c for c in self._datos if c.startswith(prefijo)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class BackendNulo:
+    """Backend que no guarda nada (CACHE_BACKEND=ninguno): desactiva la cache sin tocar los endpoints"""
+
+    def obtener(self, clave):
+        return None
+
+    def guardar(self, clave, valor, ttl):
+        pass
+
+    def eliminar_prefijo(self, prefijo):
+        return 0
+
+    def limpiar(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class CacheRespuestas:
+    """
+    Cache de lectura (read-through) de respuestas JSON ya serializadas.
+    Cualquier objeto con obtener/guardar/eliminar_prefijo/limpiar sirve como backend.
+    """
+
+    def __init__(self, backend, ttl: float = 60):
+        self.backend = backend
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener_o_calcular(self, clave: str, calcular) -> bytes:
+        """Devuelve la respuesta guardada o la calcula con calcular() y la guarda"""
+        contenido = self.backend.obtener(clave)
+        if contenido is not None:
+            self.aciertos += 1
+            return contenido
+        self.fallos += 1
+        contenido = a_json(calcular())
+        self.backend.guardar(clave, contenido, self.ttl)
+        return contenido
+
+    async def obtener_o_calcular_async(self, clave: str, calcular) -> bytes:
+        """Igual que obtener_o_calcular, con calcular() asincrono"""
+        contenido = self.backend.obtener(clave)
+        if contenido is not None:
+            self.aciertos += 1
+            return contenido
+        self.fallos += 1
+        contenido = a_json(await calcular())
+        self.backend.guardar(clave, contenido, self.ttl)
+        return contenido
+
+    def invalidar(self, prefijo: str):
+        self.invalidaciones += self.backend.eliminar_prefijo(prefijo)
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "backend": type(self.backend).__name__,
+            "entradas": len(self.backend),
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 3) if total else 0.0,
+            "invalidaciones": self.invalidaciones,
+        }
+
+
+def _crear_backend():
+    if os.getenv("CACHE_BACKEND", "memoria") == "ninguno":
+        return BackendNulo()
+    return BackendMemoria(maximo_entradas=int(os.getenv("CACHE_MAX_ENTRADAS", 2000)))
+
+
+cache_respuestas = CacheRespuestas(_crear_backend(), ttl=float(os.getenv("CACHE_TTL_SEGUNDOS", 60)))
+
+
+def respuesta_cacheada(contenido: bytes) -> Response:
+    return Response(content=contenido, media_type="application/json")
+
+
+# ==================== CLAVES E INVALIDACION ====================
+# Todo lo de una ficha cuelga de "ficha:{numero}:" para poder invalidarlo de una vez
+
+def clave_ficha(numero_ficha: str, *partes) -> str:
+    return ":".join(["ficha", str(numero_ficha), *map(str, partes)])
+
+
+def clave_aprendiz(documento: str, *partes) -> str:
+    # Termina en ":" para que invalidar "aprendiz:123:" no alcance a "aprendiz:1234:"
+    return ":".join(["aprendiz", str(documento), *map(str, partes)]) + ":"
+
+
+def invalidar_ficha(numero_ficha: str):
+    """Descarta las respuestas de la ficha (aprendices, individuales, informacion adicional)"""
+    if numero_ficha:
+        cache_respuestas.invalidar(clave_ficha(numero_ficha, ""))
+
+
+def invalidar_aprendiz(documento: str, numero_ficha: str = None):
+    """Descarta la respuesta del aprendiz y las de su ficha, que lo incluyen"""
+    cache_respuestas.invalidar(clave_aprendiz(documento))
+    invalidar_ficha(numero_ficha)
+
+
+def invalidar_todo():
+    """Para cambios masivos (archivo maestro): mas simple que rastrear cada ficha"""
+    cache_respuestas.backend.limpiar()
+    cache_respuestas.invalidaciones += 1
@@ -0,0 +1,75 @@
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from MODELS import Aprendiz, Ficha
+from FUNCIONES.FUNCIONES_FORMATOS.descargas import etag_coincide
+
+# Las respuestas pueden cambiar en cualquier momento: el navegador guarda, pero siempre revalida
+CACHE_CONTROL_REVALIDAR = "private, no-cache"
+
+
+def incrementar_revision(db: Session, numero_ficha: str):
+    """
+    Sube el contador de revision de la ficha. Se llama en cada escritura que cambia lo que
+    devuelven sus endpoints de lectura. No hace commit: viaja en la transaccion de la escritura.
+    """
+    if numero_ficha:
+        db.execute(
+            update(Ficha).where(Ficha.numero_ficha == numero_ficha).values(revision=func.coalesce(Ficha.revision, 0) + 1),
+            execution_options={"synchronize_session": False}
+        )
+
+
+def revision_ficha(db: Session, numero_ficha: str):
+    """Revision actual de la ficha (None si no existe), para los endpoints con sesion sincrona"""
+    return db.query(Ficha.revision).filter(Ficha.numero_ficha == numero_ficha).scalar()
+
+
+def consulta_version_ficha(numero_ficha: str):
+    """Revision, MAX(ultima_actualizacion) y total de aprendices de la ficha (ver version_ficha)"""
+    return (
+        select(Ficha.revision, func.max(Aprendiz.ultima_actualizacion), func.count(Aprendiz.id_aprendiz))
+        .outerjoin(Aprendiz, Aprendiz.ficha_numero == Ficha.numero_ficha)
+        .where(Ficha.numero_ficha == numero_ficha)
+        .group_by(Ficha.revision)
+    )
+
+
+async def version_ficha(db: AsyncSession, numero_ficha: str):
+    """
+    Token de version de la ficha: revision + MAX(ultima_actualizacion) y total de sus aprendices.
+    Una consulta agregada sobre el indice (ficha_numero, ultima_actualizacion). None si la ficha no existe.
+    """
+    fila = (await db.execute(consulta_version_ficha(numero_ficha))).first()
+    return None if fila is None else f"{fila[0] or 0}-{fila[1]}-{fila[2]}"
+
+
+async def version_aprendiz(db: AsyncSession, documento: str):
+    """Token de version de un aprendiz: su ultima_actualizacion y la revision de su ficha"""
+    fila = (await db.execute(
+        select(Aprendiz.ultima_actualizacion, Ficha.revision)
+        .outerjoin(Ficha, Ficha.numero_ficha == Aprendiz.ficha_numero)
+        .where(Aprendiz.documento == documento)
+    )).first()
+    return None if fila is None else f"{fila[1] or 0}-{fila[0]}"
+
+
+def calcular_etag(version: str, *variante) -> str:
+    """ETag debil de la representacion: la version de los datos mas los parametros que cambian el cuerpo"""
+    return '"' + hashlib.sha1(":".join(map(str, (version, *variante))).encode()).hexdigest()[:20] + '"'
+
+
+def no_modificado(request: Request, etag: str):
+    """Respuesta 304 si el cliente ya tiene esta version, None si hay que enviar el cuerpo"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_coincide(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": f"W/{etag}", "Cache-Control": CACHE_CONTROL_REVALIDAR})
+    return None
+
+
+def con_etag(respuesta: Response, etag: str) -> Response:
+    respuesta.headers["ETag"] = f"W/{etag}"
+    respuesta.headers["Cache-Control"] = CACHE_CONTROL_REVALIDAR
+    return respuesta
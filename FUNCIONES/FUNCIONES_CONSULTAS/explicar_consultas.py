@@ -0,0 +1,77 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from connection import SessionBackground
+from FUNCIONES.FUNCIONES_CONSULTAS.paginacion import codificar_cursor
+from FUNCIONES.FUNCIONES_FORMATOS.consultas_historial import consulta_historial, consulta_exportacion_individual
+from FUNCIONES.FUNCIONES_APRENDICES.consultas_aprendices import (
+    consulta_aprendices_ficha, consulta_aprendiz_en_ficha, CAMPOS_POR_DEFECTO
+)
+from FUNCIONES.FUNCIONES_APRENDICES.busqueda_aprendices import consulta_busqueda
+from FUNCIONES.FUNCIONES_CACHE.versiones import consulta_version_ficha
+from FUNCIONES.FUNCIONES_FICHAS.consultas_fichas import consulta_listado_fichas
+
+FICHA_EJEMPLO = "0000000"
+CURSOR_HISTORIAL = codificar_cursor(["2000-01-01T00:00:00", 1])
+
+# Consultas de los endpoints mas usados, armadas con las mismas funciones que usan los endpoints
+# y valores de ejemplo (solo importa el plan)
+CONSULTAS_FRECUENTES = {
+    "archivos por ficha (/archivo/ficha)": lambda db: consulta_historial(db, ficha=FICHA_EJEMPLO),
+    "archivos por usuario (/archivos/usuario)": lambda db: consulta_historial(db, usuario_id=1),
+    "pagina de historial (/archivo/historial)": lambda db: consulta_historial(
+        db, cursor=CURSOR_HISTORIAL, solo_con_usuario=True
+    ),
+    "exportacion individual de un aprendiz": lambda db: consulta_exportacion_individual(FICHA_EJEMPLO, "0"),
+    "aprendices de una ficha (/ficha/{n}/aprendices)": lambda db: consulta_aprendices_ficha(
+        db, FICHA_EJEMPLO, CAMPOS_POR_DEFECTO
+    ),
+    "aprendiz dentro de su ficha (/individual)": lambda db: consulta_aprendiz_en_ficha(FICHA_EJEMPLO, "0"),
+    "version de una ficha (ETag)": lambda db: consulta_version_ficha(FICHA_EJEMPLO),
+    "busqueda de aprendices por documento (/aprendices/search)": lambda db: consulta_busqueda(
+        db.bind.dialect.name, "100"
+    ),
+    "listado de fichas (/fichas/)": lambda db: consulta_listado_fichas().limit(51),
+    "pagina siguiente del listado de fichas": lambda db: consulta_listado_fichas(
+        cursor=codificar_cursor([FICHA_EJEMPLO])
+    ).limit(51),
+}
+
+
+def _usa_indice(db: Session, sql: str) -> tuple:
+    """
+    Ejecuta EXPLAIN y devuelve (usa indice, plan en texto).
+    Falla si alguna tabla del plan se recorre completa (SQLite: SCAN sin indice; MySQL: key NULL).
+    """
+    if db.bind.dialect.name == "sqlite":
+        pasos = [fila[-1] for fila in db.execute(text("EXPLAIN QUERY PLAN " + sql)).all()]
+        recorridos = [p for p in pasos if p.startswith("SCAN ") and " USING " not in p]
+        return not recorridos, "; ".join(pasos)
+    filas = db.execute(text("EXPLAIN " + sql)).mappings().all()
+    plan = "; ".join(f"{f['table']}: type={f['type']} key={f['key']}" for f in filas)
+    return all(f["key"] is not None for f in filas), plan
+
+
+def revisar_planes(db: Session) -> dict:
+    """Revisa con EXPLAIN que cada consulta frecuente use un indice: {nombre: (ok, plan)}"""
+    resultado = {}
+    for nombre, construir in CONSULTAS_FRECUENTES.items():
+        consulta = construir(db)
+        # Las consultas del ORM (db.query) exponen el SELECT en .statement
+        consulta = getattr(consulta, "statement", consulta)
+        sql = str(consulta.compile(bind=db.bind, compile_kwargs={"literal_binds": True}))
+        resultado[nombre] = _usa_indice(db, sql)
+    return resultado
+
+
+if __name__ == "__main__":
+    # Uso: python -m FUNCIONES.FUNCIONES_CONSULTAS.explicar_consultas (sale con 1 si alguna no usa indice)
+    # En tablas casi vacias MySQL puede preferir un recorrido completo; revisar con datos reales.
+    # La prueba tests/test_planes_consultas.py hace la misma revision sobre SQLite.
+    session = SessionBackground()
+    try:
+        planes = revisar_planes(session)
+    finally:
+        session.close()
+    for nombre, (ok, plan) in planes.items():
+        print(f"{'✅' if ok else '❌'} {nombre}: {plan}")
+    raise SystemExit(0 if all(ok for ok, _ in planes.values()) else 1)
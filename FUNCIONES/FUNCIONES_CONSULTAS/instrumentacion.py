@@ -0,0 +1,101 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Consultas que tarden mas que esto (en milisegundos) se registran con su endpoint
+UMBRAL_CONSULTA_LENTA_MS = float(os.getenv("DB_CONSULTA_LENTA_MS", 200))
+
+
+class ConteoConsultas:
+    """Consultas ejecutadas y tiempo total en la base de datos dentro de una peticion (o de un bloque)"""
+
+    def __init__(self, endpoint: str = "segundo plano", scope: Optional[dict] = None,
+                 padre: Optional["ConteoConsultas"] = None):
+        self.total = 0
+        self.tiempo = 0.0
+        self._endpoint = endpoint
+        self._scope = scope
+        self._padre = padre  # Conteo que envuelve a este (por ejemplo limite_consultas alrededor de una peticion)
+
+    @property
+    def endpoint(self) -> str:
+        # La ruta se conoce despues del enrutamiento (Starlette la agrega al mismo scope)
+        ruta = self._scope.get("route") if self._scope else None
+        return f"{self._endpoint} {ruta.path}" if ruta is not None and hasattr(ruta, "path") else self._endpoint
+
+    def registrar(self, duracion: float):
+        self.total += 1
+        self.tiempo += duracion
+        if self._padre is not None:
+            self._padre.registrar(duracion)
+
+    @property
+    def tiempo_ms(self) -> float:
+        return round(self.tiempo * 1000, 2)
+
+
+# Conteo de la peticion en curso. Es un objeto mutable: los endpoints sync (threadpool) y las
+# sesiones async (greenlet) reciben una copia del contexto, pero apuntan al mismo conteo.
+_conteo_actual: ContextVar[Optional[ConteoConsultas]] = ContextVar("conteo_consultas", default=None)
+
+
+def conteo_actual() -> Optional[ConteoConsultas]:
+    return _conteo_actual.get()
+
+
+@contextmanager
+def contar_consultas(endpoint: str = "segundo plano", scope: Optional[dict] = None):
+    """Cuenta las consultas (de cualquier motor) que se ejecuten dentro del bloque"""
+    conteo = ConteoConsultas(endpoint, scope, padre=_conteo_actual.get())
+    token = _conteo_actual.set(conteo)
+    try:
+        yield conteo
+    finally:
+        _conteo_actual.reset(token)
+
+
+@contextmanager
+def limite_consultas(maximo: int, endpoint: str = "bloque"):
+    """
+    Falla (AssertionError) si el bloque ejecuta mas de `maximo` consultas. Pensado para pruebas y
+    mediciones, por ejemplo con TestClient:
+
+        with limite_consultas(3):
+            cliente.get("/fichas/")
+
+    asi un N+1 en un listado aparece como error en lugar de como lentitud en produccion.
+    """
+    with contar_consultas(endpoint) as conteo:
+        yield conteo
+    assert conteo.total <= maximo, (
+        f"{endpoint}: se ejecutaron {conteo.total} consultas ({conteo.tiempo_ms} ms), el maximo es {maximo}"
+    )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("inicio_consultas")
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    conteo = _conteo_actual.get()
+    if conteo is not None:
+        conteo.registrar(duracion)
+    if duracion * 1000 >= UMBRAL_CONSULTA_LENTA_MS:
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s: %s",
+            duracion * 1000, conteo.endpoint if conteo is not None else "segundo plano",
+            " ".join(statement.split())[:1000]
+        )
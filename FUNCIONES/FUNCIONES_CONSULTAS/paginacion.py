@@ -0,0 +1,36 @@
+import base64
+import json
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def codificar_cursor(valores: list) -> str:
+    """Cursor opaco para paginacion por llave (keyset): JSON en base64 url-safe"""
+    datos = json.dumps(valores, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(datos).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, cantidad: int) -> list:
+    """Recupera los valores del cursor; un cursor manipulado o de otro listado es un 400"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+    return valores
+
+
+def filtro_keyset(columnas: list, valores: list, descendente: bool = False):
+    """
+    Condicion "despues de esta fila" para ordenar por varias columnas:
+    (a > va) OR (a = va AND b > vb) OR ... (o "<" si el orden es descendente).
+    Se expande en lugar de usar comparacion de tuplas para que el motor pueda usar los indices.
+    """
+    condiciones = []
+    for i, (columna, valor) in enumerate(zip(columnas, valores)):
+        iguales = [c == v for c, v in zip(columnas[:i], valores[:i])]
+        siguiente = columna < valor if descendente else columna > valor
+        condiciones.append(and_(*iguales, siguiente))
+    return or_(*condiciones)
@@ -0,0 +1,114 @@
+import json
+from dataclasses import make_dataclass
+from decimal import Decimal
+from functools import lru_cache
+from keyword import iskeyword
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa json de la libreria estandar (mismo resultado, mas lento)
+    orjson = None
+
+
+def _valor_json(valor):
+    """Tipos que orjson no conoce: Decimal (MySQL ROUND/SUM) como numero; el resto como lo haria FastAPI"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return jsonable_encoder(valor)
+
+
+def a_json(datos) -> bytes:
+    """
+    Serializa a JSON en UTF-8. Con orjson las fechas, enums, dicts y listas se convierten en C,
+    sin la pasada previa de jsonable_encoder que hace FastAPI por cada valor.
+    """
+    if orjson is not None:
+        return orjson.dumps(datos, default=_valor_json, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(datos), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """Clase de respuesta por defecto de la app (main.py): JSONResponse serializado con a_json"""
+
+    def render(self, content) -> bytes:
+        return a_json(content)
+
+
+def filas_a_dicts(filas, claves) -> list:
+    """
+    Convierte filas (Row de SQLAlchemy o tuplas) en objetos JSON emparejando por posicion con `claves`.
+    Las columnas sobrantes al final de la fila (por ejemplo la llave del cursor) se ignoran.
+    """
+    return [dict(zip(claves, fila)) for fila in filas]
+
+
+@lru_cache(maxsize=64)
+def _clase_fila(claves: tuple):
+    """
+    Clase con __slots__ (dataclass) para las filas con estas claves, o None si alguna clave no
+    sirve como nombre de atributo. orjson serializa estas instancias como objetos JSON leyendo
+    los slots en orden, sin armar un dict por fila.
+    """
+    if not all(clave.isidentifier() and not iskeyword(clave) for clave in claves):
+        return None
+    return make_dataclass("Fila", claves, slots=True, frozen=True)
+
+
+def filas_a_json(filas, claves) -> bytes:
+    """
+    Serializa las filas como lista de objetos JSON (igual que a_json(filas_a_dicts(filas, claves))).
+    Con orjson cada fila se envuelve en la clase de _clase_fila y se serializa directamente;
+    sin orjson (o con claves que no son identificadores) se pasa por filas_a_dicts.
+    """
+    claves = tuple(claves)
+    clase = _clase_fila(claves) if orjson is not None else None
+    if clase is None:
+        return a_json(filas_a_dicts(filas, claves))
+    total = len(claves)
+    return a_json([clase(*fila[:total]) for fila in filas])
+
+
+def respuesta_filas(filas, claves) -> Response:
+    """
+    Respuesta JSON (lista de objetos) armada directamente desde las filas de la consulta.
+    Se devuelve ya serializada: FastAPI no vuelve a pasar el contenido por jsonable_encoder.
+    """
+    return Response(content=filas_a_json(filas, claves), media_type="application/json")
+
+
+if __name__ == "__main__":
+    # Uso: python -m FUNCIONES.FUNCIONES_CONSULTAS.serializacion [filas]
+    # Compara el camino anterior (dict por fila + jsonable_encoder + json.dumps, lo que hace
+    # JSONResponse) con el nuevo (filas_a_json), sobre filas parecidas a /ficha/{n}/aprendices.
+    # La igualdad de ambos caminos la revisa tests/test_serializacion.py
+    import sys
+    import timeit
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    claves = ["id", "documento", "nombre", "apellido", "celular", "correo", "direccion", "tipo_documento",
+              "estado", "discapacidad", "tipo_discapacidad", "firma", "editado", "ultima_actualizacion"]
+    firma = "data:image/png;base64," + "iVBORw0KGgo" * 300  # Tamaño de una firma normalizada (~3 KB)
+    filas = [
+        (i, f"10{i:08d}", f"Nombre {i}", f"Apellido {i}", "3001234567", f"aprendiz{i}@correo.co",
+         "Calle 1 # 2-3", "CC", "EN FORMACION", "NO", None, firma, i % 2 == 0, datetime(2026, 1, 1, 8, 30))
+        for i in range(total)
+    ]
+    objetos = [SimpleNamespace(**dict(zip(claves, fila))) for fila in filas]
+
+    def camino_anterior():
+        datos = [{clave: getattr(objeto, clave) for clave in claves} for objeto in objetos]
+        return json.dumps(jsonable_encoder(datos), ensure_ascii=False).encode("utf-8")
+
+    def camino_nuevo():
+        return filas_a_json(filas, claves)
+
+    assert json.loads(camino_anterior()) == json.loads(camino_nuevo())
+    print(f"{total} filas, {len(camino_nuevo()) / 1024 / 1024:.1f} MB, orjson={'si' if orjson else 'no'}")
+    for nombre, funcion in (("anterior", camino_anterior), ("nuevo", camino_nuevo)):
+        tiempo = min(timeit.repeat(funcion, number=1, repeat=5))
+        print(f"  {nombre:<9} {tiempo * 1000:8.1f} ms")
@@ -0,0 +1,30 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def sentencia_upsert(dialecto: str, tabla: Table, llaves: list, actualizar: list):
+    """
+    INSERT que actualiza `actualizar` si la fila ya existe, con la sintaxis de cada motor:
+    ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT (llaves) DO UPDATE en SQLite y PostgreSQL.
+    Con `actualizar` vacio solo inserta las filas que falten (las existentes no se tocan).
+    """
+    if dialecto == "mysql":
+        sentencia = mysql.insert(tabla)
+        # MySQL no tiene DO NOTHING: asignar la llave a si misma no cambia la fila
+        columnas = actualizar or llaves[:1]
+        return sentencia.on_duplicate_key_update({columna: sentencia.inserted[columna] for columna in columnas})
+    if dialecto in ("sqlite", "postgresql"):
+        sentencia = (sqlite if dialecto == "sqlite" else postgresql).insert(tabla)
+        if not actualizar:
+            return sentencia.on_conflict_do_nothing(index_elements=llaves)
+        return sentencia.on_conflict_do_update(
+            index_elements=llaves, set_={columna: sentencia.excluded[columna] for columna in actualizar}
+        )
+    raise ValueError(f"Upsert no soportado para el motor {dialecto}")
+
+
+def upsert(db: Session, tabla: Table, filas: list, llaves: list, actualizar: list):
+    """Inserta o actualiza varias filas (dicts) en una sola sentencia executemany. No hace commit."""
+    if filas:
+        db.execute(sentencia_upsert(db.get_bind().dialect.name, tabla, llaves, actualizar), filas)
@@ -0,0 +1,192 @@
+import csv
+import io
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import Boolean, Date, DateTime, Integer, func, select
+from connection import SessionBackground
+from MODELS import Aprendiz, Ficha, FichaResumen
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin el paquete solo se exporta CSV
+    pa = None
+    pq = None
+
+# Filas por consulta: acota la memoria del volcado sin importar el tamaño de la tabla
+TAMAÑO_LOTE = 2000
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Columnas de cada volcado (nombre en el archivo -> expresion). Las firmas no se exportan.
+COLUMNAS_APRENDICES = {
+    "id": Aprendiz.id_aprendiz,
+    "documento": Aprendiz.documento,
+    "tipo_documento": Aprendiz.tipo_documento,
+    "nombre": Aprendiz.nombre,
+    "apellido": Aprendiz.apellido,
+    "correo": Aprendiz.correo,
+    "celular": Aprendiz.celular,
+    "direccion": Aprendiz.direccion,
+    "departamento": Aprendiz.departamento,
+    "municipio": Aprendiz.municipio,
+    "estado": Aprendiz.estado,
+    "discapacidad": Aprendiz.discapacidad,
+    "tipo_discapacidad": Aprendiz.tipo_discapacidad,
+    "editado": Aprendiz.editado,
+    "tiene_firma": Aprendiz.firma_hash.isnot(None),
+    "ficha_numero": Aprendiz.ficha_numero,
+    "ultima_actualizacion": Aprendiz.ultima_actualizacion,
+}
+
+COLUMNAS_FICHAS = {
+    "numero_ficha": Ficha.numero_ficha,
+    "programa": Ficha.programa,
+    "estado": Ficha.estado,
+    "fecha_inicio": Ficha.fecha_inicio,
+    "fecha_fin": Ficha.fecha_fin,
+    "fecha_reporte": Ficha.fecha_reporte,
+    "fecha_inicio_etapa_productiva": Ficha.fecha_inicio_prod,
+    "trimestre": Ficha.trimestre,
+    "nivel_formacion": Ficha.nivel_formacion,
+    "modalidad_formacion": Ficha.modalidad_formacion,
+    "jornada": Ficha.jornada,
+    # Totales del resumen mantenido por ficha (LEFT JOIN: fichas sin aprendices no tienen resumen)
+    "total_aprendices": func.coalesce(FichaResumen.total_aprendices, 0),
+    "total_editados": func.coalesce(FichaResumen.total_editados, 0),
+    "total_exportaciones": func.coalesce(FichaResumen.total_exportaciones, 0),
+}
+
+
+def consulta_aprendices(ficha: Optional[str] = None, estado: Optional[str] = None,
+                        desde: Optional[datetime] = None, hasta: Optional[datetime] = None):
+    """Volcado de aprendices; el rango de fechas es sobre ultima_actualizacion"""
+    consulta = select(*COLUMNAS_APRENDICES.values())
+    if ficha:
+        consulta = consulta.where(Aprendiz.ficha_numero == ficha)
+    if estado:
+        consulta = consulta.where(Aprendiz.estado == estado)
+    if desde:
+        consulta = consulta.where(Aprendiz.ultima_actualizacion >= desde)
+    if hasta:
+        consulta = consulta.where(Aprendiz.ultima_actualizacion <= hasta)
+    return consulta, Aprendiz.id_aprendiz
+
+
+def consulta_fichas(ficha: Optional[str] = None, estado: Optional[str] = None,
+                    desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Volcado de fichas con sus totales; el rango de fechas es sobre fecha_inicio"""
+    consulta = select(*COLUMNAS_FICHAS.values()).outerjoin(
+        FichaResumen, FichaResumen.numero_ficha == Ficha.numero_ficha
+    )
+    if ficha:
+        consulta = consulta.where(Ficha.numero_ficha == ficha)
+    if estado:
+        consulta = consulta.where(Ficha.estado == estado)
+    if desde:
+        consulta = consulta.where(Ficha.fecha_inicio >= desde)
+    if hasta:
+        consulta = consulta.where(Ficha.fecha_inicio <= hasta)
+    return consulta, Ficha.numero_ficha
+
+
+def _lotes(consulta, llave, tamaño_lote: int = TAMAÑO_LOTE):
+    """
+    Recorre la consulta por lotes de llave (WHERE llave > ultima ORDER BY llave LIMIT n).
+    Cada lote usa su propia sesion corta (la de la peticion ya se cerro cuando se envia el cuerpo) y
+    devuelve la conexion al pool antes de entregar las filas: un cliente lento no retiene una
+    conexion del pool de tareas de fondo (3 + 2) mientras descarga. Al paginar por llave cada fila
+    sale una sola vez aunque la tabla cambie entre lotes; las filas editadas entre lotes pueden salir
+    con el valor nuevo.
+    Se pagina por llave en lugar de un cursor del servidor (stream_results) porque mysql-connector no
+    lo soporta en SQLAlchemy: el resultado completo quedaria en memoria del driver.
+    """
+    consulta = consulta.add_columns(llave.label("_llave")).order_by(llave).limit(tamaño_lote)
+    ultima = None
+    while True:
+        session = SessionBackground()
+        try:
+            filas = session.execute(consulta if ultima is None else consulta.where(llave > ultima)).all()
+        finally:
+            session.close()
+        if filas:
+            yield filas
+        if len(filas) < tamaño_lote:
+            break
+        ultima = filas[-1]._llave
+
+
+def generar_csv(consulta, llave, columnas: dict):
+    """Genera el CSV por bloques (un bloque por lote). Con BOM para que Excel lea bien las tildes."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    total = len(columnas)
+    for filas in _lotes(consulta, llave):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(fila[:total] for fila in filas)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _tipo_arrow(tipo):
+    if isinstance(tipo, Boolean):
+        return pa.bool_()
+    if isinstance(tipo, Integer):
+        return pa.int64()
+    if isinstance(tipo, DateTime):
+        return pa.timestamp("us")
+    if isinstance(tipo, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _SalidaPorBloques:
+    """Archivo de solo escritura para ParquetWriter: acumula lo escrito hasta que se vacia"""
+
+    def __init__(self):
+        self.bloques = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self.bloques.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self.bloques)
+        self.bloques.clear()
+        return datos
+
+
+def generar_parquet(consulta, llave, columnas: dict):
+    """Genera el Parquet por bloques: cada lote es un row group que se envia apenas se escribe"""
+    esquema = pa.schema([(nombre, _tipo_arrow(expresion.type)) for nombre, expresion in columnas.items()])
+    salida = _SalidaPorBloques()
+    escritor = pq.ParquetWriter(salida, esquema)
+    try:
+        for filas in _lotes(consulta, llave):
+            escritor.write_table(pa.table(
+                [pa.array([fila[i] for fila in filas], type=campo.type) for i, campo in enumerate(esquema)],
+                schema=esquema
+            ))
+            yield salida.vaciar()
+    finally:
+        escritor.close()
+    yield salida.vaciar()  # Pie del archivo (metadatos)
@@ -5,6 +5,7 @@ procesamiento_estado = {}
 # Función para procesar archivo maestro en background
 def procesar_archivo_maestro_background(task_id: str, archivo_info: tuple):
     """Procesa el archivo maestro en segundo plano"""
+    procesador = None
     try:
         procesamiento_estado[task_id] = {
             "status": "processing",
@@ -28,4 +29,8 @@ def procesar_archivo_maestro_background(task_id: str, archivo_info: tuple):
             "archivo": archivo_info[1],
             "error": str(e),
             "mensaje": f"Error procesando archivo maestro: {str(e)}"
-        }
\ No newline at end of file
+        }
+    finally:
+        # Devolver la conexion al pool de segundo plano
+        if procesador is not None:
+            procesador.session.close()
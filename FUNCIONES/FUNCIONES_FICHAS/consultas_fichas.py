@@ -0,0 +1,51 @@
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from MODELS import Ficha, FichaResumen
+from FUNCIONES.FUNCIONES_CONSULTAS.paginacion import decodificar_cursor, filtro_keyset
+
+ORDENES_FICHAS = ("numero_ficha", "programa", "total_aprendices")
+
+
+def consulta_listado_fichas(
+    estado: Optional[str] = None,
+    programa: Optional[str] = None,
+    orden: str = "numero_ficha",
+    descendente: bool = False,
+    cursor: Optional[str] = None
+):
+    """
+    Arma (sin ejecutar ni limitar) la consulta del listado de fichas de GET /fichas/:
+    Fichas unida a FichasResumen (LEFT JOIN: fichas sin aprendices no tienen resumen),
+    filtros, llave del cursor y orden estable (columna elegida + numero_ficha como desempate).
+    """
+    if orden not in ORDENES_FICHAS:
+        raise HTTPException(status_code=400, detail=f"Orden no válido. Opciones: {', '.join(ORDENES_FICHAS)}")
+
+    # Los totales salen del resumen mantenido por ficha
+    total_aprendices = func.coalesce(FichaResumen.total_aprendices, 0)
+    columnas_orden = {
+        "numero_ficha": Ficha.numero_ficha,
+        "programa": func.coalesce(Ficha.programa, ""),
+        "total_aprendices": total_aprendices,
+    }
+
+    consulta = select(
+        Ficha.numero_ficha,
+        Ficha.programa,
+        Ficha.estado,
+        Ficha.fecha_reporte,
+        total_aprendices.label("total_aprendices"),
+        FichaResumen.total_editados,
+        FichaResumen.tiene_exportacion
+    ).outerjoin(FichaResumen, FichaResumen.numero_ficha == Ficha.numero_ficha)
+
+    if estado:
+        consulta = consulta.filter(Ficha.estado == estado)
+    if programa:
+        consulta = consulta.filter(Ficha.programa.ilike(f"%{programa}%"))
+
+    llave = [columnas_orden[orden], Ficha.numero_ficha] if orden != "numero_ficha" else [Ficha.numero_ficha]
+    if cursor:
+        consulta = consulta.filter(filtro_keyset(llave, decodificar_cursor(cursor, len(llave)), descendente))
+    return consulta.order_by(*[c.desc() if descendente else c.asc() for c in llave])
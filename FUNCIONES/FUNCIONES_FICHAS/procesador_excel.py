@@ -1,4 +1,4 @@
-from connection import crear, get_db, base, SessionLocal
+from connection import SessionBackground
 from MODELS import Ficha, Aprendiz, FichaMaestro
 from datetime import datetime
 from typing import List
@@ -7,10 +7,14 @@ import pandas as pd
 import tempfile
 import os
 import asyncio
+from collections import Counter
+from FUNCIONES.FUNCIONES_FICHAS.resumen_fichas import registrar_aprendices
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import invalidar_ficha
+from FUNCIONES.FUNCIONES_CACHE.versiones import incrementar_revision
 
 class ProcesadorArchivos:
     def __init__(self):
-        self.session = SessionLocal()
+        self.session = SessionBackground()
         self.fichas_maestro_cache = None
 
     def _cargar_fechas_maestro(self):
@@ -274,6 +278,7 @@ class ProcesadorArchivos:
             ])
 
             # Procesar cada aprendiz
+            estados_creados = Counter()  # Para actualizar el resumen de la ficha
             for i in range(df.height):
                 try:
                     fila = df.row(i, named=True)
@@ -301,6 +306,7 @@ class ProcesadorArchivos:
                         )
                         self.session.add(nuevo_aprendiz)
                         aprendices_creados += 1
+                        estados_creados[nuevo_aprendiz.estado] += 1
                         
                         if aprendices_creados % 10 == 0:
                             print(f"📝 Creados {aprendices_creados} aprendices...")
@@ -309,8 +315,14 @@ class ProcesadorArchivos:
                     print(f"❌ Error procesando fila {i+1}: {row_error}")
                     continue
 
+            # El resumen de la ficha se actualiza en la misma transaccion que los aprendices
+            if estados_creados:
+                registrar_aprendices(self.session, numero_ficha, estados_creados)
+            incrementar_revision(self.session, numero_ficha)
+
             # Commit final
             self.session.commit()
+            invalidar_ficha(numero_ficha)
             print(f"✅ Procesamiento completado: {fichas_creadas} fichas, {aprendices_creados} aprendices")
             return fichas_creadas, aprendices_creados
                 
@@ -1,5 +1,7 @@
-from connection import SessionLocal
+from connection import SessionBackground
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import invalidar_todo
 from MODELS import FichaMaestro
+from FUNCIONES.FUNCIONES_CONSULTAS.upsert import upsert
 from datetime import datetime
 import polars as pl
 import pandas as pd
@@ -8,8 +10,10 @@ import os
 
 # PASO 3: Clase para procesar archivo maestro
 class ProcesadorArchivoMaestro:
+    TAMAÑO_LOTE = 500  # Fichas por sentencia de upsert
+
     def __init__(self):
-        self.session = SessionLocal()
+        self.session = SessionBackground()
     
     def procesar_archivo_maestro(self, archivo_bytes: bytes, nombre_archivo: str):
         """Procesa el archivo maestro y actualiza la tabla FichasMaestro"""
@@ -53,53 +57,48 @@ class ProcesadorArchivoMaestro:
 
             print(f"✅ Filas válidas a procesar: {df_limpio.height}")
 
-            # Procesar cada fila
-            fichas_actualizadas = 0
-            fichas_creadas = 0
+            # Procesar cada fila (si una ficha se repite en el archivo, queda la ultima)
             fecha_actualizacion = datetime.now().date()
+            filas = {}
 
             for i in range(df_limpio.height):
                 try:
                     fila = df_limpio.row(i, named=True)
                     
                     numero_ficha = str(fila['identificador_ficha']).strip()
-                    fecha_inicio = self._convertir_fecha(fila['fecha_inicio'])
-                    fecha_fin = self._convertir_fecha(fila['fecha_fin'])
-
-                    # UPSERT en tabla maestro (Combinacion de Insertar y Actualizar)
-                    ficha_maestro = self.session.query(FichaMaestro).filter(
-                        FichaMaestro.numero_ficha == numero_ficha
-                    ).first()
-
-                    if ficha_maestro:
-                        # Actualizar
-                        ficha_maestro.fecha_inicio = fecha_inicio
-                        ficha_maestro.fecha_fin = fecha_fin
-                        ficha_maestro.fecha_actualizacion = fecha_actualizacion
-                        fichas_actualizadas += 1
-                    else:
-                        # Crear
-                        nueva_ficha_maestro = FichaMaestro(
-                            numero_ficha=numero_ficha,
-                            fecha_inicio=fecha_inicio,
-                            fecha_fin=fecha_fin,
-                            fecha_actualizacion=fecha_actualizacion
-                        )
-                        self.session.add(nueva_ficha_maestro)
-                        fichas_creadas += 1
-
-                    # Commit cada 100 registros
-                    if (fichas_actualizadas + fichas_creadas) % 100 == 0:
-                        self.session.commit()
-                        print(f"📝 Procesadas {fichas_actualizadas + fichas_creadas} fichas maestro...")
+                    filas[numero_ficha] = {
+                        "numero_ficha": numero_ficha,
+                        "fecha_inicio": self._convertir_fecha(fila['fecha_inicio']),
+                        "fecha_fin": self._convertir_fecha(fila['fecha_fin']),
+                        "fecha_actualizacion": fecha_actualizacion
+                    }
 
                 except Exception as row_error:
                     print(f"❌ Error procesando fila {i+1}: {row_error}")
                     continue
 
+            # UPSERT en tabla maestro (Combinacion de Insertar y Actualizar) por lotes:
+            # una sentencia por lote en lugar de una consulta y un INSERT/UPDATE por ficha
+            filas = list(filas.values())
+            fichas_actualizadas = 0
+            for inicio in range(0, len(filas), self.TAMAÑO_LOTE):
+                lote = filas[inicio:inicio + self.TAMAÑO_LOTE]
+                # Solo para el informe: cuantas de las fichas del lote ya existian
+                fichas_actualizadas += self.session.query(FichaMaestro.numero_ficha).filter(
+                    FichaMaestro.numero_ficha.in_([f["numero_ficha"] for f in lote])
+                ).count()
+                upsert(
+                    self.session, FichaMaestro.__table__, lote,
+                    llaves=["numero_ficha"], actualizar=["fecha_inicio", "fecha_fin", "fecha_actualizacion"]
+                )
+                self.session.commit()
+                print(f"📝 Procesadas {inicio + len(lote)} fichas maestro...")
+            fichas_creadas = len(filas) - fichas_actualizadas
+
             # Commit final
             self.session.commit()
             os.unlink(temp_path)
+            invalidar_todo()  # Cambian las fechas de muchas fichas a la vez
 
             return {
                 "archivo": nombre_archivo,
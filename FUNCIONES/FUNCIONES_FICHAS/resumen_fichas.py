@@ -0,0 +1,135 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from connection import SessionBackground
+from MODELS import Aprendiz, Ficha, ArchivoExcel, FichaResumen
+from FUNCIONES.FUNCIONES_CONSULTAS.upsert import upsert
+
+# Estado que se cuenta cuando el aprendiz no trae uno
+SIN_ESTADO = "SIN ESTADO"
+
+
+def _clave_estado(estado) -> str:
+    return estado.strip() if estado and estado.strip() else SIN_ESTADO
+
+
+def _obtener_resumen(db: Session, numero_ficha: str) -> FichaResumen:
+    """
+    Crea el resumen de la ficha si falta y lo obtiene bloqueando la fila.
+    Se crea con un insert que no falla si ya existe: un SELECT ... FOR UPDATE sobre una fila que no
+    existe no bloquea nada, y dos primeras escrituras a la vez (dos cargas, o carga y exportacion)
+    intentarian insertar las dos; la segunda perderia toda su transaccion por llave duplicada.
+    """
+    db.flush()  # La ficha puede estar aun pendiente en la sesion (llave foranea del resumen)
+    upsert(db, FichaResumen.__table__, [{
+        "numero_ficha": numero_ficha,
+        "total_aprendices": 0,
+        "aprendices_por_estado": {},
+        "total_editados": 0,
+        "total_exportaciones": 0,
+        "tiene_exportacion": False
+    }], llaves=["numero_ficha"], actualizar=[])
+    return db.query(FichaResumen).filter(
+        FichaResumen.numero_ficha == numero_ficha
+    ).with_for_update().one()
+
+
+def registrar_aprendices(db: Session, numero_ficha: str, estados: Counter, editados: int = 0):
+    """
+    Suma (o resta, con conteos negativos) aprendices al resumen de la ficha.
+    No hace commit: el cambio viaja en la misma transaccion que los aprendices.
+    """
+    resumen = _obtener_resumen(db, numero_ficha)
+    por_estado = dict(resumen.aprendices_por_estado or {})
+    for estado, cantidad in estados.items():
+        clave = _clave_estado(estado)
+        por_estado[clave] = por_estado.get(clave, 0) + cantidad
+        if por_estado[clave] <= 0:
+            del por_estado[clave]
+    # Se asigna un dict nuevo para que SQLAlchemy detecte el cambio en la columna JSON
+    resumen.aprendices_por_estado = por_estado
+    resumen.total_aprendices = (resumen.total_aprendices or 0) + sum(estados.values())
+    resumen.total_editados = (resumen.total_editados or 0) + editados
+
+
+def registrar_cambio_aprendiz(db: Session, numero_ficha: str, antes: tuple, despues: tuple):
+    """Ajusta el resumen tras editar un aprendiz. antes/despues son (estado, editado)."""
+    if antes == despues or not numero_ficha:
+        return
+    estados = Counter()
+    if _clave_estado(antes[0]) != _clave_estado(despues[0]):
+        estados[antes[0]] -= 1
+        estados[despues[0]] += 1
+    registrar_aprendices(db, numero_ficha, estados, editados=int(bool(despues[1])) - int(bool(antes[1])))
+
+
+def registrar_exportacion(db: Session, numero_ficha: str, archivo_id: int):
+    """Marca que la ficha tiene una exportacion nueva. No hace commit."""
+    resumen = _obtener_resumen(db, numero_ficha)
+    resumen.total_exportaciones = (resumen.total_exportaciones or 0) + 1
+    resumen.tiene_exportacion = True
+    resumen.ultimo_archivo_id = archivo_id
+
+
+def recalcular_resumen(db: Session, numero_ficha: str) -> FichaResumen:
+    """Recalcula desde cero el resumen de una ficha (tres consultas agregadas)"""
+    por_estado = Counter()
+    total_editados = 0
+    for estado, editado, cantidad in db.query(
+        Aprendiz.estado, Aprendiz.editado, func.count(Aprendiz.id_aprendiz)
+    ).filter(Aprendiz.ficha_numero == numero_ficha).group_by(Aprendiz.estado, Aprendiz.editado):
+        por_estado[_clave_estado(estado)] += cantidad
+        if editado:
+            total_editados += cantidad
+
+    total_exportaciones, ultimo_archivo_id = db.query(
+        func.count(ArchivoExcel.id), func.max(ArchivoExcel.id)
+    ).filter(ArchivoExcel.ficha == numero_ficha).one()
+
+    resumen = _obtener_resumen(db, numero_ficha)
+    resumen.total_aprendices = sum(por_estado.values())
+    resumen.aprendices_por_estado = dict(por_estado)
+    resumen.total_editados = total_editados
+    resumen.total_exportaciones = total_exportaciones
+    resumen.tiene_exportacion = total_exportaciones > 0
+    resumen.ultimo_archivo_id = ultimo_archivo_id
+    resumen.fecha_actualizacion = datetime.now()
+    return resumen
+
+
+def reconstruir_resumenes() -> dict:
+    """Recalcula el resumen de todas las fichas (para la carga inicial o si se desincroniza)"""
+    session = SessionBackground()
+    try:
+        fichas = [n for (n,) in session.query(Ficha.numero_ficha).order_by(Ficha.numero_ficha)]
+        for i, numero_ficha in enumerate(fichas, start=1):
+            recalcular_resumen(session, numero_ficha)
+            if i % 100 == 0:
+                session.commit()
+                print(f"📝 Resúmenes recalculados: {i}")
+        session.commit()
+        return {"fichas_recalculadas": len(fichas)}
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def resumen_a_dict(resumen: FichaResumen) -> dict:
+    return {
+        "numero_ficha": resumen.numero_ficha,
+        "total_aprendices": resumen.total_aprendices,
+        "aprendices_por_estado": resumen.aprendices_por_estado or {},
+        "total_editados": resumen.total_editados,
+        "total_exportaciones": resumen.total_exportaciones,
+        "tiene_exportacion": resumen.tiene_exportacion,
+        "ultimo_archivo_id": resumen.ultimo_archivo_id,
+        "fecha_actualizacion": resumen.fecha_actualizacion.isoformat() if resumen.fecha_actualizacion else None
+    }
+
+
+if __name__ == "__main__":
+    # Uso: python -m FUNCIONES.FUNCIONES_FICHAS.resumen_fichas
+    print(reconstruir_resumenes())
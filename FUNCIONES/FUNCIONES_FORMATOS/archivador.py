@@ -0,0 +1,206 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from connection import SessionBackground
+from MODELS.archivo_excel import ArchivoExcel
+
+# Compartido por todas las instancias del proceso (cada FormatoService crea su propio archivador)
+_lock_restauracion = threading.Lock()
+
+# Un archivo restaurado hace menos de esto no se poda: la descarga que lo pidio aun puede no haberlo abierto
+GRACIA_PODA_SEGUNDOS = 300
+
+
+class ArchivadorExportaciones:
+    """
+    Empaqueta los meses "frios" de archivos_exportados (año/mes/exportados/*.xlsx) en un
+    zip por mes y restaura miembros individuales bajo demanda en una cache pequeña.
+    El zip guarda un directorio central, asi que extraer un miembro no obliga a leer todo el paquete.
+    """
+
+    def __init__(self, base_path="archivos_exportados", meses_activos: int = 3, maximo_cache: int = 50):
+        self.base_path = Path(base_path)
+        self.meses_activos = meses_activos  # Meses que se dejan como archivos sueltos
+        self.maximo_cache = maximo_cache  # Cantidad de archivos restaurados que se conservan
+        self.ruta_paquetes = self.base_path / "archivo_frio"
+        self.ruta_cache = self.base_path / ".cache_restaurados"
+
+    # ==================== ARCHIVADO ====================
+
+    def _mes_de_ruta(self, ruta_archivo: str):
+        """Extrae (año, mes) de la ruta relativa generada por obtener_ruta_organizada"""
+        partes = Path(ruta_archivo).parts
+        return int(partes[0]), int(partes[1])
+
+    def _empaquetar_mes(self, año: int, mes: int, archivos: list) -> list:
+        """
+        Agrega los archivos del mes a su paquete y devuelve los que quedaron archivados.
+        Se trabaja sobre una copia temporal del zip para no dejar un paquete a medias si algo falla.
+        """
+        self.ruta_paquetes.mkdir(parents=True, exist_ok=True)
+        ruta_paquete = self.ruta_paquetes / f"{año}-{mes:02d}.zip"
+        temporal = ruta_paquete.with_suffix(".tmp")
+        if ruta_paquete.exists():
+            shutil.copy2(ruta_paquete, temporal)
+
+        archivados = []
+        with zipfile.ZipFile(temporal, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as paquete:
+            existentes = set(paquete.namelist())
+            for archivo_db in archivos:
+                ruta_suelta = self.base_path / archivo_db.ruta_archivo
+                if archivo_db.nombre_interno not in existentes:
+                    if not ruta_suelta.is_file():
+                        print(f"⚠️ No se archiva {archivo_db.id}: el archivo no existe")
+                        continue
+                    paquete.write(ruta_suelta, arcname=archivo_db.nombre_interno)
+                archivados.append(archivo_db)
+
+        # Verificar lo escrito antes de tocar la BD o borrar los archivos sueltos
+        with zipfile.ZipFile(temporal) as paquete:
+            for archivo_db in archivados:
+                with paquete.open(archivo_db.nombre_interno) as miembro:
+                    if self._hash_stream(miembro) != archivo_db.hash_archivo:
+                        raise ValueError(f"Hash distinto al empaquetar el archivo {archivo_db.id}")
+
+        os.replace(temporal, ruta_paquete)
+        return archivados
+
+    def archivar_meses_frios(self) -> dict:
+        """Empaqueta todos los meses anteriores al limite de meses activos"""
+        # Primer dia del mes mas antiguo que se conserva suelto
+        hoy = datetime.now()
+        indice_mes = hoy.year * 12 + (hoy.month - 1) - (self.meses_activos - 1)
+        limite = datetime(indice_mes // 12, indice_mes % 12 + 1, 1)
+
+        session = SessionBackground()
+        try:
+            pendientes = session.query(ArchivoExcel).filter(
+                ArchivoExcel.archivo_contenedor.is_(None),
+                ArchivoExcel.fecha_creacion < limite
+            ).all()
+
+            por_mes = defaultdict(list)
+            for archivo_db in pendientes:
+                try:
+                    por_mes[self._mes_de_ruta(archivo_db.ruta_archivo)].append(archivo_db)
+                except (ValueError, IndexError):
+                    print(f"⚠️ Ruta con formato inesperado, se omite: {archivo_db.ruta_archivo}")
+
+            total_archivados = 0
+            for (año, mes), archivos in sorted(por_mes.items()):
+                archivados = self._empaquetar_mes(año, mes, archivos)
+                ruta_paquete = (self.ruta_paquetes / f"{año}-{mes:02d}.zip").relative_to(self.base_path)
+                for archivo_db in archivados:
+                    archivo_db.archivo_contenedor = str(ruta_paquete)
+                    archivo_db.miembro_contenedor = archivo_db.nombre_interno
+                    archivo_db.huella_verificacion = None  # La huella era del archivo suelto
+                session.commit()
+
+                # Solo despues del commit se borran los archivos sueltos
+                for archivo_db in archivados:
+                    ruta_suelta = self.base_path / archivo_db.ruta_archivo
+                    if ruta_suelta.exists():
+                        ruta_suelta.unlink()
+                carpeta_mes = self.base_path / str(año) / str(mes)
+                if carpeta_mes.exists() and not any(carpeta_mes.rglob("*.xlsx")):
+                    shutil.rmtree(carpeta_mes, ignore_errors=True)
+
+                total_archivados += len(archivados)
+                print(f"📦 Mes {año}-{mes:02d} archivado: {len(archivados)} archivos")
+
+            return {"meses_archivados": len(por_mes), "archivos_archivados": total_archivados}
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    # ==================== RESTAURACION ====================
+
+    @staticmethod
+    def _hash_stream(stream) -> str:
+        sha256 = hashlib.sha256()
+        while chunk := stream.read(1024 * 1024):
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def _podar_cache(self):
+        """Mantiene solo los archivos restaurados usados mas recientemente (y los que estan en su periodo de gracia)"""
+        usos = []
+        for restaurado in self.ruta_cache.glob("*.xlsx"):
+            try:
+                usos.append((restaurado.stat().st_mtime, restaurado))
+            except FileNotFoundError:
+                pass
+        limite_gracia = time.time() - GRACIA_PODA_SEGUNDOS
+        for ultimo_uso, sobrante in sorted(usos, reverse=True)[self.maximo_cache:]:
+            if ultimo_uso >= limite_gracia:
+                continue
+            try:
+                sobrante.unlink()
+            except FileNotFoundError:
+                pass
+
+    def restaurar(self, archivo_db: ArchivoExcel) -> Path:
+        """
+        Devuelve una ruta local al archivo, extrayendolo del paquete si no esta en la cache.
+        Cada extraccion escribe en su propio temporal y lo renombra de forma atomica: otro worker
+        que restaure el mismo archivo a la vez nunca deja uno a medias en la cache.
+        """
+        ruta_restaurada = self.ruta_cache / f"{archivo_db.hash_archivo}.xlsx"
+        with _lock_restauracion:
+            try:
+                os.utime(ruta_restaurada)  # Marca de uso reciente para la poda
+                return ruta_restaurada
+            except FileNotFoundError:
+                pass
+
+            ruta_paquete = self.base_path / archivo_db.archivo_contenedor
+            if not ruta_paquete.is_file():
+                raise FileNotFoundError(f"Paquete no encontrado: {archivo_db.archivo_contenedor}")
+
+            self.ruta_cache.mkdir(parents=True, exist_ok=True)
+            destino = tempfile.NamedTemporaryFile(dir=self.ruta_cache, suffix=".tmp", delete=False)
+            temporal = Path(destino.name)
+            try:
+                sha256 = hashlib.sha256()
+                with destino, zipfile.ZipFile(ruta_paquete) as paquete:
+                    try:
+                        miembro = paquete.open(archivo_db.miembro_contenedor)
+                    except KeyError:
+                        raise FileNotFoundError(f"El paquete no contiene {archivo_db.miembro_contenedor}")
+                    with miembro:
+                        while chunk := miembro.read(1024 * 1024):
+                            sha256.update(chunk)
+                            destino.write(chunk)
+
+                if sha256.hexdigest() != archivo_db.hash_archivo:
+                    raise FileNotFoundError(f"El archivo archivado esta corrupto: {archivo_db.nombre_interno}")
+                os.replace(temporal, ruta_restaurada)
+            except BaseException:
+                temporal.unlink(missing_ok=True)
+                raise
+
+            self._podar_cache()
+            return ruta_restaurada
+
+
+def archivar_exportaciones_background(meses_activos: int = 3):
+    """Tarea en segundo plano que empaqueta los meses frios"""
+    try:
+        resultado = ArchivadorExportaciones(meses_activos=meses_activos).archivar_meses_frios()
+        print(f"✅ Archivado completado: {resultado}")
+    except Exception as e:
+        print(f"❌ Error archivando exportaciones: {e}")
+
+
+if __name__ == "__main__":
+    # Uso: python -m FUNCIONES.FUNCIONES_FORMATOS.archivador
+    print(ArchivadorExportaciones().archivar_meses_frios())
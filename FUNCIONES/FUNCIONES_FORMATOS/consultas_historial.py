@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session, contains_eager
+from MODELS.archivo_excel import ArchivoExcel
+from MODELS.a_usuarios import Usuarios
+from FUNCIONES.FUNCIONES_CONSULTAS.paginacion import codificar_cursor, decodificar_cursor, filtro_keyset
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+def consulta_historial(
+    db: Session,
+    ficha: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_POR_DEFECTO,
+    columnas: Optional[list] = None,
+    solo_con_usuario: bool = False
+):
+    """
+    Arma (sin ejecutar) la consulta de una pagina del historial: filtros, llave del cursor, orden
+    y limite + 1 (la fila extra indica si hay pagina siguiente). Ver consultar_historial; la usa
+    tambien la revision de planes (FUNCIONES_CONSULTAS/explicar_consultas.py).
+    """
+    if columnas:
+        # La llave del cursor va al final de la fila; filas_a_dicts ignora las columnas sobrantes
+        consulta = db.query(
+            *columnas, ArchivoExcel.fecha_creacion.label("_cursor_fecha"), ArchivoExcel.id.label("_cursor_id")
+        ).select_from(ArchivoExcel)
+    else:
+        consulta = db.query(ArchivoExcel).options(contains_eager(ArchivoExcel.usuario))
+    consulta = consulta.join(ArchivoExcel.usuario) if solo_con_usuario else consulta.outerjoin(ArchivoExcel.usuario)
+    consulta = consulta.filter(ArchivoExcel.activo == True)
+
+    if ficha:
+        consulta = consulta.filter(ArchivoExcel.ficha == ficha)
+    if modalidad:
+        consulta = consulta.filter(ArchivoExcel.modalidad == modalidad)
+    if usuario_id is not None:
+        consulta = consulta.filter(ArchivoExcel.usuario_id == usuario_id)
+    if desde:
+        consulta = consulta.filter(ArchivoExcel.fecha_creacion >= desde)
+    if hasta:
+        consulta = consulta.filter(ArchivoExcel.fecha_creacion <= hasta)
+
+    llave = [ArchivoExcel.fecha_creacion, ArchivoExcel.id]
+    if cursor:
+        fecha, ultimo_id = decodificar_cursor(cursor, 2)
+        try:
+            fecha = datetime.fromisoformat(fecha)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor no válido")
+        consulta = consulta.filter(filtro_keyset(llave, [fecha, ultimo_id], descendente=True))
+
+    return consulta.order_by(ArchivoExcel.fecha_creacion.desc(), ArchivoExcel.id.desc()).limit(limite + 1)
+
+
+def consultar_historial(
+    db: Session,
+    ficha: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_POR_DEFECTO,
+    columnas: Optional[list] = None,
+    solo_con_usuario: bool = False
+) -> tuple:
+    """
+    Pagina de archivos activos, del mas reciente al mas antiguo, con el usuario cargado en la
+    misma consulta (JOIN). La paginacion es por llave (fecha_creacion, id), asi que el costo de
+    cada pagina no depende de cuantas paginas haya antes.
+
+    Con `columnas` (expresiones de ArchivoExcel/Usuarios) no se cargan entidades: cada resultado
+    es una fila con esas columnas, lista para serializar sin pasar por objetos del ORM.
+    Con `solo_con_usuario` el JOIN es interno y se omiten los archivos sin usuario (como hacia
+    /archivo/historial); si no, es LEFT JOIN y esos archivos llegan con el usuario en NULL.
+
+    Returns:
+        (lista de ArchivoExcel o de filas, cursor de la pagina siguiente o None)
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    archivos = consulta_historial(
+        db, ficha=ficha, modalidad=modalidad, usuario_id=usuario_id, desde=desde, hasta=hasta,
+        cursor=cursor, limite=limite, columnas=columnas, solo_con_usuario=solo_con_usuario
+    ).all()
+
+    siguiente_cursor = None
+    if len(archivos) > limite:
+        archivos = archivos[:limite]
+        ultimo = archivos[-1]
+        if columnas:
+            siguiente_cursor = codificar_cursor([ultimo._cursor_fecha.isoformat(), ultimo._cursor_id])
+        else:
+            siguiente_cursor = codificar_cursor([ultimo.fecha_creacion.isoformat(), ultimo.id])
+    return archivos, siguiente_cursor
+
+
+def consulta_exportacion_individual(numero_ficha: str, documento: str):
+    """Primera exportacion individual del aprendiz en su ficha (indice ficha + aprendiz_documento)"""
+    return select(ArchivoExcel.id).where(
+        ArchivoExcel.ficha == numero_ficha,
+        ArchivoExcel.aprendiz_documento == documento
+    ).limit(1)
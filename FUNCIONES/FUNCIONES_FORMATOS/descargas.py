@@ -0,0 +1,142 @@
+import os
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+import anyio
+from fastapi import Request
+from starlette.responses import Response
+
+MEDIA_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class RespuestaArchivo(Response):
+    """
+    Envia un archivo (o una porcion de el) sin cargarlo en memoria.
+    Si el servidor ASGI ofrece la extension "http.response.zerocopysend" se le entrega
+    el descriptor para que use sendfile(); si no, se lee por bloques con pread en un hilo.
+    """
+    tamaño_bloque = 256 * 1024
+
+    def __init__(self, ruta: Path, inicio: int, longitud: int, status_code: int = 200,
+                 headers: Optional[dict] = None, media_type: str = MEDIA_TYPE_XLSX, enviar_cuerpo: bool = True):
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.ruta = ruta
+        self.inicio = inicio
+        self.longitud = longitud
+        self.enviar_cuerpo = enviar_cuerpo
+        self.headers["content-length"] = str(longitud)
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if not self.enviar_cuerpo or self.longitud == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        fd = await anyio.to_thread.run_sync(os.open, str(self.ruta), os.O_RDONLY)
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                # Camino sin copias: el servidor llama a sendfile() con el descriptor
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": fd,
+                    "offset": self.inicio,
+                    "count": self.longitud,
+                    "more_body": False,
+                })
+                return
+
+            posicion = self.inicio
+            restante = self.longitud
+            while restante > 0:
+                bloque = await anyio.to_thread.run_sync(os.pread, fd, min(self.tamaño_bloque, restante), posicion)
+                if not bloque:
+                    break
+                posicion += len(bloque)
+                restante -= len(bloque)
+                await send({"type": "http.response.body", "body": bloque, "more_body": restante > 0})
+            if restante > 0:
+                # El archivo se acorto mientras se enviaba: cerramos la respuesta igualmente
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    """Comparacion debil de If-None-Match (RFC 9110): ignora el prefijo W/"""
+    if if_none_match.strip() == "*":
+        return True
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return any(e.removeprefix("W/") == etag for e in etiquetas)
+
+
+def _parsear_rango(rango: str, tamaño: int):
+    """
+    Interpreta un header Range de un solo intervalo.
+    Devuelve (inicio, fin) inclusivo, None si se debe enviar el archivo completo,
+    o lanza ValueError si el rango no es satisfacible.
+    """
+    unidad, _, especificacion = rango.partition("=")
+    if unidad.strip().lower() != "bytes" or "," in especificacion:
+        return None  # Multiples rangos o unidades desconocidas: se envia todo (permitido por la RFC)
+
+    inicio_str, _, fin_str = especificacion.strip().partition("-")
+    es_sufijo = inicio_str == ""  # bytes=-N: los ultimos N bytes
+    try:
+        if es_sufijo:
+            sufijo = int(fin_str)
+        else:
+            inicio = int(inicio_str)
+            fin = int(fin_str) if fin_str else tamaño - 1
+    except ValueError:
+        return None  # Header mal formado: se ignora
+
+    if es_sufijo:
+        # bytes=-0, o cualquier sufijo sobre un archivo vacio, no es satisfacible
+        if sufijo <= 0 or tamaño == 0:
+            raise ValueError("Rango vacio")
+        return max(tamaño - sufijo, 0), tamaño - 1
+
+    if inicio >= tamaño or inicio > fin:
+        raise ValueError("Rango fuera del archivo")
+    return inicio, min(fin, tamaño - 1)
+
+
+def respuesta_descarga(request: Request, ruta: Path, nombre_archivo: str, hash_archivo: str,
+                       media_type: str = MEDIA_TYPE_XLSX) -> Response:
+    """
+    Construye la respuesta de descarga de un archivo exportado con soporte de
+    ETag / If-None-Match (304) y Range / If-Range (206).
+    """
+    etag = f'"{hash_archivo}"'
+    cabeceras = {
+        "etag": etag,
+        "accept-ranges": "bytes",
+        "cache-control": "private, max-age=3600",
+        "content-disposition": f"attachment; filename*=utf-8''{quote(nombre_archivo)}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_coincide(if_none_match, etag):
+        return Response(status_code=304, headers={k: v for k, v in cabeceras.items() if k != "content-disposition"})
+
+    tamaño = ruta.stat().st_size
+    enviar_cuerpo = request.method != "HEAD"
+
+    rango = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if rango and (not if_range or if_range.strip() == etag):
+        try:
+            intervalo = _parsear_rango(rango, tamaño)
+        except ValueError:
+            return Response(status_code=416, headers={**cabeceras, "content-range": f"bytes */{tamaño}"})
+        if intervalo:
+            inicio, fin = intervalo
+            cabeceras["content-range"] = f"bytes {inicio}-{fin}/{tamaño}"
+            return RespuestaArchivo(ruta, inicio, fin - inicio + 1, status_code=206, headers=cabeceras,
+                                    media_type=media_type, enviar_cuerpo=enviar_cuerpo)
+
+    return RespuestaArchivo(ruta, 0, tamaño, headers=cabeceras, media_type=media_type, enviar_cuerpo=enviar_cuerpo)
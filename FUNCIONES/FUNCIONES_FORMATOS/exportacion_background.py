@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from connection import SessionBackground
+from FUNCIONES.FUNCIONES_FORMATOS.formato_service import FormatoService
+
+# Almacenar estado de las exportaciones en segundo plano
+exportaciones_estado = {}
+
+# Pool de trabajo para renderizar los F165 fuera del ciclo de eventos
+executor_exportaciones = ThreadPoolExecutor(max_workers=2, thread_name_prefix="exportacion-f165")
+
+format_service = FormatoService()
+
+
+def _limpiar_estados_antiguos(horas: int = 6):
+    """Descarta el estado de tareas terminadas hace mas de `horas` horas"""
+    limite = datetime.now() - timedelta(hours=horas)
+    for job_id in [j for j, e in exportaciones_estado.items() if e.get("fin") and e["fin"] < limite]:
+        exportaciones_estado.pop(job_id, None)
+
+
+def _registrar_archivo(job_id: str, archivo_db):
+    exportaciones_estado[job_id]["archivos"].append({
+        "id_archivo": archivo_db.id,
+        "nombre_original": archivo_db.nombre_original,
+        "aprendiz_documento": archivo_db.aprendiz_documento,
+        "url_descarga": f"/descargar-archivo/{archivo_db.id}"
+    })
+
+
+def procesar_exportacion_background(job_id: str, request):
+    """
+    Genera el F165 en un hilo del pool. En modalidad grupal se produce un archivo;
+    en modalidad individual se produce un archivo por cada aprendiz enviado (lote).
+    """
+    estado = exportaciones_estado[job_id]
+    estado["status"] = "processing"
+
+    def progreso(procesados: int):
+        estado["aprendices_procesados"] = procesados
+
+    session = SessionBackground()
+    try:
+        # Firmas por referencia: se cargan de la BD dentro del hilo de trabajo
+        aprendices = format_service.resolver_aprendices(session, request)
+        estado["total_aprendices"] = len(aprendices)
+
+        if request.modalidad == "grupal":
+            imagenes_procesadas = format_service.procesar_firmas(aprendices)
+            try:
+                archivo_db, _ = format_service.crear_y_guardar_formato_f165(
+                    db=session,
+                    request=request,
+                    modalidad=request.modalidad,
+                    aprendices=aprendices,
+                    usuario_gene=request.usuario_generator,
+                    informacion_adicional=request.informacion_adicional,
+                    imagenes_procesadas=imagenes_procesadas,
+                    progreso=progreso
+                )
+            finally:
+                format_service.limpiar_imagenes_temporales(imagenes_procesadas)
+            _registrar_archivo(job_id, archivo_db)
+        else:
+            for i, ap in enumerate(aprendices):
+                imagenes_procesadas = format_service.procesar_firmas([ap])
+                try:
+                    archivo_db, _ = format_service.crear_y_guardar_formato_f165(
+                        db=session,
+                        request=request,
+                        modalidad=request.modalidad,
+                        aprendices=[ap],
+                        usuario_gene=request.usuario_generator,
+                        informacion_adicional=request.informacion_adicional,
+                        imagenes_procesadas=imagenes_procesadas
+                    )
+                finally:
+                    format_service.limpiar_imagenes_temporales(imagenes_procesadas)
+                _registrar_archivo(job_id, archivo_db)
+                progreso(i + 1)
+
+        estado["status"] = "completed"
+        if len(estado["archivos"]) == 1:
+            estado["url_descarga"] = estado["archivos"][0]["url_descarga"]
+        print(f"✅ Exportación {job_id} completada: {len(estado['archivos'])} archivo(s)")
+
+    except Exception as e:
+        print(f"❌ Error en exportación {job_id}: {str(e)}")
+        estado["status"] = "error"
+        estado["error"] = str(e)
+    finally:
+        estado["fin"] = datetime.now()
+        session.close()
+
+
+def encolar_exportacion(job_id: str, request):
+    """Registra la tarea y la envia al pool de trabajo"""
+    _limpiar_estados_antiguos()
+    exportaciones_estado[job_id] = {
+        "status": "pending",
+        "modalidad": request.modalidad,
+        "ficha": request.ficha,
+        "total_aprendices": len(request.aprendices or request.documentos),
+        "aprendices_procesados": 0,
+        "archivos": [],
+        "inicio": datetime.now()
+    }
+    executor_exportaciones.submit(procesar_exportacion_background, job_id, request)
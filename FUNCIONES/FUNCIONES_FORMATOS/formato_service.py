@@ -1,13 +1,16 @@
 import uuid
+import os
 import shutil
 from pathlib import Path
 from typing import Optional
 import hashlib
 from datetime import datetime
-from MODELS.archivo_excel import ArchivoExcel
-from connection import SessionLocal
-from sqlalchemy.orm import Session
+from MODELS.archivo_excel import ArchivoExcel, EstadoIntegridad
+from sqlalchemy.orm import Session, object_session
 from MODELS.ficha import Ficha
+from FUNCIONES.FUNCIONES_FICHAS.resumen_fichas import registrar_exportacion
+from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import invalidar_ficha
+from FUNCIONES.FUNCIONES_CACHE.versiones import incrementar_revision
 import tempfile
 import base64
 import asyncio
@@ -17,8 +20,12 @@ from openpyxl import Workbook, load_workbook
 from openpyxl.drawing.image import Image as OpenpyxlImage
 from copy import deepcopy
 from io import BytesIO
-from MODELS import ArchivoExcel, Ficha
+from MODELS import ArchivoExcel, Ficha, Aprendiz
+from SCHEMAS.aprendiz_schemas import AprendizParaExportar
+from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import firma_a_data_url, cargar_firmas
+from MODELS.firma_aprendiz import FirmaAprendiz
 from fastapi import Depends
+from FUNCIONES.FUNCIONES_FORMATOS.archivador import ArchivadorExportaciones
 
 def capitalizar(texto: str) -> str:
     if not texto:
@@ -29,6 +36,7 @@ class FormatoService:
     def __init__(self,base_path = "archivos_exportados"):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        self.archivador = ArchivadorExportaciones(base_path=base_path)
         try:
             # Cargas tu plantilla GRUPAL
             self.plantilla_grupal_wb = Path("GRUPAL-F165.xlsx")
@@ -51,6 +59,22 @@ class FormatoService:
                 sha256.update(chunk)
         # Devuelve el hash en formato hexadecimal
         return sha256.hexdigest()
+
+    def escribir_con_hash(self, ruta_archivo: Path, contenido: bytes) -> tuple:
+        """Escribe el contenido en disco calculando el SHA256 y el tamaño en la misma pasada."""
+        sha256 = hashlib.sha256()
+        vista = memoryview(contenido)  # Evita copiar el buffer al cortarlo en bloques
+        with ruta_archivo.open("wb") as f:
+            for inicio in range(0, len(vista), 1024 * 1024):
+                bloque = vista[inicio:inicio + 1024 * 1024]
+                sha256.update(bloque)
+                f.write(bloque)
+        return sha256.hexdigest(), len(vista)
+
+    def calcular_huella(self, ruta_archivo: Path) -> str:
+        """Huella barata (mtime en ns + tamaño) para saber si el archivo cambio desde la ultima verificacion."""
+        estado = ruta_archivo.stat()
+        return f"{estado.st_mtime_ns}-{estado.st_size}"
     
     
     def generar_nombre_interno(self, extension:str="xlsx") -> str:
@@ -87,13 +111,9 @@ class FormatoService:
             ruta_completa = self.obtener_ruta_organizada(nombre_interno)
             ruta_relativa = ruta_completa.relative_to(self.base_path)
 
-            #Paso 2: escribir el archivo
-            with open(ruta_completa, "wb") as f:
-                f.write(contenido)
-
-            #Paso 3: calcular el hash y tamaño
-            hash_archivo = self.calcular_hash(ruta_completa)  # ← SIN str()
-            tamaño_bytes = ruta_completa.stat().st_size
+            #Paso 2 y 3: escribir el archivo calculando hash y tamaño sobre el buffer en memoria
+            hash_archivo, tamaño_bytes = self.escribir_con_hash(ruta_completa, contenido)
+            huella_verificacion = self.calcular_huella(ruta_completa)
 
             #Paso 4: Crear registro en la base de datos
             archivo_db = ArchivoExcel(
@@ -105,6 +125,7 @@ class FormatoService:
                 cantidad_aprendices=cantidad_aprendices,
                 hash_archivo=hash_archivo,
                 tamaño_bytes=tamaño_bytes,
+                huella_verificacion=huella_verificacion,
                 usuario_id=usuario_id if usuario_id else 0,
                 aprendiz_documento=aprendiz_documento,
             )
@@ -115,43 +136,37 @@ class FormatoService:
             raise Exception(f"Error al guardar el archivo: {str(e)}") from e
         
 
-    def verificar_integridad_archivo(self, archivo_db: ArchivoExcel) -> bool:
-        """"Verifica que el archivo no este corrupto"""
-        try:
-            ruta_completa = self.base_path / archivo_db.ruta_archivo
-            if not ruta_completa.exists():
-                return False
-            hash_calculado = self.calcular_hash(str(ruta_completa))
-            return hash_calculado == archivo_db.hash_archivo
-        except Exception:
-            return False
-        
     def obtene_archivo_para_descarga(self, archivo_db: ArchivoExcel) -> Path:
-        """Obtiene la ruta completa del archivo para descarga"""
-        try:
-            ruta_completa = self.base_path / archivo_db.ruta_archivo
+        """
+        Obtiene la ruta completa del archivo para descarga.
+        Usa el estado calculado por el verificador en segundo plano en lugar de re-hashear aqui.
+        """
+        if archivo_db.estado_integridad in (EstadoIntegridad.FALTANTE.value, EstadoIntegridad.CORRUPTO.value):
+            raise FileNotFoundError(f"El archivo esta corrupto o no existe: {archivo_db.nombre_interno}")
 
-            if not self.verificar_integridad_archivo(archivo_db):
-                raise FileNotFoundError(f"El archivo esta corrupto o no existe: {archivo_db.nombre_interno}")
-            
-            with open(ruta_completa, "rb") as f:
-                contenido = f.read()
-        
-        except Exception as e:
-            raise Exception(f"Error al leer el archivo: {str(e)}") from e
+        # Archivos de meses frios: se extraen del paquete (o se toman de la cache de restaurados)
+        if archivo_db.archivo_contenedor:
+            return self.archivador.restaurar(archivo_db)
+
+        ruta_completa = self.base_path / archivo_db.ruta_archivo
+        if not ruta_completa.is_file():
+            raise FileNotFoundError(f"El archivo no existe: {archivo_db.nombre_interno}")
+        return ruta_completa
         
 
     def eliminar_archivo_seguro(self,archivo_db: ArchivoExcel) -> bool:
         """Eliminacion segura (soft delete)"""
+        # Se usa la sesion de la peticion que cargo el archivo, no una nueva
+        session = object_session(archivo_db)
         try:
             # 1. Soft delete en DB
             archivo_db.activo = False
             archivo_db.fecha_modificacion = datetime.now()
-            SessionLocal.commit()  # Asumiendo que tienes una sesión de DB activa
+            session.commit()
 
             return True
         except Exception as e:
-            SessionLocal.rollback()  # Revertir cambios en caso de error
+            session.rollback()  # Revertir cambios en caso de error
             raise Exception(f"Error al eliminar el archivo: {str(e)}") from e
         
 
@@ -167,6 +182,68 @@ class FormatoService:
         except Exception as e:
             raise Exception(f"Error al obtener ficha {e}")
     
+    @staticmethod
+    def _firma_en_linea(firma) -> bool:
+        """Una firma en el cuerpo es base64 / data URL; vacia o con ruta ("/aprendices/...") es referencia"""
+        return bool(firma) and not firma.startswith("/")
+
+    def resolver_aprendices(self, db: Session, request) -> list:
+        """
+        Devuelve la lista de AprendizParaExportar con las firmas ya resueltas.
+        Las firmas que no vienen en el cuerpo se cargan de la BD en una sola consulta IN,
+        trayendo solo las columnas necesarias.
+        """
+        if request.aprendices:
+            aprendices = list(request.aprendices)
+            documentos = [ap.documento for ap in aprendices if not self._firma_en_linea(ap.firma)]
+            if documentos:
+                # Firmas normalizadas desde el almacen, en una sola consulta con join
+                firmas = {
+                    documento: firma_a_data_url(contenido)
+                    for documento, contenido in db.query(
+                        Aprendiz.documento, FirmaAprendiz.contenido
+                    ).join(
+                        FirmaAprendiz, FirmaAprendiz.hash == Aprendiz.firma_hash
+                    ).filter(
+                        Aprendiz.documento.in_(documentos),
+                        Aprendiz.ficha_numero == request.ficha
+                    ).all()
+                }
+                aprendices = [
+                    ap if self._firma_en_linea(ap.firma) else ap.copy(update={"firma": firmas.get(ap.documento)})
+                    for ap in aprendices
+                ]
+            return aprendices
+
+        # Solo documentos: se cargan los aprendices completos respetando el orden recibido
+        filas = db.query(Aprendiz).filter(
+            Aprendiz.documento.in_(request.documentos),
+            Aprendiz.ficha_numero == request.ficha
+        ).all()
+        por_documento = {a.documento: a for a in filas}
+        firmas = cargar_firmas(db, (a.firma_hash for a in filas))
+        faltantes = [d for d in request.documentos if d not in por_documento]
+        if faltantes:
+            raise ValueError(f"Aprendices no encontrados en la ficha {request.ficha}: {', '.join(faltantes)}")
+
+        return [
+            AprendizParaExportar(
+                tipo_documento=a.tipo_documento or "",
+                documento=a.documento,
+                nombre=a.nombre,
+                apellido=a.apellido,
+                direccion=a.direccion or "",
+                departamento=a.departamento,
+                municipio=a.municipio,
+                correo=a.correo,
+                celular=a.celular,
+                discapacidad=a.discapacidad or "NO",
+                tipo_discapacidad=a.tipo_discapacidad or "",
+                firma=firma_a_data_url(firmas[a.firma_hash]) if a.firma_hash in firmas else None
+            )
+            for a in (por_documento[d] for d in request.documentos)
+        ]
+
     @staticmethod
     def _procesar_imagen_individual(firma_data:str)-> str:
         try:
@@ -208,9 +285,20 @@ class FormatoService:
         executor.shutdown(wait=False)
 
         return ruta_imagenes
+
+    def procesar_firmas(self, aprendices: list) -> list:
+        """Version sincrona de procesar_firmas_en_paralelo, para usar dentro de un hilo de trabajo"""
+        return [FormatoService._procesar_imagen_individual(ap.firma) if ap.firma else None for ap in aprendices]
+
+    @staticmethod
+    def limpiar_imagenes_temporales(imagenes_procesadas: list):
+        """Elimina los PNG temporales creados al decodificar las firmas"""
+        for imagen_path in imagenes_procesadas:
+            if imagen_path and os.path.exists(imagen_path):
+                os.unlink(imagen_path)
     
 
-    def _llenar_F165_grupal(self,wb,ficha,aprendices,imagenes_procesadas,request,usuario_gene,informacion_adicional):
+    def _llenar_F165_grupal(self,wb,ficha,aprendices,imagenes_procesadas,request,usuario_gene,informacion_adicional,progreso=None):
 
         fecha_inicio = ficha.fecha_inicio.strftime("%d-%m-%Y") if ficha.fecha_inicio else "N/A"
         fecha_fin = ficha.fecha_fin.strftime("%d-%m-%Y") if ficha.fecha_fin else "N/A"
@@ -316,6 +404,10 @@ class FormatoService:
                     print(f"Error insertando imagen en fila {fila}: {e}")
                     print(f"Tipo de error {type(e)}")
 
+            # Avisar el avance por aprendiz (exportaciones en segundo plano)
+            if progreso:
+                progreso(i + 1)
+
 
     def _llenar_F165_individual(self,wb,ficha,aprendices,imagenes_procesadas,request,usuario_gene,informacion_adicional):
         if not aprendices:
@@ -395,7 +487,7 @@ class FormatoService:
             except Exception as e:
                 print(f"Error insertando imagen en hoja individual: {e}")
 
-    def generar_f165_grupal(self, ficha, aprendices, imagenes_procesadas, request, usuario_gene, informacion_adicional):
+    def generar_f165_grupal(self, ficha, aprendices, imagenes_procesadas, request, usuario_gene, informacion_adicional, progreso=None):
         """
         Función pública que prepara y genera el formato F165 grupal.
         """
@@ -411,7 +503,8 @@ class FormatoService:
             imagenes_procesadas,
             request,
             usuario_gene,
-            informacion_adicional
+            informacion_adicional,
+            progreso
         )
         return wb_copia
 
@@ -435,7 +528,7 @@ class FormatoService:
         )
         return wb_copia
     
-    def crear_y_guardar_formato_f165(self, db:Session, request, modalidad:str, aprendices:list,usuario_gene,informacion_adicional,imagenes_procesadas):
+    def crear_y_guardar_formato_f165(self, db:Session, request, modalidad:str, aprendices:list,usuario_gene,informacion_adicional,imagenes_procesadas,progreso=None):
         ficha = self._validar_y_obtener_ficha(request.ficha,db)
 
         wb = None
@@ -444,7 +537,7 @@ class FormatoService:
         ap = aprendices[0]
         
         if modalidad == "grupal":
-            wb = self.generar_f165_grupal(ficha, aprendices, imagenes_procesadas, request, usuario_gene, informacion_adicional)
+            wb = self.generar_f165_grupal(ficha, aprendices, imagenes_procesadas, request, usuario_gene, informacion_adicional, progreso)
             nombre_original = f"F165_{request.ficha}_{request.modalidad}"
             print("este es el nombre del archivo", nombre_original)
             
@@ -505,8 +598,12 @@ class FormatoService:
         print("Guardando en base de datos...")
         try:
             db.add(archivo_db)
+            db.flush()  # Para tener el id del archivo en el resumen
+            registrar_exportacion(db, request.ficha, archivo_db.id)
+            incrementar_revision(db, request.ficha)
             db.commit()
             db.refresh(archivo_db)
+            invalidar_ficha(request.ficha)  # Cambia "archivo_existente" en las respuestas de la ficha
             print("Guardado en BD correctamente")
         except Exception as e:
             db.rollback()
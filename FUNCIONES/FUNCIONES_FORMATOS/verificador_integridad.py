@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from connection import SessionBackground
+from MODELS.archivo_excel import ArchivoExcel, EstadoIntegridad
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo worker)
+    fcntl = None
+
+
+class VerificadorIntegridad:
+    """
+    Recorre la tabla archivos_excel por lotes y verifica cada archivo en segundo plano,
+    guardando el resultado en ArchivoExcel.estado_integridad.
+    Un archivo cuya huella (mtime + tamaño) no cambio desde el ultimo hash correcto no se vuelve a
+    leer; aun asi cada pasada re-hashea completa una fraccion de ellos (1 de cada `pasadas_por_rehash`),
+    de modo que todo archivo se lee entero al menos cada `pasadas_por_rehash` pasadas.
+    El cursor (ultimo id revisado y numero de pasada) se guarda en disco para reanudar tras un reinicio.
+    """
+
+    def __init__(self, base_path="archivos_exportados", tamaño_lote: int = 20,
+                 bytes_por_segundo: int = 4 * 1024 * 1024, pasadas_por_rehash: int = 28):
+        self.base_path = Path(base_path)
+        self.tamaño_lote = tamaño_lote
+        self.bytes_por_segundo = bytes_por_segundo  # Limite de lectura para no competir con las descargas
+        self.pasadas_por_rehash = pasadas_por_rehash  # Con pasadas cada 6 horas: re-hash completo semanal
+        self.ruta_cursor = self.base_path / ".cursor_verificacion.json"
+
+    def _leer_cursor(self) -> tuple:
+        """Obtiene el ultimo id verificado (0 si es una pasada nueva) y el numero de pasada"""
+        try:
+            with self.ruta_cursor.open("r") as f:
+                cursor = json.load(f)
+            return int(cursor.get("ultimo_id", 0)), int(cursor.get("pasada", 0))
+        except (FileNotFoundError, ValueError):
+            return 0, 0
+
+    def _guardar_cursor(self, ultimo_id: int, pasada: int):
+        """Guarda el cursor de forma atomica (escribir temporal y renombrar)"""
+        temporal = self.ruta_cursor.with_suffix(".tmp")
+        with temporal.open("w") as f:
+            json.dump({"ultimo_id": ultimo_id, "pasada": pasada, "fecha": datetime.now().isoformat()}, f)
+        os.replace(temporal, self.ruta_cursor)
+
+    def _hash_stream_con_limite(self, stream) -> str:
+        """Calcula el SHA256 de un stream leyendo a velocidad limitada"""
+        sha256 = hashlib.sha256()
+        inicio = time.monotonic()
+        leidos = 0
+        while chunk := stream.read(256 * 1024):
+            sha256.update(chunk)
+            leidos += len(chunk)
+            # Si vamos mas rapido que el limite, dormimos la diferencia
+            esperado = leidos / self.bytes_por_segundo
+            transcurrido = time.monotonic() - inicio
+            if esperado > transcurrido:
+                time.sleep(esperado - transcurrido)
+        return sha256.hexdigest()
+
+    def _hash_con_limite(self, ruta_archivo: Path) -> str:
+        """Calcula el SHA256 de un archivo sin ensuciar la cache de paginas"""
+        with ruta_archivo.open("rb") as f:
+            fd = f.fileno()
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            hash_calculado = self._hash_stream_con_limite(f)
+            if hasattr(os, "posix_fadvise"):
+                # El archivo no se va a volver a leer pronto: liberamos sus paginas
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return hash_calculado
+
+    def _verificar_archivado(self, archivo_db: ArchivoExcel) -> str:
+        """Verifica un archivo que ya fue empaquetado en un zip de mes frio"""
+        ruta_paquete = self.base_path / archivo_db.archivo_contenedor
+        if not ruta_paquete.is_file():
+            return EstadoIntegridad.FALTANTE.value
+        with zipfile.ZipFile(ruta_paquete) as paquete:
+            try:
+                miembro = paquete.open(archivo_db.miembro_contenedor)
+            except KeyError:
+                return EstadoIntegridad.FALTANTE.value
+            with miembro:
+                if self._hash_stream_con_limite(miembro) != archivo_db.hash_archivo:
+                    return EstadoIntegridad.CORRUPTO.value
+        return EstadoIntegridad.OK.value
+
+    def verificar_archivo(self, archivo_db: ArchivoExcel, pasada: int = 0) -> str:
+        """Verifica un archivo y devuelve el estado de integridad resultante"""
+        if archivo_db.archivo_contenedor:
+            return self._verificar_archivado(archivo_db)
+
+        ruta_completa = self.base_path / archivo_db.ruta_archivo
+        if not ruta_completa.exists():
+            return EstadoIntegridad.FALTANTE.value
+
+        estado = ruta_completa.stat()
+        if estado.st_size != archivo_db.tamaño_bytes:
+            return EstadoIntegridad.CORRUPTO.value
+
+        # Mismo mtime y tamaño que en el ultimo hash correcto: no se lee, salvo en su turno de re-hash completo
+        huella_actual = f"{estado.st_mtime_ns}-{estado.st_size}"
+        turno_rehash = (archivo_db.id + pasada) % self.pasadas_por_rehash == 0
+        if archivo_db.huella_verificacion == huella_actual and not turno_rehash:
+            return EstadoIntegridad.OK.value
+
+        if self._hash_con_limite(ruta_completa) != archivo_db.hash_archivo:
+            return EstadoIntegridad.CORRUPTO.value
+
+        archivo_db.huella_verificacion = huella_actual
+        return EstadoIntegridad.OK.value
+
+    def ejecutar_lote(self) -> int:
+        """
+        Verifica el siguiente lote de archivos a partir del cursor.
+        Devuelve cuantos archivos se revisaron (0 significa que la pasada termino).
+        """
+        session = SessionBackground()
+        try:
+            ultimo_id, pasada = self._leer_cursor()
+            archivos = session.query(ArchivoExcel).filter(
+                ArchivoExcel.id > ultimo_id
+            ).order_by(ArchivoExcel.id).limit(self.tamaño_lote).all()
+
+            if not archivos:
+                # Fin de la pasada: la siguiente empieza desde el principio
+                self._guardar_cursor(0, pasada + 1)
+                return 0
+
+            for archivo_db in archivos:
+                try:
+                    nuevo_estado = self.verificar_archivo(archivo_db, pasada)
+                except OSError as e:
+                    print(f"⚠️ Error leyendo archivo {archivo_db.id}: {e}")
+                    nuevo_estado = EstadoIntegridad.FALTANTE.value
+
+                if nuevo_estado != EstadoIntegridad.OK.value and archivo_db.estado_integridad != nuevo_estado:
+                    print(f"❌ Archivo {archivo_db.id} ({archivo_db.nombre_interno}) marcado como {nuevo_estado}")
+
+                archivo_db.estado_integridad = nuevo_estado
+                archivo_db.fecha_verificacion = datetime.now()
+
+            session.commit()
+            self._guardar_cursor(archivos[-1].id, pasada)
+            return len(archivos)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def ejecutar_continuamente(self, pausa_lotes: float = 5.0, pausa_pasadas: float = 6 * 60 * 60,
+                               detener: threading.Event = None):
+        """Bucle del verificador: lotes pequeños con pausas para no cargar el disco ni la BD"""
+        detener = detener or threading.Event()
+        while not detener.is_set():
+            try:
+                revisados = self.ejecutar_lote()
+            except Exception as e:
+                print(f"❌ Error en verificador de integridad: {e}")
+                revisados = 0
+            detener.wait(pausa_lotes if revisados else pausa_pasadas)
+
+
+def iniciar_verificador_en_segundo_plano(base_path="archivos_exportados") -> Optional[threading.Event]:
+    """
+    Arranca el verificador en un hilo daemon. Devuelve el evento para detenerlo.
+    Con varios workers (uvicorn --workers N) solo lo arranca el proceso que obtiene el bloqueo
+    de base_path/.verificador.lock; los demas devuelven None. El bloqueo se mantiene mientras
+    viva el hilo, y si ese proceso muere lo libera el sistema operativo.
+    """
+    verificador = VerificadorIntegridad(base_path=base_path)
+    bloqueo = None
+    if fcntl is not None:
+        verificador.base_path.mkdir(parents=True, exist_ok=True)
+        bloqueo = (verificador.base_path / ".verificador.lock").open("a")
+        try:
+            fcntl.flock(bloqueo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            bloqueo.close()
+            return None  # Otro worker ya ejecuta el verificador
+
+    def ejecutar():
+        try:
+            verificador.ejecutar_continuamente(detener=detener)
+        finally:
+            if bloqueo is not None:
+                bloqueo.close()
+
+    detener = threading.Event()
+    hilo = threading.Thread(target=ejecutar, name="verificador-integridad", daemon=True)
+    hilo.start()
+    return detener
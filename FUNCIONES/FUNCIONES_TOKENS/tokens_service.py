@@ -1,7 +1,9 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from connection import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from connection import get_async_db
 from MODELS import Usuarios
 from MODELS.token_blacklist import TokenBlacklist
 from jose import JWTError, jwt
@@ -84,63 +86,75 @@ def create_refresh_token(data: dict): #-> Entra como parametro la data que vamos
 
 # --- Funcion para verificar los tokens ---
 
-#-> se le pasa como parametro, el token, sesion a la base de datos, 
-# el parámetro expected_type define si estamos verificando un access token o un refresh token, 
-# esto evita que un refresh token se use directamente para acceder.
-def verify_token(token: str, db: Session, expected_type: str = "access"):
-
-    # -> Se define una excepción estándar que 
-    # será reutilizada en cualquier error de validación, 
+def _credenciales_invalidas():
+    # -> Excepción estándar reutilizada en cualquier error de validación,
     # de modo que siempre devolvemos un error 401 con el mismo formato.
-    credentials_exception = HTTPException(
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido o expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+# -> Valida firma, expiración y tipo del token, sin consultar la base de datos.
+#    La consulta a la lista negra la hace verify_token (sesión síncrona) o verify_token_async.
+def decodificar_token(token: str, expected_type: str = "access"):
     # si no llega ningun token devolvemos el error
     if not token:
-        raise credentials_exception
+        raise _credenciales_invalidas()
     
     try:
         # Cuando decodificamos con jwt.decode, la librería valida automáticamente 
         # si el token está firmado correctamente y si ha expirado (campo exp).
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        # si se capturo algun error lo interrumpimos la operación 
+        raise _credenciales_invalidas()
+
+    # si el tipo de token obtenido es diferente al que recibe la funcion o no trae su identificador unico, lanzamos error
+    if payload.get("type") != expected_type or not payload.get("jti"):
+        raise _credenciales_invalidas()
+    return payload
 
-        # en una variable, guardamos el tipo de token trayendolo del "type" que viene en el "payload" 
-        token_type = payload.get("type")
-        # el "jti" como identificador tambien lo traemos
-        jti = payload.get("jti")
 
-        # si el tipo de token obtenido es diferente al que recibe la funcion o no trae su identificador unico, lanzamos error
-        if token_type != expected_type or not jti:
-            raise credentials_exception
+#-> se le pasa como parametro, el token, sesion a la base de datos, 
+# el parámetro expected_type define si estamos verificando un access token o un refresh token, 
+# esto evita que un refresh token se use directamente para acceder.
+def verify_token(token: str, db: Session, expected_type: str = "access"):
+    payload = decodificar_token(token, expected_type)
 
-        # La verificación en la tabla TokenBlacklist asegura que tokens previamente invalidados 
-        # (por logout, expiracion) no puedan volver a usarse, incluso si todavía no han expirado.
-        token_in_db = db.query(TokenBlacklist).filter(TokenBlacklist.jti == jti).first()
+    # La verificación en la tabla TokenBlacklist asegura que tokens previamente invalidados 
+    # (por logout, expiracion) no puedan volver a usarse, incluso si todavía no han expirado.
+    token_in_db = db.query(TokenBlacklist.jti).filter(TokenBlacklist.jti == payload["jti"]).first()
 
-        # si el token esta en el blacklist de la base de datos devolvemos un error
-        if token_in_db:
-            raise credentials_exception
-        
-        # al completar la operacion retornamos el "payload" del token verificado
-        return payload
-    except JWTError:
-        # si se capturo algun error lo interrumpimos la operación 
-        raise credentials_exception
+    # si el token esta en el blacklist de la base de datos devolvemos un error
+    if token_in_db:
+        raise _credenciales_invalidas()
+    
+    # al completar la operacion retornamos el "payload" del token verificado
+    return payload
+
+
+# -> Igual que verify_token, pero con la sesión asíncrona (para endpoints async def)
+async def verify_token_async(token: str, db: AsyncSession, expected_type: str = "access"):
+    payload = decodificar_token(token, expected_type)
+    token_in_db = await db.scalar(select(TokenBlacklist.jti).where(TokenBlacklist.jti == payload["jti"]))
+    if token_in_db:
+        raise _credenciales_invalidas()
+    return payload
 
 
 # --- Dependencia de Usuario Actual ---
 
 # -> Definimos una función asincronica, que recibe como parametros, el token con Depends(oauth2_scheme) extrae automáticamente el token del 
 # header Authorization: Bearer <token> en la petición, y la sesión a la base de datos
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     # si no llega el token, manejamos manualmente
     if not token:
         return None # Permite rutas con usuarios opcionales, es decir que no requieran autenticación
     try:
         #-> llamamos a la función que verifica el token, le pasmos el token, la sesión, y el tipo de token
-        payload = verify_token(token, db, expected_type="access")
+        payload = await verify_token_async(token, db, expected_type="access")
         #-> en esta variaable traemos el dato del email, del sub, es donde guardamos el identificador
         #  pricipal del usuario que es el correo del usuario (Estandar de JWT)
         user_email: str = payload.get("sub")
@@ -149,7 +163,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Contenido invalido del token")
         
         #-> en una variable hacemos la consulta a la base de datos verificando que el email exista
-        user = db.query(Usuarios).filter(Usuarios.correo == user_email).first()
+        user = await db.scalar(select(Usuarios).where(Usuarios.correo == user_email))
         #-> si la variable llega vacia lanzamos un error
         if user is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
@@ -0,0 +1,195 @@
+# compresion_middleware.py
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin el paquete solo se ofrece gzip
+    brotli = None
+
+# Tipos de contenido que vale la pena comprimir (prefijos). Los .xlsx, PNG y demas binarios
+# ya vienen comprimidos: se envian tal cual (y los .xlsx conservan el camino sendfile).
+TIPOS_COMPRIMIBLES = (
+    "application/json",
+    "text/",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# Respuestas que nunca se comprimen: sin cuerpo, o parciales (el rango es sobre los bytes originales)
+ESTADOS_SIN_COMPRESION = {204, 206, 304}
+
+
+def _elegir_codificacion(accept_encoding: str):
+    """Elige br o gzip segun Accept-Encoding (respetando q=0); None si el cliente no acepta ninguna"""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip()] = calidad
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    """Interfaz comun de gzip y brotli para comprimir por bloques"""
+
+    def __init__(self, codificacion: str, nivel_gzip: int, nivel_brotli: int):
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=nivel_brotli)
+            self._gzip = None
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+
+    def bloque(self, datos: bytes) -> bytes:
+        """Comprime un bloque y vacia lo pendiente, para que el cliente lo reciba sin esperar al final"""
+        if self._br is not None:
+            return self._br.process(datos) + self._br.flush()
+        return self._gzip.compress(datos) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self, datos: bytes = b"") -> bytes:
+        if self._br is not None:
+            return self._br.process(datos) + self._br.finish()
+        return self._gzip.compress(datos) + self._gzip.flush(zlib.Z_FINISH)
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI (sin BaseHTTPMiddleware) que comprime con brotli o gzip las respuestas de
+    texto/JSON. No acumula respuestas en streaming: cada bloque se comprime y se envia al llegar.
+
+    Se omite cuando:
+    - el tipo de contenido no esta en `tipos` (por ejemplo los .xlsx de FileResponse/RespuestaArchivo),
+    - el cuerpo completo mide menos de `minimo_bytes`,
+    - la respuesta ya trae Content-Encoding, es 204/206/304, o tiene Cache-Control: no-transform,
+    - la peticion es HEAD.
+    """
+
+    def __init__(self, app, minimo_bytes: int = 1024, nivel_gzip: int = 6, nivel_brotli: int = 4,
+                 tipos: tuple = TIPOS_COMPRIMIBLES):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        self.tipos = tipos
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for nombre, valor in scope["headers"]:
+            if nombre == b"accept-encoding":
+                accept_encoding = valor.decode("latin-1")
+                break
+        codificacion = _elegir_codificacion(accept_encoding)
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _EnvioComprimido(self, send, codificacion))
+
+    def comprimible(self, mensaje_inicio: dict) -> bool:
+        """Decide con la cabecera de la respuesta si se intenta comprimir"""
+        if mensaje_inicio["status"] in ESTADOS_SIN_COMPRESION:
+            return False
+        cabeceras = {
+            nombre.decode("latin-1").lower(): valor.decode("latin-1") for nombre, valor in mensaje_inicio.get("headers", [])
+        }
+        if "content-encoding" in cabeceras or "no-transform" in cabeceras.get("cache-control", ""):
+            return False
+        if "content-length" in cabeceras and int(cabeceras["content-length"]) < self.minimo_bytes:
+            return False
+        tipo = cabeceras.get("content-type", "").split(";")[0].strip().lower()
+        return tipo.startswith(self.tipos)
+
+
+class _EnvioComprimido:
+    """Envoltura del `send` de una peticion: reescribe cabeceras y cuerpo si la respuesta se comprime"""
+
+    def __init__(self, middleware: CompresionMiddleware, send, codificacion: str):
+        self.middleware = middleware
+        self.send = send
+        self.codificacion = codificacion
+        self.inicio = None  # http.response.start retenido hasta ver el primer bloque del cuerpo
+        self.compresor = None
+        self.pasar_directo = False
+        # Con Content-Length el cuerpo es de tamaño conocido (aunque llegue en partes, como lo
+        # reenvia SecurityMiddleware): se junta y se comprime de una vez, conservando Content-Length
+        self.pendiente = None
+
+    async def __call__(self, mensaje):
+        tipo = mensaje["type"]
+
+        if tipo == "http.response.start":
+            if self.middleware.comprimible(mensaje):
+                self.inicio = mensaje
+                if any(nombre.lower() == b"content-length" for nombre, _ in mensaje.get("headers", [])):
+                    self.pendiente = []
+            else:
+                self.pasar_directo = True
+                await self.send(mensaje)
+            return
+
+        # Extensiones como zerocopysend/pathsend solo las usan respuestas binarias, que van directo
+        if self.pasar_directo or tipo != "http.response.body":
+            await self.send(mensaje)
+            return
+
+        cuerpo = mensaje.get("body", b"")
+        mas_cuerpo = mensaje.get("more_body", False)
+
+        if self.pendiente is not None:
+            self.pendiente.append(cuerpo)
+            if mas_cuerpo:
+                return
+            cuerpo = b"".join(self.pendiente)
+            self.pendiente = None
+
+        if self.compresor is None:
+            if not mas_cuerpo and len(cuerpo) < self.middleware.minimo_bytes:
+                # Respuesta completa y pequeña: no compensa comprimirla
+                self.pasar_directo = True
+                await self.send(self.inicio)
+                await self.send(mensaje)
+                return
+            self.compresor = _Compresor(self.codificacion, self.middleware.nivel_gzip, self.middleware.nivel_brotli)
+            if not mas_cuerpo:
+                cuerpo = self.compresor.terminar(cuerpo)
+                await self.send(self._inicio_comprimido(len(cuerpo)))
+                await self.send({"type": "http.response.body", "body": cuerpo, "more_body": False})
+                return
+            # Streaming: se envia sin Content-Length (chunked) y cada bloque sale comprimido al llegar
+            await self.send(self._inicio_comprimido(None))
+
+        comprimido = self.compresor.bloque(cuerpo) if mas_cuerpo else self.compresor.terminar(cuerpo)
+        await self.send({"type": "http.response.body", "body": comprimido, "more_body": mas_cuerpo})
+
+    def _inicio_comprimido(self, longitud):
+        cabeceras = []
+        vary = None
+        for nombre, valor in self.inicio.get("headers", []):
+            clave = nombre.lower()
+            if clave == b"content-length":
+                continue
+            if clave == b"vary":
+                vary = valor
+                continue
+            if clave == b"etag" and not valor.startswith(b"W/"):
+                valor = b"W/" + valor  # Los bytes enviados ya no son los originales
+            cabeceras.append((nombre, valor))
+        cabeceras.append((b"content-encoding", self.codificacion.encode("latin-1")))
+        cabeceras.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        if longitud is not None:
+            cabeceras.append((b"content-length", str(longitud).encode("latin-1")))
+        return {**self.inicio, "headers": cabeceras}
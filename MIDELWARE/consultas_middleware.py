@@ -0,0 +1,36 @@
+# consultas_middleware.py
+from FUNCIONES.FUNCIONES_CONSULTAS.instrumentacion import contar_consultas
+
+
+class ConsultasMiddleware:
+    """
+    Middleware ASGI que cuenta las consultas SQL y el tiempo en la base de datos de cada peticion
+    (ver FUNCIONES_CONSULTAS/instrumentacion.py). Las consultas lentas se registran con su endpoint.
+    Con `cabeceras=True` (modo depuracion) agrega a la respuesta X-DB-Queries y X-DB-Time-Ms; las
+    consultas que ocurren despues de enviar la cabecera (respuestas en streaming) no alcanzan a contarse.
+    """
+
+    def __init__(self, app, cabeceras: bool = False):
+        self.app = app
+        self.cabeceras = cabeceras
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with contar_consultas(scope["method"], scope) as conteo:
+            if not self.cabeceras:
+                await self.app(scope, receive, send)
+                return
+
+            async def enviar(mensaje):
+                if mensaje["type"] == "http.response.start":
+                    mensaje = {**mensaje, "headers": [
+                        *mensaje.get("headers", []),
+                        (b"x-db-queries", str(conteo.total).encode("latin-1")),
+                        (b"x-db-time-ms", str(conteo.tiempo_ms).encode("latin-1")),
+                    ]}
+                await send(mensaje)
+
+            await self.app(scope, receive, enviar)
@@ -3,4 +3,6 @@ from .ficha import Ficha
 from .a_usuarios import Usuarios
 from .ficha_maestro import FichaMaestro
 from .archivo_excel import ArchivoExcel
-from .token_blacklist import TokenBlacklist
\ No newline at end of file
+from .token_blacklist import TokenBlacklist
+from .firma_aprendiz import FirmaAprendiz
+from .ficha_resumen import FichaResumen
\ No newline at end of file
@@ -1,11 +1,20 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Enum, Index
 from sqlalchemy.dialects.mysql import LONGTEXT
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from connection import base
 
 class Aprendiz(base):
     __tablename__ = "Aprendices"
+    __table_args__ = (
+        Index("ix_aprendices_ficha_documento", "ficha_numero", "documento"),
+        Index("ix_aprendices_ficha_actualizacion", "ficha_numero", "ultima_actualizacion"),
+        # Busqueda por prefijo (/aprendices/search): LIKE 'texto%' recorre estos indices
+        Index("ix_aprendices_nombre", "nombre"),
+        Index("ix_aprendices_apellido", "apellido"),
+        # En MySQL, busqueda por palabras de nombre y apellido (MATCH ... AGAINST en modo booleano)
+        Index("ft_aprendices_nombre_apellido", "nombre", "apellido", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
     id_aprendiz = Column(Integer, primary_key=True, autoincrement=True)
     documento = Column(String(20), nullable=False, unique=True) 
     nombre = Column(String(100), nullable=False)    
@@ -17,7 +26,10 @@ class Aprendiz(base):
     municipio = Column(String(50), nullable=True)
     tipo_documento = Column(String(10), nullable=True)
     estado = Column(String(50), nullable=True)
-    firma = Column(LONGTEXT, nullable=True)
+    # Firma original en base64: solo queda en registros aun sin migrar, y nunca se carga salvo que se pida
+    # (LONGTEXT en MySQL; TEXT en los demas motores, que no tienen limite de 64 KB)
+    firma = deferred(Column(Text().with_variant(LONGTEXT(), "mysql"), nullable=True))
+    firma_hash = Column(String(64), ForeignKey("FirmasAprendices.hash"), nullable=True)  # Referencia a la firma normalizada
     ultima_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     discapacidad = Column(Enum('SI', 'NO'), nullable=True)
     tipo_discapacidad = Column(Enum('AUDITIVA', 'VISUAL', 'FISICA', 'INTELECTUAL', 'SORDOCEGUERA', 'PSICOSOCIAL', 'MULTIPLE'), nullable=True)
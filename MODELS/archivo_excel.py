@@ -1,11 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from connection import base
 
 from datetime import datetime
+import enum
+
+
+class EstadoIntegridad(str, enum.Enum):
+    PENDIENTE = "PENDIENTE"  # Aun no revisado por el verificador en segundo plano
+    OK = "OK"
+    FALTANTE = "FALTANTE"
+    CORRUPTO = "CORRUPTO"
 
 class ArchivoExcel(base):
     __tablename__ = "archivos_excel"
+    # Indices de las consultas frecuentes (se crean con la migracion 0002)
+    __table_args__ = (
+        Index("ix_archivos_excel_ficha_activo_fecha", "ficha", "activo", "fecha_creacion"),
+        Index("ix_archivos_excel_usuario_fecha", "usuario_id", "fecha_creacion"),
+        Index("ix_archivos_excel_fecha_id", "fecha_creacion", "id"),
+        Index("ix_archivos_excel_ficha_documento", "ficha", "aprendiz_documento"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -26,6 +41,13 @@ class ArchivoExcel(base):
     #Seguridad y validación
     hash_archivo = Column(String(64), nullable=False)  # Hash del archivo para verificar integridad
     tamaño_bytes = Column(BigInteger, nullable=False)  # Tamaño del archivo en bytes
+    huella_verificacion = Column(String(64), nullable=True)  # mtime_ns-tamaño del archivo la ultima vez que el hash coincidio
+    estado_integridad = Column(String(20), nullable=False, default=EstadoIntegridad.PENDIENTE.value)  # Resultado del verificador
+    fecha_verificacion = Column(DateTime, nullable=True)  # Ultima vez que el verificador reviso el archivo
+
+    # Archivado en frio: paquete zip del mes y nombre del miembro dentro de el (None si sigue suelto)
+    archivo_contenedor = Column(String(500), nullable=True)
+    miembro_contenedor = Column(String(500), nullable=True)
 
     #Control de esatdo
     activo = Column(Boolean, default=True)  # Para soft delete
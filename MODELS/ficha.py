@@ -19,4 +19,7 @@ class Ficha(base):
     modalidad_formacion = Column(String(20), nullable=True)
     jornada = Column(String(20), nullable=True)
 
+    # Sube con cada escritura que cambia lo que devuelven sus lecturas (ver FUNCIONES_CACHE/versiones.py)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
+
     aprendices = relationship("Aprendiz", back_populates="ficha")
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey
+from connection import base
+from datetime import datetime
+
+
+class FichaResumen(base):
+    """Totales por ficha mantenidos de forma incremental (ver FUNCIONES_FICHAS/resumen_fichas.py)"""
+    __tablename__ = "FichasResumen"
+
+    numero_ficha = Column(String(10), ForeignKey("Fichas.numero_ficha"), primary_key=True)
+    total_aprendices = Column(Integer, nullable=False, default=0)
+    aprendices_por_estado = Column(JSON, nullable=False, default=dict)  # {"EN FORMACION": 25, ...}
+    total_editados = Column(Integer, nullable=False, default=0)
+    total_exportaciones = Column(Integer, nullable=False, default=0)
+    tiene_exportacion = Column(Boolean, nullable=False, default=False)
+    ultimo_archivo_id = Column(Integer, nullable=True)  # Ultimo ArchivoExcel generado para la ficha
+    fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
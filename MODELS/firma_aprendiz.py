@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from connection import base
+from datetime import datetime
+
+
+class FirmaAprendiz(base):
+    """Almacen de firmas direccionado por contenido: la clave es el SHA256 del PNG normalizado"""
+    __tablename__ = "FirmasAprendices"
+
+    hash = Column(String(64), primary_key=True)
+    contenido = Column(LargeBinary, nullable=False)  # PNG normalizado (ver firmas_service)
+    tamaño_bytes = Column(Integer, nullable=False)
+    fecha_creacion = Column(DateTime, default=datetime.now)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from connection import base
 
 class TokenBlacklist(base):
     __tablename__ = 'token_blacklist'
+    __table_args__ = (
+        Index('ix_token_blacklist_expires_at', 'expires_at'),
+    )
     
     # Usaremos el 'jti' (JWT ID) como identificador único del token.
     jti = Column(String(36), primary_key=True, index=True)
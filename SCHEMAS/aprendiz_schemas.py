@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from typing import List
 from typing import Optional
 from .usuario_schemas import UsuarioGenerador
@@ -17,7 +17,7 @@ class AprendizParaExportar(BaseModel):
     celular: str
     discapacidad: str
     tipo_discapacidad: str
-    firma: str
+    firma: Optional[str] = None  # Si no se envia, se usa la firma guardada del aprendiz
 
 class AprendizActualizarRequest(BaseModel):
     """Modelo para actualizar los datos de un aprendiz"""
@@ -35,6 +35,26 @@ class AprendizActualizarRequest(BaseModel):
     firma: Optional[str] = None
     editado: Optional[bool] = None
 
+# Maximo de aprendices por peticion en PATCH /aprendices/batch
+MAXIMO_LOTE_APRENDICES = 500
+
+class AprendizActualizarLoteItem(BaseModel):
+    """Cambio de un aprendiz dentro de un lote: documento actual y los campos a actualizar"""
+    documento: str
+    cambios: AprendizActualizarRequest
+
+class AprendizActualizarLoteRequest(BaseModel):
+    """Modelo para actualizar varios aprendices en una sola transaccion"""
+    aprendices: List[AprendizActualizarLoteItem]
+
+    @validator('aprendices')
+    def validar_tamaño_lote(cls, v):
+        if not v:
+            raise ValueError('Debe enviar al menos un aprendiz')
+        if len(v) > MAXIMO_LOTE_APRENDICES:
+            raise ValueError(f'Máximo {MAXIMO_LOTE_APRENDICES} aprendices por lote')
+        return v
+
 class AprendixActualizarResponse(BaseModel):
     """Modelo de respuesta para la actualización de un aprendiz"""
     success: bool
@@ -44,8 +64,17 @@ class AprendixActualizarResponse(BaseModel):
 class ExportarF165Request(BaseModel):
     modalidad: str
     ficha: str
-    aprendices: List[AprendizParaExportar]
+    # Se puede enviar la lista completa de aprendices o solo sus documentos;
+    # en ambos casos las firmas se cargan desde la base de datos si no vienen en el cuerpo.
+    aprendices: Optional[List[AprendizParaExportar]] = None
+    documentos: Optional[List[str]] = None
     usuario_generator: UsuarioGenerador
     informacion_adicional: InformacionAdicional
 
+    @validator('documentos', always=True)
+    def validar_aprendices_o_documentos(cls, v, values):
+        if not v and not values.get('aprendices'):
+            raise ValueError('Debe enviar "aprendices" o "documentos"')
+        return v
+
     
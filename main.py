@@ -1,20 +1,37 @@
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from connection import base, crear
+from connection import crear, motores_replica
 from ENDPOINTS.fichas import router_tokens
 from ENDPOINTS.formatos import router_format
 from ENDPOINTS.aprendices import router_aprendices
 from ENDPOINTS.login import router_login
 from ENDPOINTS.usuarios import router_usuarios
+from ENDPOINTS.salud import router_salud
+from ENDPOINTS.exportacion_datos import router_exportacion
 
 from MODELS.a_usuarios import Usuarios
 from MODELS.archivo_excel import ArchivoExcel
 
 
 from MIDELWARE.security_middleware import SecurityMiddleware
+from MIDELWARE.compresion_middleware import CompresionMiddleware
+from MIDELWARE.consultas_middleware import ConsultasMiddleware
+from FUNCIONES.FUNCIONES_FORMATOS.verificador_integridad import iniciar_verificador_en_segundo_plano
+from FUNCIONES.FUNCIONES_CONSULTAS.serializacion import RespuestaJSON
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import text
 
-app = FastAPI(title="SENA - Procesador de Fichas")
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de archivo (ver _bloqueo_migraciones)
+    fcntl = None
+
+# RespuestaJSON serializa con orjson (si esta instalado) en lugar de json de la libreria estandar
+app = FastAPI(title="SENA - Procesador de Fichas", default_response_class=RespuestaJSON)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +39,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Sin esto el navegador no deja leer el cursor de la pagina siguiente (historial de exportaciones)
+    expose_headers=["X-Siguiente-Cursor"],
 )
 
 app.include_router(router_tokens)
@@ -29,13 +48,139 @@ app.include_router(router_format)
 app.include_router(router_aprendices)
 app.include_router(router_login)
 app.include_router(router_usuarios)
+app.include_router(router_salud)
+app.include_router(router_exportacion)
+
 
+# Conteo de consultas SQL por peticion y registro de consultas lentas (umbral en DB_CONSULTA_LENTA_MS).
+# Con DEBUG_CONSULTAS=1 la respuesta trae X-DB-Queries y X-DB-Time-Ms para detectar N+1
+app.add_middleware(ConsultasMiddleware, cabeceras=os.getenv("DEBUG_CONSULTAS", "0") == "1")
 
 # Agregar middleware de seguridad
 app.add_middleware(SecurityMiddleware, max_requests_per_minute=100)
 
+# Compresion (brotli si esta instalado, si no gzip) de las respuestas JSON/texto.
+# Se agrega al final para que sea el middleware mas externo y comprima tambien lo que produce
+# SecurityMiddleware; no comprime las descargas .xlsx ni acumula las respuestas en streaming.
+app.add_middleware(CompresionMiddleware, minimo_bytes=1024)
+
+
+# Segundos que un worker espera a que otro termine de migrar antes de fallar
+ESPERA_MIGRACIONES = int(os.getenv("MIGRACIONES_ESPERA_SEGUNDOS", 600))
+NOMBRE_BLOQUEO_MIGRACIONES = "sena_migraciones"
+# Segundos que se espera a que las replicas reciban la ultima migracion (ver revisar_replicas)
+ESPERA_REPLICAS = int(os.getenv("DB_REPLICAS_ESPERA_SEGUNDOS", 30))
+LLAVE_BLOQUEO_MIGRACIONES = 165  # pg_advisory_lock usa una llave numerica
+
+
+@contextmanager
+def _bloqueo_migraciones(carpeta: Path):
+    """
+    Con `uvicorn --workers N` cada worker importa este modulo: solo uno migra a la vez y los demas
+    esperan; cuando les toca la base ya esta en head y el upgrade no hace nada.
+    - MySQL / PostgreSQL: bloqueo con nombre en el servidor (sirve tambien entre varias maquinas)
+    - SQLite: bloqueo de archivo (flock) junto a alembic.ini; en Windows no hay bloqueo, ahi se
+      usa un solo worker o MIGRACIONES_AUTOMATICAS=0 con `alembic upgrade head` al desplegar
+    """
+    dialecto = crear.dialect.name
+    if dialecto == "mysql":
+        with crear.connect() as conexion:
+            obtenido = conexion.execute(
+                text("SELECT GET_LOCK(:nombre, :espera)"),
+                {"nombre": NOMBRE_BLOQUEO_MIGRACIONES, "espera": ESPERA_MIGRACIONES}
+            ).scalar()
+            if obtenido != 1:
+                raise RuntimeError(f"Otro proceso lleva mas de {ESPERA_MIGRACIONES} s aplicando las migraciones")
+            try:
+                yield
+            finally:
+                conexion.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": NOMBRE_BLOQUEO_MIGRACIONES})
+    elif dialecto == "postgresql":
+        with crear.connect() as conexion:
+            conexion.execute(text(f"SET lock_timeout = '{ESPERA_MIGRACIONES}s'"))
+            conexion.execute(text("SELECT pg_advisory_lock(:llave)"), {"llave": LLAVE_BLOQUEO_MIGRACIONES})
+            try:
+                yield
+            finally:
+                conexion.execute(text("SELECT pg_advisory_unlock(:llave)"), {"llave": LLAVE_BLOQUEO_MIGRACIONES})
+    else:
+        with open(carpeta / ".migraciones.lock", "w") as archivo:
+            if fcntl is not None:
+                fcntl.flock(archivo, fcntl.LOCK_EX)  # Se libera al cerrar el archivo
+            yield
+
+
+def _configuracion_alembic():
+    from alembic.config import Config
+
+    carpeta = Path(__file__).resolve().parent
+    config = Config(str(carpeta / "alembic.ini"))
+    config.set_main_option("script_location", str(carpeta / "migrations"))
+    config.attributes["configurar_logs"] = False  # No reemplazar la configuracion de logs de la app
+    return config
+
+
+def aplicar_migraciones():
+    """
+    Lleva el esquema a la ultima revision (migrations/versions) antes de atender peticiones.
+    Los workers que arrancan a la vez se turnan con _bloqueo_migraciones.
+    """
+    from alembic import command
+
+    config = _configuracion_alembic()
+    # migrations/env.py abre su propia conexion con `crear` (y en SQLite maneja las llaves foraneas)
+    with _bloqueo_migraciones(Path(__file__).resolve().parent):
+        command.upgrade(config, "head")
+
+
+def _revision_motor(motor) -> set:
+    from alembic.runtime.migration import MigrationContext
+
+    with motor.connect() as conexion:
+        return set(MigrationContext.configure(conexion).get_current_heads())
+
+
+def revisar_replicas(motores, espera: float = ESPERA_REPLICAS):
+    """
+    Las migraciones solo se aplican en la primaria (DB_URL): las replicas (DB_URLS_REPLICA) deben
+    recibir el esquema por la replicacion del motor. Se niega a arrancar si alguna replica no esta
+    en la ultima revision (por ejemplo un archivo SQLite local que nunca se migro), esperando hasta
+    `espera` segundos a que la replicacion traiga una migracion recien aplicada.
+    """
+    from alembic.script import ScriptDirectory
+
+    ultima = set(ScriptDirectory.from_config(_configuracion_alembic()).get_heads())
+    limite = time.monotonic() + espera
+    pendientes = list(motores)
+    while True:
+        pendientes = [motor for motor in pendientes if _revision_motor(motor) != ultima]
+        if not pendientes or time.monotonic() >= limite:
+            break
+        time.sleep(1)
+    if pendientes:
+        raise RuntimeError(
+            f"Las replicas {', '.join(m.url.render_as_string(hide_password=True) for m in pendientes)} "
+            f"no estan en la revision {', '.join(sorted(ultima))} de la primaria: deben ser replicas "
+            f"reales de DB_URL (las migraciones no se aplican en las replicas)"
+        )
+
+
+# Desactivable con MIGRACIONES_AUTOMATICAS=0: en produccion conviene aplicarlas como paso del despliegue
+# (`alembic upgrade head`) y arrancar los workers sin migrar
+if os.getenv("MIGRACIONES_AUTOMATICAS", "1") == "1":
+    aplicar_migraciones()
+
+# Con o sin migraciones automaticas, no se atiende con replicas en otra revision del esquema
+if motores_replica:
+    revisar_replicas(motores_replica)
+
 
-base.metadata.create_all(bind=crear)
+@app.on_event("startup")
+def iniciar_tareas_segundo_plano():
+    # Verificador de integridad de archivos exportados (desactivable con VERIFICADOR_INTEGRIDAD_ACTIVO=0).
+    # Con varios workers solo uno lo ejecuta (bloqueo de archivo en archivos_exportados)
+    if os.getenv("VERIFICADOR_INTEGRIDAD_ACTIVO", "1") == "1":
+        iniciar_verificador_en_segundo_plano()
 
 if __name__ == "__main__":
     import uvicorn
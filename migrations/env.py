@@ -0,0 +1,67 @@
+from logging.config import fileConfig
+from alembic import context
+from connection import base, crear
+import MODELS  # Registra todos los modelos en base.metadata
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configurar_logs", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = base.metadata
+
+
+def _incluir_objeto(objeto, nombre, tipo, reflejado, comparar_con):
+    """--autogenerate no compara objetos limitados a otro motor (Index(...).ddl_if(dialect="mysql"))"""
+    condicion = getattr(objeto, "_ddl_if", None)
+    dialecto = context.get_context().dialect.name
+    return condicion is None or condicion.dialect is None or condicion.dialect == dialecto
+
+
+def run_migrations_offline():
+    """Genera el SQL sin conectarse (alembic upgrade head --sql)"""
+    context.configure(
+        url=crear.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Se reutiliza la conexion si la pasa quien invoca (por ejemplo main.py al arrancar)
+    conexion = config.attributes.get("connection")
+    if conexion is not None:
+        _ejecutar(conexion)
+        return
+    with crear.connect() as conexion:
+        _ejecutar(conexion)
+
+
+def _ejecutar(conexion):
+    context.configure(
+        connection=conexion,
+        target_metadata=target_metadata,
+        render_as_batch=conexion.dialect.name == "sqlite",  # SQLite no soporta ALTER completo
+        compare_type=True,
+        include_object=_incluir_objeto,
+    )
+    # En SQLite batch_alter_table recrea la tabla (DROP + CREATE): con foreign_keys=ON (connection.py)
+    # el DROP falla si otra tabla la referencia. Se apagan durante la migracion, antes de abrir la
+    # transaccion (dentro de una transaccion el PRAGMA no tiene efecto)
+    sqlite = conexion.dialect.name == "sqlite"
+    if sqlite:
+        conexion.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    try:
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        if sqlite:
+            conexion.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
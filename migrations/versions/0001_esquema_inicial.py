@@ -0,0 +1,121 @@
+"""Esquema inicial
+
+Las tablas tal como las creaba base.metadata.create_all antes de las migraciones. Solo crea las que
+no existan, asi una base ya en uso queda registrada en esta revision sin tocar sus datos; los cambios
+posteriores del esquema van cada uno en su propia revision (0001a en adelante).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TEXTO_LARGO = sa.Text().with_variant(mysql.LONGTEXT(), "mysql")
+
+
+def _tablas():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    tablas = _tablas()
+
+    if "Usuarios" not in tablas:
+        op.create_table(
+            "Usuarios",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("nombre", sa.String(255), nullable=False),
+            sa.Column("apellidos", sa.String(255), nullable=False),
+            sa.Column("correo", sa.String(255), nullable=False, unique=True),
+            sa.Column("rol", sa.Enum("INSTRUCTOR", "ADMINISTRADOR", name="rol"), nullable=False),
+            sa.Column("contraseña", sa.String(255), nullable=True),
+        )
+
+    if "Fichas" not in tablas:
+        op.create_table(
+            "Fichas",
+            sa.Column("numero_ficha", sa.String(10), primary_key=True),
+            sa.Column("programa", sa.String(200)),
+            sa.Column("estado", sa.String(100)),
+            sa.Column("fecha_inicio", sa.Date),
+            sa.Column("fecha_fin", sa.Date),
+            sa.Column("fecha_reporte", sa.Date),
+            sa.Column("fecha_inicio_prod", sa.Date),
+            sa.Column("trimestre", sa.String(50)),
+            sa.Column("nivel_formacion", sa.String(20)),
+            sa.Column("modalidad_formacion", sa.String(20)),
+            sa.Column("jornada", sa.String(20)),
+        )
+
+    if "FichasMaestro" not in tablas:
+        op.create_table(
+            "FichasMaestro",
+            sa.Column("numero_ficha", sa.String(10), primary_key=True),
+            sa.Column("fecha_inicio", sa.Date),
+            sa.Column("fecha_fin", sa.Date),
+            sa.Column("fecha_actualizacion", sa.Date),
+        )
+
+    if "Aprendices" not in tablas:
+        op.create_table(
+            "Aprendices",
+            sa.Column("id_aprendiz", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("documento", sa.String(20), nullable=False, unique=True),
+            sa.Column("nombre", sa.String(100), nullable=False),
+            sa.Column("apellido", sa.String(100), nullable=False),
+            sa.Column("correo", sa.String(100), nullable=False),
+            sa.Column("celular", sa.String(20), nullable=False),
+            sa.Column("direccion", sa.String(200)),
+            sa.Column("departamento", sa.String(50)),
+            sa.Column("municipio", sa.String(50)),
+            sa.Column("tipo_documento", sa.String(10)),
+            sa.Column("estado", sa.String(50)),
+            sa.Column("firma", TEXTO_LARGO),
+            sa.Column("ultima_actualizacion", sa.DateTime),
+            sa.Column("discapacidad", sa.Enum("SI", "NO")),
+            sa.Column("tipo_discapacidad", sa.Enum(
+                "AUDITIVA", "VISUAL", "FISICA", "INTELECTUAL", "SORDOCEGUERA", "PSICOSOCIAL", "MULTIPLE"
+            )),
+            sa.Column("editado", sa.Boolean),
+            sa.Column("ficha_numero", sa.String(20), sa.ForeignKey("Fichas.numero_ficha")),
+        )
+    if "archivos_excel" not in tablas:
+        op.create_table(
+            "archivos_excel",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("nombre_original", sa.String(255), nullable=False),
+            sa.Column("nombre_interno", sa.String(500), nullable=False),
+            sa.Column("ruta_archivo", sa.String(500), nullable=False),
+            sa.Column("ficha", sa.String(20), nullable=False),
+            sa.Column("modalidad", sa.String(50), nullable=False),
+            sa.Column("cantidad_aprendices", sa.BigInteger, nullable=False),
+            sa.Column("aprendiz_documento", sa.String(20), sa.ForeignKey("Aprendices.documento")),
+            sa.Column("hash_archivo", sa.String(64), nullable=False),
+            sa.Column("tamaño_bytes", sa.BigInteger, nullable=False),
+            sa.Column("activo", sa.Boolean),
+            sa.Column("fecha_creacion", sa.DateTime),
+            sa.Column("fecha_modificacion", sa.DateTime),
+            sa.Column("usuario_id", sa.Integer, sa.ForeignKey("Usuarios.id")),
+        )
+
+    if "token_blacklist" not in tablas:
+        op.create_table(
+            "token_blacklist",
+            sa.Column("jti", sa.String(36), primary_key=True, index=True),
+            sa.Column("expires_at", sa.DateTime, nullable=False),
+        )
+
+
+def downgrade():
+    # Borra todas las tablas (y sus datos): primero las que referencian a otras
+    for tabla in ("token_blacklist", "archivos_excel", "Aprendices", "FichasMaestro", "Fichas", "Usuarios"):
+        op.drop_table(tabla)
+    if op.get_bind().dialect.name == "postgresql":
+        sa.Enum(name="rol").drop(op.get_bind(), checkfirst=True)
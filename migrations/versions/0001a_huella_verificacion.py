@@ -0,0 +1,26 @@
+"""Huella de verificacion de los archivos exportados
+
+- archivos_excel.huella_verificacion: mtime_ns-tamaño del archivo la ultima vez que su hash coincidio;
+  mientras no cambie, el archivo no se vuelve a leer para verificarlo
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "huella_verificacion" not in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("archivos_excel")}:
+        op.add_column("archivos_excel", sa.Column("huella_verificacion", sa.String(64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("archivos_excel") as batch:
+        batch.drop_column("huella_verificacion")
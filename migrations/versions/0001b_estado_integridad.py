@@ -0,0 +1,34 @@
+"""Estado de integridad de los archivos exportados
+
+- archivos_excel.estado_integridad: PENDIENTE / OK / CORRUPTO / FALTANTE (verificador en segundo plano)
+- archivos_excel.fecha_verificacion: ultima vez que el verificador reviso el archivo
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001b"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+COLUMNAS = [
+    sa.Column("estado_integridad", sa.String(20), nullable=False, server_default="PENDIENTE"),
+    sa.Column("fecha_verificacion", sa.DateTime, nullable=True),
+]
+
+
+def upgrade():
+    existentes = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("archivos_excel")}
+    for columna in COLUMNAS:
+        if columna.name not in existentes:
+            op.add_column("archivos_excel", columna.copy())
+
+
+def downgrade():
+    with op.batch_alter_table("archivos_excel") as batch:
+        for columna in reversed(COLUMNAS):
+            batch.drop_column(columna.name)
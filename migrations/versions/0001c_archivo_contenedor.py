@@ -0,0 +1,34 @@
+"""Ubicacion de los archivos archivados en paquetes zip
+
+- archivos_excel.archivo_contenedor: zip del mes donde quedo el archivo (NULL si sigue suelto)
+- archivos_excel.miembro_contenedor: nombre del archivo dentro del zip
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001c"
+down_revision = "0001b"
+branch_labels = None
+depends_on = None
+
+COLUMNAS = [
+    sa.Column("archivo_contenedor", sa.String(500), nullable=True),
+    sa.Column("miembro_contenedor", sa.String(500), nullable=True),
+]
+
+
+def upgrade():
+    existentes = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("archivos_excel")}
+    for columna in COLUMNAS:
+        if columna.name not in existentes:
+            op.add_column("archivos_excel", columna.copy())
+
+
+def downgrade():
+    with op.batch_alter_table("archivos_excel") as batch:
+        for columna in reversed(COLUMNAS):
+            batch.drop_column(columna.name)
@@ -0,0 +1,31 @@
+"""Firmas normalizadas en la fila del aprendiz
+
+- Aprendices.firma_png: PNG recortado y reducido de la firma
+- Aprendices.firma_hash: SHA256 de firma_png
+(0001e mueve los PNG a FirmasAprendices y quita firma_png)
+
+Revision ID: 0001d
+Revises: 0001c
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001d"
+down_revision = "0001c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existentes = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("Aprendices")}
+    # En una base que ya paso por 0001e firma_png no existe pero firma_hash si: no se vuelve a agregar
+    if "firma_hash" not in existentes:
+        op.add_column("Aprendices", sa.Column("firma_png", sa.LargeBinary, nullable=True))
+        op.add_column("Aprendices", sa.Column("firma_hash", sa.String(64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("Aprendices") as batch:
+        batch.drop_column("firma_hash")
+        batch.drop_column("firma_png")
@@ -0,0 +1,81 @@
+"""Almacen de firmas direccionado por contenido
+
+- FirmasAprendices: un PNG normalizado por hash, compartido por los aprendices con la misma firma
+- Los PNG de Aprendices.firma_png pasan al almacen y la columna se elimina
+- Aprendices.firma_hash pasa a ser llave foranea hacia FirmasAprendices
+
+Revision ID: 0001e
+Revises: 0001d
+Create Date: 2026-10-19
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001e"
+down_revision = "0001d"
+branch_labels = None
+depends_on = None
+
+FIRMAS = sa.table(
+    "FirmasAprendices",
+    sa.column("hash", sa.String), sa.column("contenido", sa.LargeBinary),
+    sa.column("tamaño_bytes", sa.Integer), sa.column("fecha_creacion", sa.DateTime),
+)
+APRENDICES = sa.table("Aprendices", sa.column("firma_hash", sa.String), sa.column("firma_png", sa.LargeBinary))
+
+
+def upgrade():
+    conexion = op.get_bind()
+    inspector = sa.inspect(conexion)
+    if "FirmasAprendices" not in inspector.get_table_names():
+        op.create_table(
+            "FirmasAprendices",
+            sa.Column("hash", sa.String(64), primary_key=True),
+            sa.Column("contenido", sa.LargeBinary, nullable=False),
+            sa.Column("tamaño_bytes", sa.Integer, nullable=False),
+            sa.Column("fecha_creacion", sa.DateTime, default=datetime.now),
+        )
+
+    columnas = {c["name"] for c in inspector.get_columns("Aprendices")}
+    if "firma_png" in columnas:
+        # Cada firma distinta se copia una vez (antes de crear la llave foranea que la exige)
+        existentes = {h for (h,) in conexion.execute(sa.select(FIRMAS.c.hash))}
+        filas = conexion.execute(
+            sa.select(APRENDICES.c.firma_hash, APRENDICES.c.firma_png).distinct()
+            .where(APRENDICES.c.firma_hash.isnot(None), APRENDICES.c.firma_png.isnot(None))
+        ).all()
+        ahora = datetime.now()
+        for firma_hash, contenido in filas:
+            if firma_hash not in existentes:
+                existentes.add(firma_hash)
+                conexion.execute(FIRMAS.insert().values(
+                    hash=firma_hash, contenido=contenido, tamaño_bytes=len(contenido), fecha_creacion=ahora
+                ))
+        # Un hash sin PNG no tiene que copiar: se limpia y el aprendiz conserva su firma original (firma)
+        conexion.execute(APRENDICES.update().where(
+            APRENDICES.c.firma_hash.isnot(None), APRENDICES.c.firma_hash.notin_(sa.select(FIRMAS.c.hash))
+        ).values(firma_hash=None))
+        with op.batch_alter_table("Aprendices") as batch:
+            batch.drop_column("firma_png")
+            batch.create_foreign_key("fk_aprendices_firma_hash", "FirmasAprendices", ["firma_hash"], ["hash"])
+
+
+def downgrade():
+    # La llave puede no tener nombre (bases creadas con create_all): en SQLite la nombra la convencion
+    llaves = [
+        llave for llave in sa.inspect(op.get_bind()).get_foreign_keys("Aprendices")
+        if llave["constrained_columns"] == ["firma_hash"]
+    ]
+    with op.batch_alter_table(
+        "Aprendices", naming_convention={"fk": "fk_%(table_name)s_%(column_0_name)s"}
+    ) as batch:
+        for llave in llaves:
+            batch.drop_constraint(llave["name"] or "fk_Aprendices_firma_hash", type_="foreignkey")
+        batch.add_column(sa.Column("firma_png", sa.LargeBinary, nullable=True))
+    conexion = op.get_bind()
+    for firma_hash, contenido in conexion.execute(sa.select(FIRMAS.c.hash, FIRMAS.c.contenido)).all():
+        conexion.execute(
+            APRENDICES.update().where(APRENDICES.c.firma_hash == firma_hash).values(firma_png=contenido)
+        )
+    op.drop_table("FirmasAprendices")
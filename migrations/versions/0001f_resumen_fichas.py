@@ -0,0 +1,101 @@
+"""Resumen por ficha
+
+- FichasResumen: totales por ficha mantenidos de forma incremental. La migracion lo llena a partir
+  de Aprendices y archivos_excel (las fichas que ya tengan resumen no se tocan), asi una base con
+  datos no muestra 0 aprendices ni fichas sin exportacion despues de actualizar. Con --sql (sin
+  conexion) solo se crea la tabla: despues hay que ejecutar `python -m FUNCIONES.FUNCIONES_FICHAS.resumen_fichas`
+
+Revision ID: 0001f
+Revises: 0001e
+Create Date: 2026-10-19
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001f"
+down_revision = "0001e"
+branch_labels = None
+depends_on = None
+
+# Igual que FUNCIONES_FICHAS/resumen_fichas.py (la migracion no importa codigo de la aplicacion)
+SIN_ESTADO = "SIN ESTADO"
+
+resumen = sa.table(
+    "FichasResumen",
+    sa.column("numero_ficha", sa.String),
+    sa.column("total_aprendices", sa.Integer),
+    sa.column("aprendices_por_estado", sa.JSON),
+    sa.column("total_editados", sa.Integer),
+    sa.column("total_exportaciones", sa.Integer),
+    sa.column("tiene_exportacion", sa.Boolean),
+    sa.column("ultimo_archivo_id", sa.Integer),
+    sa.column("fecha_actualizacion", sa.DateTime),
+)
+
+
+def _llenar_resumenes(conexion):
+    """Una fila por ficha con consultas agrupadas (no una consulta por ficha)"""
+    fichas = sa.table("Fichas", sa.column("numero_ficha"))
+    aprendices = sa.table("Aprendices", sa.column("ficha_numero"), sa.column("estado"),
+                          sa.column("editado"), sa.column("id_aprendiz"))
+    archivos = sa.table("archivos_excel", sa.column("ficha"), sa.column("id"))
+
+    existentes = {n for (n,) in conexion.execute(sa.select(resumen.c.numero_ficha))}
+    por_estado = defaultdict(Counter)
+    editados = Counter()
+    for ficha, estado, editado, cantidad in conexion.execute(
+        sa.select(aprendices.c.ficha_numero, aprendices.c.estado, aprendices.c.editado,
+                  sa.func.count(aprendices.c.id_aprendiz))
+        .group_by(aprendices.c.ficha_numero, aprendices.c.estado, aprendices.c.editado)
+    ):
+        por_estado[ficha][estado.strip() if estado and estado.strip() else SIN_ESTADO] += cantidad
+        if editado:
+            editados[ficha] += cantidad
+    exportaciones = {
+        ficha: (total, ultimo) for ficha, total, ultimo in conexion.execute(
+            sa.select(archivos.c.ficha, sa.func.count(archivos.c.id), sa.func.max(archivos.c.id))
+            .group_by(archivos.c.ficha)
+        )
+    }
+
+    ahora = datetime.now()
+    filas = []
+    for (numero_ficha,) in conexion.execute(sa.select(fichas.c.numero_ficha)):
+        if numero_ficha in existentes:
+            continue
+        total_exportaciones, ultimo_archivo_id = exportaciones.get(numero_ficha, (0, None))
+        filas.append({
+            "numero_ficha": numero_ficha,
+            "total_aprendices": sum(por_estado[numero_ficha].values()),
+            "aprendices_por_estado": dict(por_estado[numero_ficha]),
+            "total_editados": editados[numero_ficha],
+            "total_exportaciones": total_exportaciones,
+            "tiene_exportacion": total_exportaciones > 0,
+            "ultimo_archivo_id": ultimo_archivo_id,
+            "fecha_actualizacion": ahora,
+        })
+    if filas:
+        op.bulk_insert(resumen, filas)
+
+
+def upgrade():
+    if "FichasResumen" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "FichasResumen",
+            sa.Column("numero_ficha", sa.String(10), sa.ForeignKey("Fichas.numero_ficha"), primary_key=True),
+            sa.Column("total_aprendices", sa.Integer, nullable=False),
+            sa.Column("aprendices_por_estado", sa.JSON, nullable=False),
+            sa.Column("total_editados", sa.Integer, nullable=False),
+            sa.Column("total_exportaciones", sa.Integer, nullable=False),
+            sa.Column("tiene_exportacion", sa.Boolean, nullable=False),
+            sa.Column("ultimo_archivo_id", sa.Integer),
+            sa.Column("fecha_actualizacion", sa.DateTime),
+        )
+    if not op.get_context().as_sql:
+        _llenar_resumenes(op.get_bind())
+
+
+def downgrade():
+    op.drop_table("FichasResumen")
@@ -0,0 +1,44 @@
+"""Indices compuestos para las consultas frecuentes
+
+- archivos_excel (ficha, activo, fecha_creacion): historial y archivo por ficha
+- archivos_excel (usuario_id, fecha_creacion): archivos por usuario
+- archivos_excel (fecha_creacion, id): paginacion del historial completo
+- archivos_excel (ficha, aprendiz_documento): exportaciones individuales de un aprendiz
+- Aprendices (ficha_numero, documento): aprendices de una ficha / aprendiz dentro de su ficha
+- token_blacklist (expires_at): limpieza de tokens vencidos
+
+Revision ID: 0002
+Revises: 0001f
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001f"
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ("ix_archivos_excel_ficha_activo_fecha", "archivos_excel", ["ficha", "activo", "fecha_creacion"]),
+    ("ix_archivos_excel_usuario_fecha", "archivos_excel", ["usuario_id", "fecha_creacion"]),
+    ("ix_archivos_excel_fecha_id", "archivos_excel", ["fecha_creacion", "id"]),
+    ("ix_archivos_excel_ficha_documento", "archivos_excel", ["ficha", "aprendiz_documento"]),
+    ("ix_aprendices_ficha_documento", "Aprendices", ["ficha_numero", "documento"]),
+    ("ix_token_blacklist_expires_at", "token_blacklist", ["expires_at"]),
+]
+
+
+def _indices_existentes(tabla):
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(tabla)}
+
+
+def upgrade():
+    for nombre, tabla, columnas in INDICES:
+        if nombre not in _indices_existentes(tabla):
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,30 @@
+"""Contador de revision de fichas e indice para la version de sus aprendices
+
+- Fichas.revision: sube con cada escritura que cambia las lecturas de la ficha (ETag)
+- Aprendices (ficha_numero, ultima_actualizacion): MAX(ultima_actualizacion) por ficha sin leer filas
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "revision" not in {c["name"] for c in inspector.get_columns("Fichas")}:
+        op.add_column("Fichas", sa.Column("revision", sa.Integer, nullable=False, server_default="0"))
+    if "ix_aprendices_ficha_actualizacion" not in {i["name"] for i in inspector.get_indexes("Aprendices")}:
+        op.create_index("ix_aprendices_ficha_actualizacion", "Aprendices", ["ficha_numero", "ultima_actualizacion"])
+
+
+def downgrade():
+    op.drop_index("ix_aprendices_ficha_actualizacion", table_name="Aprendices")
+    with op.batch_alter_table("Fichas") as batch:
+        batch.drop_column("revision")
@@ -0,0 +1,36 @@
+"""Indices para la busqueda de aprendices (/aprendices/search)
+
+- Aprendices (nombre) y (apellido): busqueda por prefijo con LIKE 'texto%'
+- Aprendices FULLTEXT (nombre, apellido), solo en MySQL: busqueda por palabras
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _indices_existentes():
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("Aprendices")}
+
+
+def upgrade():
+    existentes = _indices_existentes()
+    for nombre, columna in (("ix_aprendices_nombre", "nombre"), ("ix_aprendices_apellido", "apellido")):
+        if nombre not in existentes:
+            op.create_index(nombre, "Aprendices", [columna])
+    if op.get_bind().dialect.name == "mysql" and "ft_aprendices_nombre_apellido" not in existentes:
+        op.create_index("ft_aprendices_nombre_apellido", "Aprendices", ["nombre", "apellido"], mysql_prefix="FULLTEXT")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index("ft_aprendices_nombre_apellido", table_name="Aprendices")
+    op.drop_index("ix_aprendices_apellido", table_name="Aprendices")
+    op.drop_index("ix_aprendices_nombre", table_name="Aprendices")
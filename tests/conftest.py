@@ -0,0 +1,160 @@
+# Pruebas con la app completa (main.app) sobre una base SQLite temporal.
+# Se ejecutan desde la raiz del proyecto con: python -m pytest -q
+import base64
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+CARPETA_PRUEBAS = Path(tempfile.mkdtemp(prefix="sena_pruebas_"))
+
+# connection.py lee DB_URL al importarse: se fija antes de importar la app
+os.environ["DB_URL"] = f"sqlite:///{CARPETA_PRUEBAS / 'pruebas.db'}"
+os.environ.pop("DB_URL_ASYNC", None)
+os.environ.pop("DB_URLS_REPLICA", None)
+os.environ["MIGRACIONES_AUTOMATICAS"] = "1"  # La base de pruebas se crea con las migraciones
+os.environ["VERIFICADOR_INTEGRIDAD_ACTIVO"] = "0"
+os.environ["CACHE_BACKEND"] = "ninguno"  # Sin cache de respuestas: cada peticion llega a la base
+os.environ.setdefault("SECRET_KEY", "clave-de-pruebas")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "5")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "1")
+
+sys.path.insert(0, str(RAIZ))
+os.chdir(CARPETA_PRUEBAS)  # security.log y archivos_exportados quedan en la carpeta temporal
+
+# Cantidades de la semilla: los limites de consultas no deben depender de ellas (sin N+1)
+TOTAL_FICHAS = 15
+TOTAL_USUARIOS = 4
+TOTAL_ARCHIVOS = 30  # Con usuario; ademas hay una exportacion sin usuario
+
+
+def paginar(cliente, url, limite, cursor_en_cabecera, **params):
+    """
+    Recorre todas las paginas de un listado paginado por cursor y devuelve las filas.
+    El cursor viene en la cabecera X-Siguiente-Cursor (historiales) o en `siguiente_cursor` (/fichas/).
+    """
+    filas, cursor = [], None
+    while True:
+        respuesta = cliente.get(url, params={**params, "limite": limite, **({"cursor": cursor} if cursor else {})})
+        assert respuesta.status_code == 200, respuesta.text
+        cuerpo = respuesta.json()
+        if cursor_en_cabecera:
+            filas += cuerpo
+            cursor = respuesta.headers.get("x-siguiente-cursor")
+        else:
+            filas += cuerpo["fichas"]
+            cursor = cuerpo["siguiente_cursor"]
+        if not cursor:
+            return filas
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    yield main.app
+    shutil.rmtree(CARPETA_PRUEBAS, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def cliente(app):
+    from fastapi.testclient import TestClient
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture(autouse=True)
+def sin_limite_de_peticiones():
+    """Todas las pruebas llegan desde la misma IP: cada una empieza con el contador de SecurityMiddleware en cero"""
+    from MIDELWARE.security_middleware import rate_limit_storage
+    rate_limit_storage.clear()
+
+
+@pytest.fixture
+def db(app):
+    from connection import SessionLocal
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+
+@pytest.fixture(scope="session")
+def datos(app):
+    """Fichas con aprendices, usuarios y un historial de exportaciones repartido entre ellos"""
+    from connection import SessionLocal
+    from FUNCIONES.FUNCIONES_FICHAS.resumen_fichas import recalcular_resumen
+    from MODELS import Aprendiz, ArchivoExcel, Ficha, Usuarios
+
+    sesion = SessionLocal()
+    try:
+        fichas = [f"{2000000 + i}" for i in range(TOTAL_FICHAS)]
+        for i, numero_ficha in enumerate(fichas):
+            sesion.add(Ficha(numero_ficha=numero_ficha, programa=f"PROGRAMA {i % 3}", estado="EN EJECUCION"))
+        for i in range(TOTAL_USUARIOS):
+            sesion.add(Usuarios(id=i + 1, nombre=f"Nombre{i}", apellidos=f"Apellido{i}",
+                                correo=f"usuario{i}@sena.edu.co", rol="INSTRUCTOR"))
+        sesion.flush()
+        for i, numero_ficha in enumerate(fichas):
+            for j in range(3):
+                sesion.add(Aprendiz(documento=f"{i}{j:03d}", nombre=f"N{j}", apellido=f"A{j}",
+                                    correo="aprendiz@sena.edu.co", celular="3000000000",
+                                    ficha_numero=numero_ficha, estado="EN FORMACION",
+                                    tipo_documento="CC", discapacidad="NO"))
+        inicio = datetime(2026, 1, 1)
+        for i in range(TOTAL_ARCHIVOS):
+            sesion.add(ArchivoExcel(
+                nombre_original=f"formato_{i}.xlsx", nombre_interno=f"interno_{i}.xlsx",
+                ruta_archivo=f"archivos_exportados/interno_{i}.xlsx", ficha=fichas[i % TOTAL_FICHAS],
+                modalidad="grupal" if i % 2 else "individual", cantidad_aprendices=3,
+                hash_archivo=f"{i:064d}", tamaño_bytes=1024, usuario_id=i % TOTAL_USUARIOS + 1,
+                fecha_creacion=inicio + timedelta(hours=i)
+            ))
+        # Exportacion sin usuario: /archivo/historial la omite (JOIN interno), los demas listados no
+        sesion.add(ArchivoExcel(
+            nombre_original="sin_usuario.xlsx", nombre_interno="sin_usuario.xlsx",
+            ruta_archivo="archivos_exportados/sin_usuario.xlsx", ficha=fichas[0], modalidad="grupal",
+            cantidad_aprendices=3, hash_archivo="f" * 64, tamaño_bytes=1024, usuario_id=None,
+            fecha_creacion=inicio - timedelta(days=1)
+        ))
+        sesion.flush()
+        for numero_ficha in fichas:
+            recalcular_resumen(sesion, numero_ficha)
+        sesion.commit()
+    finally:
+        sesion.close()
+
+
+@pytest.fixture
+def limite_consultas():
+    """
+    Context manager de FUNCIONES_CONSULTAS/instrumentacion.py: falla si el bloque ejecuta mas de
+    `maximo` consultas.
+
+        def test_listado(cliente, limite_consultas):
+            with limite_consultas(2, "/fichas/"):
+                cliente.get("/fichas/")
+    """
+    from FUNCIONES.FUNCIONES_CONSULTAS.instrumentacion import limite_consultas
+    return limite_consultas
+
+
+@pytest.fixture(scope="session")
+def firma_data_url():
+    """Firma como la envia el canvas del frontend: PNG transparente de 800x300 en data URL"""
+    from PIL import Image, ImageDraw
+
+    def crear(desplazamiento: int = 0) -> str:
+        imagen = Image.new("RGBA", (800, 300), (0, 0, 0, 0))
+        ImageDraw.Draw(imagen).line((100 + desplazamiento, 100, 600, 200), fill=(0, 0, 0, 255), width=6)
+        salida = BytesIO()
+        imagen.save(salida, "PNG")
+        return "data:image/png;base64," + base64.b64encode(salida.getvalue()).decode("ascii")
+    return crear
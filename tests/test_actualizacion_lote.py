@@ -0,0 +1,63 @@
+# PATCH /aprendices/batch: cada aprendiz con su resultado; los que fallan no se modifican
+from MODELS import Aprendiz, FichaResumen
+from MODELS.firma_aprendiz import FirmaAprendiz
+
+FICHA = "2000011"  # Aprendices 11000, 11001 y 11002 de la semilla
+
+
+def _lote(cliente, *aprendices):
+    respuesta = cliente.patch("/aprendices/batch", json={
+        "aprendices": [{"documento": documento, "cambios": cambios} for documento, cambios in aprendices]
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()
+
+
+def test_errores_por_aprendiz(cliente, datos, db):
+    cuerpo = _lote(
+        cliente,
+        ("11000", {"direccion": "Calle 10"}),
+        ("99999", {"direccion": "Calle 11"}),         # No existe
+        ("11000", {"direccion": "Calle 12"}),         # Repetido en el lote
+        ("11001", {"documento": "11002"}),            # Documento de otro aprendiz
+        ("11002", {"firma": "data:image/png;base64,bm8gZXMgdW5hIGltYWdlbg=="}),  # Firma invalida
+    )
+    assert (cuerpo["actualizados"], cuerpo["errores"], cuerpo["success"]) == (1, 4, False)
+    resultados = cuerpo["resultados"]
+    assert [r["documento"] for r in resultados] == ["11000", "99999", "11000", "11001", "11002"]
+    assert [r["success"] for r in resultados] == [True, False, False, False, False]
+    assert resultados[0]["campos_actualizados"] == ["direccion"]
+    assert "no encontrado" in resultados[1]["error"]
+    assert "repetido" in resultados[2]["error"]
+    assert "ya está registrado" in resultados[3]["error"]
+    assert "imagen válida" in resultados[4]["error"]
+
+    filas = {a.documento: a for a in db.query(Aprendiz).filter(Aprendiz.ficha_numero == FICHA)}
+    assert set(filas) == {"11000", "11001", "11002"}
+    assert filas["11000"].direccion == "Calle 10" and filas["11000"].editado
+    assert not filas["11001"].editado and not filas["11002"].editado
+    assert filas["11002"].firma_hash is None
+    assert db.get(FichaResumen, FICHA).total_editados == 1
+
+
+def test_validacion_del_lote(cliente, datos):
+    assert cliente.patch("/aprendices/batch", json={"aprendices": []}).status_code == 422
+
+
+def test_misma_firma_se_guarda_una_vez(cliente, datos, db, firma_data_url):
+    firma = firma_data_url(desplazamiento=37)
+    cuerpo = _lote(cliente, ("11001", {"firma": firma}), ("11002", {"firma": firma}))
+    assert cuerpo["errores"] == 0
+
+    hashes = {a.firma_hash for a in db.query(Aprendiz).filter(Aprendiz.documento.in_(["11001", "11002"]))}
+    assert len(hashes) == 1 and None not in hashes
+    firma_hash = hashes.pop()
+    assert db.query(FirmaAprendiz).filter(FirmaAprendiz.hash == firma_hash).count() == 1
+    assert all(r["firma"].endswith(f"?v={firma_hash[:16]}") for r in cuerpo["resultados"])
+
+    # La misma firma en otro PATCH reutiliza la fila del almacen
+    total = db.query(FirmaAprendiz).count()
+    assert cliente.patch("/aprendices/11000", json={"firma": firma}).status_code == 200
+    db.expire_all()
+    assert db.query(FirmaAprendiz).count() == total
+    assert db.query(Aprendiz.firma_hash).filter(Aprendiz.documento == "11000").scalar() == firma_hash
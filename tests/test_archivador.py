@@ -0,0 +1,58 @@
+# Restauracion de archivos de meses frios: varias instancias (una por FormatoService) a la vez
+import hashlib
+import os
+import threading
+import time
+import zipfile
+
+from FUNCIONES.FUNCIONES_FORMATOS.archivador import ArchivadorExportaciones
+from MODELS.archivo_excel import ArchivoExcel
+
+
+def _archivado(base_path, contenido: bytes, nombre="formato.xlsx"):
+    (base_path / "archivo_frio").mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(base_path / "archivo_frio" / "2025-01.zip", "a") as paquete:
+        paquete.writestr(nombre, contenido)
+    return ArchivoExcel(
+        nombre_interno=nombre, hash_archivo=hashlib.sha256(contenido).hexdigest(),
+        archivo_contenedor="archivo_frio/2025-01.zip", miembro_contenedor=nombre
+    )
+
+
+def test_restauraciones_simultaneas_de_varias_instancias(tmp_path):
+    contenido = os.urandom(3 * 1024 * 1024)
+    archivo_db = _archivado(tmp_path, contenido)
+    rutas, errores = [], []
+
+    def restaurar():
+        try:
+            rutas.append(ArchivadorExportaciones(base_path=tmp_path).restaurar(archivo_db))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=restaurar) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert len(set(rutas)) == 1
+    assert rutas[0].read_bytes() == contenido
+    assert list((tmp_path / ".cache_restaurados").glob("*.tmp")) == []
+
+
+def test_poda_respeta_el_periodo_de_gracia(tmp_path):
+    instancia = ArchivadorExportaciones(base_path=tmp_path, maximo_cache=1)
+    antiguo = _archivado(tmp_path, b"antiguo", "antiguo.xlsx")
+    reciente = _archivado(tmp_path, b"reciente", "reciente.xlsx")
+
+    ruta_antigua = instancia.restaurar(antiguo)
+    hace_una_hora = time.time() - 3600
+    os.utime(ruta_antigua, (hace_una_hora, hace_una_hora))
+    ruta_reciente = instancia.restaurar(reciente)
+    assert not ruta_antigua.exists()  # Sobra y ya paso su periodo de gracia
+
+    # Recien restaurado: aunque sobre, no se borra antes de que la descarga lo abra
+    instancia.restaurar(antiguo)
+    assert ruta_reciente.exists()
@@ -0,0 +1,103 @@
+# Cache de respuestas: un PATCH o una exportacion descartan las respuestas guardadas de la ficha
+import shutil
+
+import pytest
+
+from conftest import RAIZ
+
+FICHA = "2000012"  # Aprendices 12000, 12001 y 12002 de la semilla
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """La cache de pruebas es BackendNulo (CACHE_BACKEND=ninguno): aqui se usa una en memoria"""
+    from FUNCIONES.FUNCIONES_CACHE.cache_respuestas import BackendMemoria, cache_respuestas
+    monkeypatch.setattr(cache_respuestas, "backend", BackendMemoria())
+    return cache_respuestas
+
+
+def _entradas(cache) -> list:
+    return list(cache.backend._datos)
+
+
+def test_respuesta_guardada_y_acierto(cliente, datos, cache):
+    primera = cliente.get(f"/ficha/{FICHA}/aprendices")
+    aciertos = cache.aciertos
+    segunda = cliente.get(f"/ficha/{FICHA}/aprendices")
+    assert segunda.content == primera.content
+    assert cache.aciertos == aciertos + 1
+    assert all(clave.startswith(f"ficha:{FICHA}:") for clave in _entradas(cache))
+
+
+def test_patch_invalida_ficha_y_aprendiz(cliente, datos, cache):
+    cliente.get(f"/ficha/{FICHA}/aprendices")
+    cliente.get("/aprendices/12000")
+    cliente.get("/aprendices/13000")  # De otra ficha: no se invalida
+    guardadas = _entradas(cache)
+    assert any(clave.startswith("aprendiz:12000:") for clave in guardadas)
+
+    respuesta = cliente.patch("/aprendices/12000", json={"direccion": "Carrera 7"})
+    assert respuesta.status_code == 200, respuesta.text
+    restantes = _entradas(cache)
+    assert not any(c.startswith(f"ficha:{FICHA}:") or c.startswith("aprendiz:12000:") for c in restantes)
+    assert any(c.startswith("aprendiz:13000:") for c in restantes)
+
+    aprendices = cliente.get(f"/ficha/{FICHA}/aprendices").json()["aprendices"]
+    assert next(a for a in aprendices if a["documento"] == "12000")["direccion"] == "Carrera 7"
+    assert cliente.get("/aprendices/12000").json()["aprendiz"]["direccion"] == "Carrera 7"
+
+
+def test_patch_en_lote_invalida(cliente, datos, cache):
+    cliente.get(f"/ficha/{FICHA}/aprendices")
+    respuesta = cliente.patch("/aprendices/batch", json={
+        "aprendices": [{"documento": "12001", "cambios": {"direccion": "Carrera 8"}}]
+    })
+    assert respuesta.json()["errores"] == 0
+    assert not any(c.startswith(f"ficha:{FICHA}:") for c in _entradas(cache))
+    aprendices = cliente.get(f"/ficha/{FICHA}/aprendices").json()["aprendices"]
+    assert next(a for a in aprendices if a["documento"] == "12001")["direccion"] == "Carrera 8"
+
+
+@pytest.fixture
+def plantillas():
+    """Las plantillas F165 se abren con ruta relativa: se copian a la carpeta de la prueba"""
+    for nombre in ("GRUPAL-F165.xlsx", "INDIVIDUAL-F165.xlsx"):
+        shutil.copy(RAIZ / nombre, nombre)
+
+
+@pytest.fixture
+def exportacion(cliente, datos, plantillas):
+    """Exporta el F165 grupal de la ficha; al terminar la exportacion se desactiva (los listados no cambian)"""
+    from connection import SessionLocal
+    from MODELS import ArchivoExcel
+
+    def exportar():
+        respuesta = cliente.post("/exportar-f165", json={
+            "modalidad": "grupal", "ficha": FICHA, "documentos": ["12000", "12001", "12002"],
+            "usuario_generator": {"id": 1, "nombre": "Nombre0", "apellidos": "Apellido0",
+                                  "correo": "usuario0@sena.edu.co", "rol": "INSTRUCTOR"},
+            "informacion_adicional": {"nivel_formacion": "TECNICO", "modalidad_formacion": "PRESENCIAL",
+                                      "jornada": "DIURNA"},
+        })
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta
+
+    yield exportar
+    sesion = SessionLocal()
+    try:
+        ultimo = sesion.query(ArchivoExcel).filter(ArchivoExcel.ficha == FICHA).order_by(ArchivoExcel.id.desc()).first()
+        ultimo.activo = False
+        sesion.commit()
+    finally:
+        sesion.close()
+
+
+def test_exportacion_invalida_ficha(cliente, cache, exportacion):
+    antes = cliente.get(f"/ficha/{FICHA}/aprendices").json()
+    assert any(c.startswith(f"ficha:{FICHA}:") for c in _entradas(cache))
+
+    exportacion()
+    assert not any(c.startswith(f"ficha:{FICHA}:") for c in _entradas(cache))
+    despues = cliente.get(f"/ficha/{FICHA}/aprendices").json()
+    assert despues["archivo_existente"] is True
+    assert despues["id_archivo"] != antes.get("id_archivo")
@@ -0,0 +1,71 @@
+# Reglas de CompresionMiddleware: que se comprime y que se envia tal cual
+import pytest
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture(scope="module")
+def descarga(datos):
+    """Ruta de descarga de una exportacion de la semilla con un archivo de mas de 1 KB"""
+    from connection import SessionLocal
+    from MODELS import ArchivoExcel
+    from ENDPOINTS.formatos import format_service
+
+    sesion = SessionLocal()
+    try:
+        archivo_db = sesion.query(ArchivoExcel).filter(ArchivoExcel.nombre_interno == "interno_1.xlsx").one()
+        ruta = format_service.base_path / archivo_db.ruta_archivo
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(b"PK" + b"\0" * 4096)
+        return f"/descargar-archivo/{archivo_db.id}", f'"{archivo_db.hash_archivo}"'
+    finally:
+        sesion.close()
+
+
+def test_comprime_json_grande(cliente, datos):
+    respuesta = cliente.get("/historial-exportaciones", params={"limite": 500}, headers=GZIP)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in respuesta.headers["vary"]
+    assert len(respuesta.json()) > 1  # httpx descomprime
+
+
+def test_no_comprime_json_pequeño(cliente, datos):
+    respuesta = cliente.get("/fichas/", params={"limite": 1}, headers=GZIP)
+    assert len(respuesta.content) < 1024
+    assert "content-encoding" not in respuesta.headers
+
+
+def test_respeta_q_cero(cliente, datos):
+    respuesta = cliente.get("/historial-exportaciones", params={"limite": 500},
+                            headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in respuesta.headers
+
+
+def test_no_comprime_binarios_ni_parciales(cliente, descarga):
+    url, etag = descarga
+    completa = cliente.get(url, headers=GZIP)
+    assert completa.status_code == 200
+    assert "content-encoding" not in completa.headers
+    assert completa.headers["etag"] == etag  # ETag fuerte: los bytes son los originales
+
+    parcial = cliente.get(url, headers={**GZIP, "Range": "bytes=0-1"})
+    assert parcial.status_code == 206 and parcial.content == b"PK"
+    assert "content-encoding" not in parcial.headers
+
+    no_modificado = cliente.get(url, headers={**GZIP, "If-None-Match": etag})
+    assert no_modificado.status_code == 304
+    assert "content-encoding" not in no_modificado.headers
+
+
+def test_head_no_se_comprime(cliente, datos):
+    respuesta = cliente.head("/historial-exportaciones", params={"limite": 500}, headers=GZIP)
+    assert "content-encoding" not in respuesta.headers
+
+
+def test_streaming_se_comprime_por_bloques(cliente, datos):
+    respuesta = cliente.get("/export/aprendices", params={"formato": "csv"}, headers=GZIP)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert "content-length" not in respuesta.headers  # Se envia por bloques (chunked)
+    assert respuesta.content.decode("utf-8-sig").startswith("id,documento")
@@ -0,0 +1,87 @@
+# Descargas de exportaciones: ETag / If-None-Match (304) y Range / If-Range (206, 416)
+import pytest
+
+CONTENIDO = bytes(range(256)) * 8  # 2048 bytes
+
+
+@pytest.fixture(scope="module")
+def archivo(datos):
+    """Primera exportacion de la semilla, con su archivo en archivos_exportados/"""
+    from connection import SessionLocal
+    from MODELS import ArchivoExcel
+    from ENDPOINTS.formatos import format_service
+
+    sesion = SessionLocal()
+    try:
+        archivo_db = sesion.query(ArchivoExcel).filter(ArchivoExcel.nombre_interno == "interno_0.xlsx").one()
+        ruta = format_service.base_path / archivo_db.ruta_archivo
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(CONTENIDO)
+        return f"/descargar-archivo/{archivo_db.id}", f'"{archivo_db.hash_archivo}"'
+    finally:
+        sesion.close()
+
+
+def test_descarga_completa(cliente, archivo):
+    url, etag = archivo
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+    assert respuesta.content == CONTENIDO
+    assert respuesta.headers["etag"] == etag
+    assert respuesta.headers["accept-ranges"] == "bytes"
+    assert respuesta.headers["content-length"] == str(len(CONTENIDO))
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"otro", {etag}', "*"])
+def test_if_none_match_responde_304(cliente, archivo, if_none_match):
+    url, etag = archivo
+    respuesta = cliente.get(url, headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert respuesta.status_code == 304
+    assert respuesta.content == b""
+    assert respuesta.headers["etag"] == etag
+
+
+def test_if_none_match_distinto_descarga(cliente, archivo):
+    url, _ = archivo
+    assert cliente.get(url, headers={"If-None-Match": '"otro"'}).status_code == 200
+
+
+@pytest.mark.parametrize("rango, inicio, fin", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=2000-", 2000, 2047),
+    ("bytes=-5", 2043, 2047),
+    ("bytes=2040-9999", 2040, 2047),
+])
+def test_rango_responde_206(cliente, archivo, rango, inicio, fin):
+    url, _ = archivo
+    respuesta = cliente.get(url, headers={"Range": rango})
+    assert respuesta.status_code == 206
+    assert respuesta.content == CONTENIDO[inicio:fin + 1]
+    assert respuesta.headers["content-range"] == f"bytes {inicio}-{fin}/{len(CONTENIDO)}"
+    assert respuesta.headers["content-length"] == str(fin - inicio + 1)
+
+
+@pytest.mark.parametrize("rango", ["bytes=2048-", "bytes=-0", "bytes=30-20"])
+def test_rango_no_satisfacible_responde_416(cliente, archivo, rango):
+    url, _ = archivo
+    respuesta = cliente.get(url, headers={"Range": rango})
+    assert respuesta.status_code == 416
+    assert respuesta.headers["content-range"] == f"bytes */{len(CONTENIDO)}"
+
+
+@pytest.mark.parametrize("rango", ["bytes=0-1,5-6", "lineas=1-2", "bytes=a-b"])
+def test_rango_no_soportado_descarga_completo(cliente, archivo, rango):
+    url, _ = archivo
+    respuesta = cliente.get(url, headers={"Range": rango})
+    assert respuesta.status_code == 200
+    assert respuesta.content == CONTENIDO
+
+
+def test_if_range(cliente, archivo):
+    url, etag = archivo
+    parcial = cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert parcial.status_code == 206 and parcial.content == CONTENIDO[:10]
+    # Con otra version del archivo el rango no aplica: se envia completo
+    completo = cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": '"otro"'})
+    assert completo.status_code == 200 and completo.content == CONTENIDO
+
@@ -0,0 +1,79 @@
+# Firmas de los aprendices: las respuestas traen una URL absoluta (el frontend se sirve desde otro origen)
+from urllib.parse import urlsplit
+
+import pytest
+
+DOCUMENTO = "0000"  # Primer aprendiz de la primera ficha de la semilla
+FICHA = "2000000"
+
+
+@pytest.fixture(scope="module")
+def url_firma(cliente, datos, firma_data_url):
+    """Asigna una firma al aprendiz y devuelve la URL que responde el PATCH"""
+    respuesta = cliente.patch(f"/aprendices/{DOCUMENTO}", json={"firma": firma_data_url()})
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["aprendiz_actualizado"]["firma"]
+
+
+def test_firma_se_devuelve_como_url_absoluta(cliente, url_firma):
+    url = url_firma
+    assert url.startswith("http://testserver/aprendices/")
+
+    for ruta in (f"/aprendices/{DOCUMENTO}", f"/individual/{FICHA}/{DOCUMENTO}"):
+        assert cliente.get(ruta).json()["aprendiz"]["firma"] == url
+    aprendices = cliente.get(f"/ficha/{FICHA}/aprendices", params={"fields": "documento,firma"}).json()["aprendices"]
+    assert {"documento": DOCUMENTO, "firma": url} in aprendices
+
+    partes = urlsplit(url)
+    imagen = cliente.get(f"{partes.path}?{partes.query}")
+    assert imagen.status_code == 200
+    assert imagen.headers["content-type"] == "image/png"
+
+
+def test_url_publica_configurada(cliente, url_firma, monkeypatch):
+    from FUNCIONES.FUNCIONES_APRENDICES import firmas_service
+    monkeypatch.setattr(firmas_service, "API_URL_PUBLICA", "https://api.sena.edu.co")
+
+    aprendices = cliente.get(f"/ficha/{FICHA}/aprendices", params={"fields": "documento,firma"}).json()["aprendices"]
+    firma = next(a["firma"] for a in aprendices if a["documento"] == DOCUMENTO)
+    assert firma.startswith("https://api.sena.edu.co/aprendices/")
+
+
+def test_include_firma_devuelve_data_url(cliente, url_firma):
+    aprendices = cliente.get(
+        f"/ficha/{FICHA}/aprendices", params={"fields": "documento,firma", "include_firma": True}
+    ).json()["aprendices"]
+    firma = next(a["firma"] for a in aprendices if a["documento"] == DOCUMENTO)
+    assert firma.startswith("data:image/png;base64,")
+
+
+def test_normalizar_firma(firma_data_url):
+    import hashlib
+    from io import BytesIO
+    from PIL import Image
+    from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import normalizar_firma, ANCHO_FIRMA, ALTO_FIRMA
+
+    data_url = firma_data_url()
+    contenido, firma_hash = normalizar_firma(data_url)
+    assert firma_hash == hashlib.sha256(contenido).hexdigest()
+    imagen = Image.open(BytesIO(contenido))
+    assert imagen.mode == "LA"
+    assert imagen.width <= ANCHO_FIRMA and imagen.height <= ALTO_FIRMA
+
+    # Con o sin el encabezado de data URL es la misma firma (mismo hash en el almacen)
+    assert normalizar_firma(data_url.split(",", 1)[1])[1] == firma_hash
+    assert normalizar_firma(firma_data_url(desplazamiento=50))[1] != firma_hash
+
+
+def test_normalizar_firma_invalida_o_vacia():
+    import base64
+    from io import BytesIO
+    from PIL import Image
+    from FUNCIONES.FUNCIONES_APRENDICES.firmas_service import normalizar_firma
+
+    with pytest.raises(ValueError, match="imagen válida"):
+        normalizar_firma("data:image/png;base64,bm8gZXMgdW5hIGltYWdlbg==")
+    salida = BytesIO()
+    Image.new("RGBA", (800, 300), (0, 0, 0, 0)).save(salida, "PNG")
+    with pytest.raises(ValueError, match="vacía"):
+        normalizar_firma(base64.b64encode(salida.getvalue()).decode("ascii"))
@@ -0,0 +1,21 @@
+# Forma de las respuestas de los listados de exportaciones
+from conftest import TOTAL_ARCHIVOS, TOTAL_USUARIOS
+from ENDPOINTS.formatos import COLUMNAS_ARCHIVO
+
+
+def test_archivos_por_usuario_conserva_las_columnas_del_modelo(cliente, datos):
+    archivos = cliente.get("/archivos/usuario/1", params={"limite": TOTAL_ARCHIVOS}).json()
+    assert len(archivos) == len(range(0, TOTAL_ARCHIVOS, TOTAL_USUARIOS))  # usuario_id = i % TOTAL_USUARIOS + 1
+    assert all(list(archivo) == list(COLUMNAS_ARCHIVO) for archivo in archivos)
+    assert {archivo["usuario_id"] for archivo in archivos} == {1}
+    assert archivos[0]["activo"] is True
+
+
+def test_historial_completo_omite_archivos_sin_usuario(cliente, datos):
+    archivos = cliente.get("/archivo/historial", params={"limite": 500}).json()
+    assert len(archivos) == TOTAL_ARCHIVOS
+    assert all(archivo["generado_por"] and archivo["rol_usuario"] for archivo in archivos)
+    assert "sin_usuario.xlsx" not in {archivo["nombre_original"] for archivo in archivos}
+
+    exportaciones = cliente.get("/historial-exportaciones", params={"limite": 500}).json()
+    assert "sin_usuario.xlsx" in {archivo["nombre_"] for archivo in exportaciones}
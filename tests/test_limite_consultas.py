@@ -0,0 +1,48 @@
+# Limites de consultas SQL por peticion de los listados: con la semilla de conftest.py (varias
+# fichas, usuarios y archivos) un N+1 supera el limite en lugar de aparecer como lentitud.
+import pytest
+
+from conftest import TOTAL_ARCHIVOS, TOTAL_FICHAS, paginar
+
+
+def test_listar_fichas_una_consulta(cliente, datos, limite_consultas):
+    with limite_consultas(1, "/fichas/"):
+        respuesta = cliente.get("/fichas/", params={"limite": TOTAL_FICHAS})
+    assert respuesta.status_code == 200
+    fichas = respuesta.json()["fichas"]
+    assert len(fichas) == TOTAL_FICHAS
+    assert all(ficha["total_aprendices"] == 3 for ficha in fichas)
+
+
+def test_listar_fichas_una_consulta_por_pagina(cliente, datos, limite_consultas):
+    paginas = -(-TOTAL_FICHAS // 4)
+    with limite_consultas(paginas, "/fichas/ paginado"):
+        fichas = paginar(cliente, "/fichas/", 4, cursor_en_cabecera=False)
+    assert len({ficha["numero_ficha"] for ficha in fichas}) == TOTAL_FICHAS
+
+
+HISTORIALES = [("/archivo/historial", TOTAL_ARCHIVOS), ("/historial-exportaciones", TOTAL_ARCHIVOS + 1)]
+
+
+@pytest.mark.parametrize("url, total", HISTORIALES)
+def test_historial_una_consulta(cliente, datos, limite_consultas, url, total):
+    # Solo las columnas de la respuesta, en una consulta (sin cargar objetos ni relaciones por fila)
+    with limite_consultas(1, url):
+        respuesta = cliente.get(url, params={"limite": total})
+    assert respuesta.status_code == 200
+    archivos = respuesta.json()
+    assert len(archivos) == total
+
+
+@pytest.mark.parametrize("url, total", HISTORIALES)
+def test_historial_una_consulta_por_pagina(cliente, datos, limite_consultas, url, total):
+    paginas = -(-total // 7)
+    with limite_consultas(paginas, f"{url} paginado"):
+        archivos = paginar(cliente, url, 7, cursor_en_cabecera=True)
+    assert len({archivo["id"] for archivo in archivos}) == total
+
+
+def test_limite_consultas_falla_si_se_excede(cliente, datos, limite_consultas):
+    with pytest.raises(AssertionError, match="el maximo es 0"):
+        with limite_consultas(0, "/fichas/"):
+            cliente.get("/fichas/")
@@ -0,0 +1,67 @@
+# Migraciones sobre una base SQLite aparte, con datos cargados antes de actualizar
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from conftest import RAIZ
+
+
+@pytest.fixture
+def migrar(app, tmp_path):
+    """Aplica migraciones hasta la revision pedida sobre una base nueva (env.py reutiliza la conexion)"""
+    motor = create_engine(f"sqlite:///{tmp_path / 'migracion.db'}")
+    conexion = motor.connect()
+    config = Config(str(RAIZ / "alembic.ini"))
+    config.set_main_option("script_location", str(RAIZ / "migrations"))
+    config.attributes.update(connection=conexion, configurar_logs=False)
+
+    def aplicar(revision: str, bajar: bool = False):
+        (command.downgrade if bajar else command.upgrade)(config, revision)
+        conexion.commit()
+        return conexion
+
+    yield aplicar
+    conexion.close()
+    motor.dispose()
+
+
+def test_actualizar_llena_el_resumen_de_las_fichas(migrar):
+    conexion = migrar("0001e")
+    conexion.execute(text(
+        "INSERT INTO Fichas (numero_ficha, programa, estado) VALUES ('100', 'ADSO', 'EN EJECUCION'), "
+        "('200', 'ADSO', 'EN EJECUCION'), ('300', 'ADSO', 'TERMINADA')"
+    ))
+    for documento, ficha, estado, editado in [("1", "100", "EN FORMACION", 1), ("2", "100", "EN FORMACION", 0),
+                                               ("3", "100", "RETIRO", 1), ("4", "200", None, 0)]:
+        conexion.execute(text(
+            "INSERT INTO Aprendices (documento, nombre, apellido, correo, celular, ficha_numero, estado, editado) "
+            "VALUES (:documento, 'N', 'A', 'c@s.co', '3', :ficha, :estado, :editado)"
+        ), {"documento": documento, "ficha": ficha, "estado": estado, "editado": editado})
+    for ficha in ("100", "100", "300"):
+        conexion.execute(text(
+            "INSERT INTO archivos_excel (nombre_original, nombre_interno, ruta_archivo, ficha, modalidad, "
+            "cantidad_aprendices, hash_archivo, tamaño_bytes) "
+            "VALUES ('f.xlsx', 'f.xlsx', 'f.xlsx', :ficha, 'grupal', 1, 'h', 1)"
+        ), {"ficha": ficha})
+    conexion.commit()
+
+    migrar("head")
+
+    resumenes = {fila.numero_ficha: fila for fila in conexion.execute(text(
+        "SELECT numero_ficha, total_aprendices, aprendices_por_estado, total_editados, total_exportaciones, "
+        "tiene_exportacion, ultimo_archivo_id FROM FichasResumen"
+    ))}
+    assert set(resumenes) == {"100", "200", "300"}
+    assert (resumenes["100"].total_aprendices, resumenes["100"].total_editados) == (3, 2)
+    assert resumenes["100"].aprendices_por_estado == '{"EN FORMACION": 2, "RETIRO": 1}'
+    assert (resumenes["100"].total_exportaciones, resumenes["100"].ultimo_archivo_id) == (2, 2)
+    assert resumenes["200"].aprendices_por_estado == '{"SIN ESTADO": 1}'
+    assert not resumenes["200"].tiene_exportacion
+    assert (resumenes["300"].total_aprendices, resumenes["300"].tiene_exportacion) == (0, 1)
+
+
+def test_bajar_y_volver_a_subir(migrar):
+    migrar("head")
+    migrar("base", bajar=True)
+    migrar("head")
@@ -0,0 +1,70 @@
+# Paginacion por cursor: recorrer todas las paginas da las mismas filas, en el mismo orden,
+# que pedirlas de una vez (sin huecos ni repetidos, tambien con empates en la columna de orden)
+from datetime import datetime
+
+import pytest
+
+from conftest import TOTAL_ARCHIVOS, TOTAL_FICHAS, paginar
+
+
+@pytest.mark.parametrize("descendente", [False, True])
+@pytest.mark.parametrize("orden", ["numero_ficha", "programa", "total_aprendices"])
+def test_fichas_sin_huecos_ni_repetidos(cliente, datos, orden, descendente):
+    params = {"orden": orden, "descendente": descendente}
+    completo = cliente.get("/fichas/", params={**params, "limite": 200}).json()
+    assert completo["siguiente_cursor"] is None
+    esperado = [ficha["numero_ficha"] for ficha in completo["fichas"]]
+    assert len(esperado) == TOTAL_FICHAS
+
+    # programa y total_aprendices tienen empates: los desempata numero_ficha
+    paginas = paginar(cliente, "/fichas/", 4, cursor_en_cabecera=False, **params)
+    assert [ficha["numero_ficha"] for ficha in paginas] == esperado
+
+
+@pytest.mark.parametrize("url, total", [
+    ("/historial-exportaciones", TOTAL_ARCHIVOS + 1),
+    ("/archivo/historial", TOTAL_ARCHIVOS),
+    ("/archivos/usuario/1", len(range(0, TOTAL_ARCHIVOS, 4))),
+])
+def test_historial_sin_huecos_ni_repetidos(cliente, datos, url, total):
+    esperado = [archivo["id"] for archivo in cliente.get(url, params={"limite": 500}).json()]
+    assert len(esperado) == total
+    assert [archivo["id"] for archivo in paginar(cliente, url, 3, cursor_en_cabecera=True)] == esperado
+
+
+@pytest.fixture
+def archivos_misma_fecha(datos):
+    """Cinco exportaciones de una ficha creadas en el mismo instante (se borran al terminar)"""
+    from connection import SessionLocal
+    from MODELS import ArchivoExcel
+
+    sesion = SessionLocal()
+    archivos = [
+        ArchivoExcel(
+            nombre_original=f"empate_{i}.xlsx", nombre_interno=f"empate_{i}.xlsx",
+            ruta_archivo=f"empate_{i}.xlsx", ficha="2000007", modalidad="grupal", cantidad_aprendices=3,
+            hash_archivo=f"e{i:063d}", tamaño_bytes=1024, usuario_id=1, fecha_creacion=datetime(2026, 1, 1, 7)
+        )
+        for i in range(5)
+    ]
+    sesion.add_all(archivos)
+    sesion.commit()
+    try:
+        yield
+    finally:
+        for archivo in archivos:
+            sesion.delete(archivo)
+        sesion.commit()
+        sesion.close()
+
+
+def test_historial_con_fechas_iguales(cliente, archivos_misma_fecha):
+    url = "/archivo/ficha/2000007"
+    esperado = [archivo["id"] for archivo in cliente.get(url, params={"limite": 500}).json()]
+    assert len(esperado) == len(set(esperado)) >= 5
+    assert [archivo["id"] for archivo in paginar(cliente, url, 2, cursor_en_cabecera=True)] == esperado
+
+
+@pytest.mark.parametrize("url", ["/fichas/", "/historial-exportaciones"])
+def test_cursor_no_valido(cliente, datos, url):
+    assert cliente.get(url, params={"cursor": "no-es-un-cursor"}).status_code == 400
@@ -0,0 +1,29 @@
+import pytest
+from FUNCIONES.FUNCIONES_CONSULTAS.explicar_consultas import CONSULTAS_FRECUENTES, revisar_planes
+
+
+@pytest.fixture(scope="module")
+def planes(app, datos):
+    from connection import SessionLocal
+    db = SessionLocal()
+    try:
+        yield revisar_planes(db)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("nombre", list(CONSULTAS_FRECUENTES))
+def test_consulta_frecuente_usa_indice(planes, nombre):
+    ok, plan = planes[nombre]
+    assert ok, f"{nombre} recorre una tabla completa: {plan}"
+
+
+def test_detecta_recorrido_completo(app, datos):
+    from connection import SessionLocal
+    from FUNCIONES.FUNCIONES_CONSULTAS.explicar_consultas import _usa_indice
+    db = SessionLocal()
+    try:
+        ok, plan = _usa_indice(db, "SELECT documento FROM Aprendices WHERE celular = '300'")
+    finally:
+        db.close()
+    assert not ok, plan
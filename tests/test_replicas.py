@@ -0,0 +1,19 @@
+# Arranque con replicas: deben tener la misma revision del esquema que la primaria
+import pytest
+from sqlalchemy import create_engine
+
+
+def test_replica_en_la_ultima_revision(app):
+    import main
+    from connection import crear
+    main.revisar_replicas([crear], espera=0)  # La base de pruebas ya esta migrada
+
+
+def test_replica_sin_esquema_no_arranca(app, tmp_path):
+    import main
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    try:
+        with pytest.raises(RuntimeError, match="replica"):
+            main.revisar_replicas([replica], espera=0)
+    finally:
+        replica.dispose()
@@ -0,0 +1,33 @@
+# filas_a_json debe dar lo mismo que el camino de JSONResponse (dict por fila + jsonable_encoder)
+import json
+from datetime import datetime
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from FUNCIONES.FUNCIONES_CONSULTAS.serializacion import filas_a_json, respuesta_filas
+
+FILAS = [
+    (1, "1000", "ÑUÑEZ", Decimal("0.25"), datetime(2026, 1, 1, 8, 30), True, None, "llave del cursor"),
+    (2, "1001", "PÉREZ", Decimal("1.5"), datetime(2026, 1, 2), False, "x", "llave del cursor"),
+]
+
+
+def _camino_anterior(filas, claves):
+    return json.loads(json.dumps(jsonable_encoder([dict(zip(claves, fila)) for fila in filas])))
+
+
+def test_filas_a_json_igual_al_camino_anterior():
+    claves = ["id", "documento", "nombre", "tamaño_mb", "fecha_creacion", "activo", "firma"]
+    contenido = filas_a_json(FILAS, claves)
+    assert json.loads(contenido) == _camino_anterior(FILAS, claves)
+    assert list(json.loads(contenido)[0]) == claves  # Mismo orden de claves; la columna sobrante no sale
+
+
+def test_claves_que_no_son_identificadores():
+    claves = ["id", "numero-documento", "class"]
+    assert json.loads(filas_a_json(FILAS, claves)) == _camino_anterior(FILAS, claves)
+
+
+def test_respuesta_filas_sin_filas():
+    respuesta = respuesta_filas([], {"id": None})
+    assert respuesta.body == b"[]"
+    assert respuesta.media_type == "application/json"
@@ -0,0 +1,53 @@
+# Verificador de integridad: la huella (mtime + tamaño) evita volver a leer archivos sin cambios
+import hashlib
+
+from FUNCIONES.FUNCIONES_FORMATOS.verificador_integridad import VerificadorIntegridad
+from MODELS.archivo_excel import ArchivoExcel, EstadoIntegridad
+
+
+def _archivo(tmp_path, contenido=b"contenido del formato", id_archivo=1):
+    ruta = tmp_path / "formato.xlsx"
+    ruta.write_bytes(contenido)
+    estado = ruta.stat()
+    return ArchivoExcel(
+        id=id_archivo, ruta_archivo="formato.xlsx", hash_archivo=hashlib.sha256(contenido).hexdigest(),
+        tamaño_bytes=len(contenido), huella_verificacion=f"{estado.st_mtime_ns}-{estado.st_size}"
+    ), ruta
+
+
+def _contar_hashes(verificador, monkeypatch):
+    lecturas = []
+    original = verificador._hash_con_limite
+    monkeypatch.setattr(verificador, "_hash_con_limite", lambda ruta: lecturas.append(ruta) or original(ruta))
+    return lecturas
+
+
+def test_huella_igual_no_relee_el_archivo(tmp_path, monkeypatch):
+    verificador = VerificadorIntegridad(base_path=tmp_path, pasadas_por_rehash=4)
+    archivo_db, _ = _archivo(tmp_path)
+    lecturas = _contar_hashes(verificador, monkeypatch)
+
+    assert verificador.verificar_archivo(archivo_db, pasada=0) == EstadoIntegridad.OK.value
+    assert lecturas == []
+
+
+def test_turno_de_rehash_completo_lee_el_archivo(tmp_path, monkeypatch):
+    verificador = VerificadorIntegridad(base_path=tmp_path, pasadas_por_rehash=4)
+    archivo_db, _ = _archivo(tmp_path, id_archivo=1)
+    lecturas = _contar_hashes(verificador, monkeypatch)
+
+    # (id + pasada) % 4 == 0 en la pasada 3: ese archivo se re-hashea aunque la huella coincida
+    assert verificador.verificar_archivo(archivo_db, pasada=3) == EstadoIntegridad.OK.value
+    assert len(lecturas) == 1
+
+
+def test_huella_distinta_detecta_corrupcion(tmp_path, monkeypatch):
+    verificador = VerificadorIntegridad(base_path=tmp_path)
+    archivo_db, ruta = _archivo(tmp_path)
+    ruta.write_bytes(b"contenido del formatX")  # Mismo tamaño, distinto contenido y mtime
+    archivo_db.huella_verificacion = "0-0"
+    lecturas = _contar_hashes(verificador, monkeypatch)
+
+    assert verificador.verificar_archivo(archivo_db) == EstadoIntegridad.CORRUPTO.value
+    assert len(lecturas) == 1
+    assert archivo_db.huella_verificacion == "0-0"  # La huella solo se actualiza con un hash correcto
@@ -0,0 +1,25 @@
+# Volcados por lotes: cada lote con una sesion corta, sin retener la conexion entre lotes
+import csv
+import io
+from conftest import TOTAL_FICHAS
+
+
+def test_lotes_devuelven_la_conexion_al_pool(app, datos):
+    from connection import crear_background
+    from FUNCIONES.FUNCIONES_CONSULTAS.volcado_datos import _lotes, consulta_aprendices
+
+    consulta, llave = consulta_aprendices()
+    vistos = []
+    for filas in _lotes(consulta, llave, tamaño_lote=7):
+        assert crear_background.pool.checkedout() == 0
+        vistos.extend(fila._llave for fila in filas)
+    assert len(vistos) == TOTAL_FICHAS * 3
+    assert vistos == sorted(set(vistos))  # Sin huecos ni repetidos entre lotes
+
+
+def test_export_fichas_csv(cliente, datos):
+    respuesta = cliente.get("/export/fichas", params={"formato": "csv"})
+    assert respuesta.status_code == 200
+    filas = list(csv.reader(io.StringIO(respuesta.content.decode("utf-8-sig"))))
+    assert len(filas) == TOTAL_FICHAS + 1
+    assert {fila[filas[0].index("total_aprendices")] for fila in filas[1:]} == {"3"}